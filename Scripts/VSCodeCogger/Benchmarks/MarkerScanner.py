@@ -0,0 +1,144 @@
+# ----------------------------------------------------------------------
+# |
+# |  MarkerScanner.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Measures the lines/sec of cog marker classification and processing on multi-megabyte inputs."""
+
+import io
+import sys
+import textwrap
+import time
+
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Impl.cogapp.cogapp import Cog, getMarkerScanner  # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+def CreateContent(
+    num_megabytes: int,
+) -> str:
+    """Creates launch.json-like content with a cog block every few thousand lines."""
+
+    block = textwrap.dedent(
+        """\
+        {
+            // /src/Project/Tests/UnitTests/Module{index}_UnitTest.py
+            "name": "Module{index}_UnitTest",
+            "type": "python",
+            "request": "launch",
+            "module": "pytest",
+            "args": ["-vv", "Module{index}_UnitTest.py"],
+            "cwd": "/src/Project/Tests/UnitTests"
+        },
+        """,
+    )
+
+    chunks: List[str] = []
+    size = 0
+    index = 0
+
+    while size < num_megabytes * 1024 * 1024:
+        if index % 200 == 0:
+            chunks.append("// [[[cog cog.outl('// generated') ]]]\n")
+
+        chunk = block.replace("{index}", str(index))
+
+        chunks.append(chunk)
+        size += len(chunk)
+
+        if index % 200 == 199:
+            chunks.append("// [[[end]]]\n")
+
+        index += 1
+
+    if index % 200 != 0:
+        chunks.append("// [[[end]]]\n")
+
+    return "".join(chunks)
+
+
+# ----------------------------------------------------------------------
+def Measure(
+    desc: str,
+    num_lines: int,
+    func: Callable[[], None],
+    iterations: int=5,
+) -> None:
+    best = None
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    assert best is not None
+    sys.stdout.write("{:<40} {:>14,.0f} lines/sec\n".format(desc, num_lines / best))
+
+
+# ----------------------------------------------------------------------
+def Execute(
+    num_megabytes: int=8,
+) -> None:
+    content = CreateContent(num_megabytes)
+    lines = content.splitlines(True)
+
+    sys.stdout.write("{:,} bytes, {:,} lines\n\n".format(len(content), len(lines)))
+
+    cog = Cog()
+
+    # ----------------------------------------------------------------------
+    def LegacyClassify() -> None:
+        # The per-line predicate chain used by `Cog.processFile` before MarkerScanner
+        for line in lines:
+            if cog.isBeginSpecLine(line):
+                continue
+            if cog.isEndSpecLine(line):
+                continue
+            if cog.isEndOutputLine(line):
+                continue
+
+    # ----------------------------------------------------------------------
+    def ScannerClassify() -> None:
+        classify = getMarkerScanner(cog.options).classify
+
+        for line in lines:
+            classify(line)
+
+    # ----------------------------------------------------------------------
+    def ProcessLines() -> None:
+        Cog().processFile(io.StringIO(content), io.StringIO())
+
+    # ----------------------------------------------------------------------
+    def ProcessString() -> None:
+        Cog().processString(content)
+
+    # ----------------------------------------------------------------------
+
+    Measure("Classify (per-line predicates)", len(lines), LegacyClassify)
+    Measure("Classify (MarkerScanner)", len(lines), ScannerClassify)
+    Measure("Cog.processFile (line by line)", len(lines), ProcessLines, iterations=3)
+    Measure("Cog.processString (buffer)", len(lines), ProcessString, iterations=3)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    Execute()
@@ -0,0 +1,197 @@
+# ----------------------------------------------------------------------
+# |
+# |  PopulateTestsRender.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Measures the rendering of PopulateTests configurations for a synthetic tree of tests."""
+
+import ast
+import io
+import sys
+import textwrap
+import time
+import tracemalloc
+
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Impl.CompiledTemplate import CompiledTemplate  # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+def LoadConfigurations() -> Dict[str, str]:
+    """\
+    Returns the templates in `CogTools/PopulateTests.py`, which can't be imported here (it runs as
+    a cog generator).
+    """
+
+    filename = Path(__file__).parent.parent / "CogTools" / "PopulateTests.py"
+
+    tree = ast.parse(filename.read_text(encoding="utf-8"), str(filename))
+
+    for node in tree.body:
+        if (
+            isinstance(node, ast.AnnAssign)
+            and isinstance(node.target, ast.Name)
+            and node.target.id == "_CONFIGURATIONS"
+        ):
+            assert isinstance(node.value, ast.Dict)
+
+            results: Dict[str, str] = {}
+
+            for key, value in zip(node.value.keys, node.value.values):
+                # textwrap.dedent("""...""")
+                assert isinstance(key, ast.Constant) and isinstance(value, ast.Call), key
+                results[key.value] = textwrap.dedent(ast.literal_eval(value.args[0]))
+
+            return results
+
+    raise Exception("'_CONFIGURATIONS' was not found in '{}'.".format(filename))
+
+
+# ----------------------------------------------------------------------
+def CreateTests(
+    num_tests: int,
+    parser_names: List[str],
+) -> Dict[str, List[Tuple[Path, str]]]:
+    """Returns groups of (test filename, parser name), 50 tests per directory."""
+
+    groups: Dict[str, List[Tuple[Path, str]]] = {}
+
+    for index in range(num_tests):
+        group_name = "Project{}/src/Component{}/UnitTests".format(index // 5000, index // 50)
+
+        groups.setdefault(group_name, []).append(
+            (
+                Path("/src/Repo", group_name, "Module{}_UnitTest.py".format(index)),
+                parser_names[index % len(parser_names)],
+            ),
+        )
+
+    return groups
+
+
+# ----------------------------------------------------------------------
+def Measure(
+    desc: str,
+    num_tests: int,
+    func: Callable[[], None],
+    iterations: int=3,
+) -> None:
+    best = None
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert best is not None
+    sys.stdout.write(
+        "{:<40} {:>8,} tests {:>10.1f} ms {:>12,.0f} tests/sec {:>8.1f} MiB peak\n".format(
+            desc,
+            num_tests,
+            best * 1000,
+            num_tests / best,
+            peak / (1024 * 1024),
+        ),
+    )
+
+
+# ----------------------------------------------------------------------
+def Execute(
+    num_tests: int=50000,
+) -> None:
+    configurations = LoadConfigurations()
+    compiled = {name: CompiledTemplate(template, rstrip=True) for name, template in configurations.items()}
+
+    group_header = textwrap.dedent(
+        """
+        // ----------------------------------------------------------------------
+        // |
+        // |  {}
+        // |
+        // ----------------------------------------------------------------------
+        """,
+    )
+
+    compiled_group_header = CompiledTemplate(group_header.replace("{}", "{group}"), rstrip=True)
+
+    for size in [num_tests // 4, num_tests // 2, num_tests]:
+        groups = CreateTests(size, list(configurations))
+
+        # ----------------------------------------------------------------------
+        def Legacy() -> str:
+            # `str.format` on each template and a write (`cog.outl`) for each configuration
+            sink = io.StringIO()
+
+            for group_name, tests in groups.items():
+                sink.write(group_header.format(group_name).rstrip() + "\n")
+
+                for filename, parser_name in tests:
+                    sink.write(
+                        configurations[parser_name].format(
+                            filename=filename.as_posix(),
+                            dirname=filename.parent.as_posix(),
+                            basename=filename.name,
+                            group=group_name,
+                            name=filename.stem,
+                        ).rstrip() + "\n",
+                    )
+
+            return sink.getvalue()
+
+        # ----------------------------------------------------------------------
+        def Compiled() -> str:
+            output: List[str] = []
+
+            for group_name, tests in groups.items():
+                output.append(compiled_group_header.Render(group=group_name))
+
+                for filename, parser_name in tests:
+                    output.append(
+                        compiled[parser_name].Render(
+                            filename=filename.as_posix(),
+                            dirname=filename.parent.as_posix(),
+                            basename=filename.name,
+                            group=group_name,
+                            name=filename.stem,
+                        ),
+                    )
+
+            output.append("")
+
+            return "\n".join(output)
+
+        # ----------------------------------------------------------------------
+
+        assert Legacy() == Compiled()
+
+        Measure("str.format, write per configuration", size, Legacy)
+        Measure("CompiledTemplate, single join", size, Compiled)
+        sys.stdout.write("\n")
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    Execute()
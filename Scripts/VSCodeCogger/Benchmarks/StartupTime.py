@@ -0,0 +1,151 @@
+# ----------------------------------------------------------------------
+# |
+# |  StartupTime.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Measures the cold-start import time of VSCodeCogger and fails when it exceeds the recorded budget."""
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# ----------------------------------------------------------------------
+ROOT_DIR                                    = Path(__file__).parent.parent
+BUDGET_FILENAME                             = Path(__file__).with_suffix(".budget.json")
+
+# The script is imported through its (namespace) package, so that its imports are measured without
+# invoking the command line.
+TARGETS                                     = [
+    "Impl.cogapp",
+    "VSCodeCogger.__main__",
+]
+
+
+# ----------------------------------------------------------------------
+def MeasureImportTime(
+    target: str,
+    iterations: int=11,
+) -> Optional[float]:
+    """\
+    Returns the median cumulative import time of `target` in milliseconds, each measured in a fresh
+    interpreter, or None if it can't be imported (for example, when a dependency isn't installed).
+    """
+
+    statement = "import sys; sys.path[:0] = [{!r}, {!r}]; import {}".format(
+        str(ROOT_DIR),
+        str(ROOT_DIR.parent),
+        target,
+    )
+
+    results: List[float] = []
+
+    for _ in range(iterations):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+        )
+
+        if result.returncode != 0:
+            return None
+
+        value = _ParseCumulative(result.stderr, target)
+        assert value is not None, result.stderr
+
+        results.append(value / 1000.0)
+
+    return statistics.median(results)
+
+
+# ----------------------------------------------------------------------
+def Execute(
+    args: List[str],
+) -> int:
+    record = "--record" in args
+
+    try:
+        with BUDGET_FILENAME.open() as f:
+            budgets: Dict[str, float] = json.load(f)
+    except FileNotFoundError:
+        budgets = {}
+
+    result = 0
+
+    for target in TARGETS:
+        elapsed = MeasureImportTime(target)
+
+        if elapsed is None:
+            # A target that can't be imported would otherwise hide a regression behind its budget
+            sys.stdout.write("{:<24} {}\n".format(target, "can't be imported"))
+            sys.stdout.write("    ERROR: all dependencies must be installed to measure the startup time\n")
+            result = -1
+            continue
+
+        if record:
+            # Leave some headroom for noise
+            budgets[target] = round(elapsed * 1.5, 1)
+
+        budget = budgets.get(target)
+
+        sys.stdout.write(
+            "{:<24} {:>8.1f} ms{}\n".format(
+                target,
+                elapsed,
+                "" if budget is None else " (budget {:.1f} ms)".format(budget),
+            ),
+        )
+
+        if budget is not None and elapsed > budget:
+            sys.stdout.write("    ERROR: over budget\n")
+            result = -1
+
+    if record:
+        with BUDGET_FILENAME.open("w") as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    return result
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_IMPORTTIME_REGEX                           = re.compile(
+    r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s*)(?P<name>\S+)\s*$",
+)
+
+
+# ----------------------------------------------------------------------
+def _ParseCumulative(
+    output: str,
+    name: str,
+) -> Optional[int]:
+    for line in output.splitlines():
+        match = _IMPORTTIME_REGEX.match(line)
+        if match and match.group("name") == name and len(match.group("indent")) == 1:
+            return int(match.group("cumulative"))
+
+    return None
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(Execute(sys.argv[1:]))
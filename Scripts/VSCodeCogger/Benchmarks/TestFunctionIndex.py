@@ -0,0 +1,137 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestFunctionIndex.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Measures indexing the test classes and functions of a synthetic tree of test files."""
+
+import os
+import sys
+import tempfile
+import textwrap
+import time
+
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Impl import TestFunctionIndex          # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+def CreateTests(
+    root: Path,
+    num_tests: int,
+) -> List[Path]:
+    """Creates test files with a few classes and functions each, 50 tests per directory."""
+
+    content = textwrap.dedent(
+        """\
+        import unittest
+
+        {}
+
+        class TestClass(object):
+            def test_one(self): pass
+            def test_two(self): pass
+            def helper(self): pass
+
+        class Case(unittest.TestCase):
+        {}
+
+        def test_function(): pass
+        """,
+    )
+
+    filenames: List[Path] = []
+
+    for index in range(num_tests):
+        directory = root / "Component{}".format(index // 50) / "UnitTests"
+        directory.mkdir(parents=True, exist_ok=True)
+
+        filename = directory / "Module{}_UnitTest.py".format(index)
+
+        filename.write_text(
+            content.format(
+                "\n".join("CONSTANT_{} = {}".format(value, value) for value in range(20)),
+                "\n".join("    def test_{}(self): pass".format(value) for value in range(10)),
+            ),
+        )
+
+        filenames.append(filename)
+
+    return filenames
+
+
+# ----------------------------------------------------------------------
+def Measure(
+    desc: str,
+    num_tests: int,
+    func: Callable[[], None],
+) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    sys.stdout.write(
+        "{:<40} {:>8,} tests {:>10.1f} ms {:>12,.0f} tests/sec\n".format(
+            desc,
+            num_tests,
+            elapsed * 1000,
+            num_tests / elapsed,
+        ),
+    )
+
+
+# ----------------------------------------------------------------------
+def Execute(
+    num_tests: int=20000,
+) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Use a cache directory that starts out empty
+        os.environ["VSCODE_COGGER_CACHE_DIR"] = os.path.join(temp_dir, "Cache")
+
+        filenames = CreateTests(Path(temp_dir) / "Tests", num_tests)
+
+        for jobs in ["1", "0"]:
+            os.environ[TestFunctionIndex.JOBS_ENV_VAR] = jobs
+
+            # ----------------------------------------------------------------------
+            def Index() -> None:
+                results = TestFunctionIndex.GetTestItems(filenames)
+                assert all(result is not None for result in results)
+
+            # ----------------------------------------------------------------------
+            def Touch() -> None:
+                for filename in filenames:
+                    os.utime(filename)
+
+            # ----------------------------------------------------------------------
+
+            desc = "{} job(s)".format(jobs if jobs != "0" else os.cpu_count())
+
+            Measure("{}, empty cache".format(desc), num_tests, Index)
+            Measure("{}, unchanged".format(desc), num_tests, Index)
+
+            Touch()
+            Measure("{}, touched (hashed, not parsed)".format(desc), num_tests, Index)
+
+            os.remove(Path(os.environ["VSCODE_COGGER_CACHE_DIR"]) / "TestFunctionIndex" / "TestFunctionIndex.v1.db")
+            sys.stdout.write("\n")
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    Execute()
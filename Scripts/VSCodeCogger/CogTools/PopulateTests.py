@@ -15,21 +15,35 @@
 # ----------------------------------------------------------------------
 """Searches for and creates debug profiles for all tests found"""
 
+import hashlib
+import json
 import os
+import re
 import sys
 import textwrap
 
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import cog                                  # type: ignore  # pylint: disable=import-error
 
 from Common_Foundation.ContextlibEx import ExitStack
-from Common_Foundation import DynamicPluginArchitecture
-from Common_Foundation.EnumSource import EnumSource
 from Common_Foundation import PathEx
 from Common_Foundation import Types
 
+from Impl.CacheDirectory import GetCacheDirectory, LoadCacheFile, SaveCacheFile
+from Impl.cogapp.dependencies import notePath
+from Impl.cogapp.whiteutils import reindentBlock
+from Impl.CompiledTemplate import CompiledTemplate
+from Impl.DirectoryIndex import FindDirectories
+from Impl.ExcludedDirectories import EXCLUDED_DIRECTORIES, IsExcluded
+from Impl import GitFiles
+from Impl.TestFunctionIndex import GetTestItems, TestItems
+from Impl.TestParserMemo import GetParserVersion
+from Impl.TestParserPool import GetSupportingParsers
+from Impl.TestParsers import GetTestParsers
+
 
 # ----------------------------------------------------------------------
 _CONFIGURATIONS: Dict[
@@ -109,18 +123,366 @@ _CONFIGURATIONS: Dict[
 }
 
 
+# ----------------------------------------------------------------------
+# Configurations for a test class or function within a test file, emitted after the configuration of
+# the file when `_TEST_FUNCTIONS_ENV_VAR` is set.
+_TEST_CONFIGURATIONS: Dict[
+    str,                                    # TestParser name
+    str,                                    # VSCode template
+] =                                         {
+    # ----------------------------------------------------------------------
+    "Pytest": textwrap.dedent(
+        """\
+        {{
+            // {filename}
+            "name": "{name}",
+
+            "presentation": {{
+                "hidden": false,
+                "group": "{group}",
+            }},
+
+            "type": "python",
+            "request": "launch",
+            "justMyCode": false,
+            "console": "integratedTerminal",
+
+            "module": "pytest",
+
+            "args": [
+                "-o",
+                "python_files=*Test.py",
+                "-vv",
+                "{basename}::{test_id}",
+
+                "--capture=no",  // Do not capture stderr/stdout
+
+                // Insert custom program args here
+            ],
+
+            "cwd": "{dirname}"
+        }},
+        """,
+    ),
+
+    # ----------------------------------------------------------------------
+    "PythonUnittest": textwrap.dedent(
+        """\
+        {{
+            // {filename}
+            "name": "{name}",
+
+            "presentation": {{
+                "hidden": false,
+                "group": "{{group}}",
+            }},
+
+            "type": "python",
+            "request": "launch",
+            "justMyCode": false,
+            "console": "integratedTerminal",
+
+            "program": "{filename}",
+
+            "args": [
+                "{test_id}",
+
+                // Insert custom program args here
+            ],
+
+            "cwd": "{dirname}"
+        }},
+        """,
+    ),
+}
+
+
+# Each template is parsed once, rather than once for every test
+_COMPILED_CONFIGURATIONS: Dict[str, CompiledTemplate] = {
+    parser_name: CompiledTemplate(template, rstrip=True)
+    for parser_name, template in _CONFIGURATIONS.items()
+}
+
+_COMPILED_TEST_CONFIGURATIONS: Dict[str, CompiledTemplate] = {
+    parser_name: CompiledTemplate(template, rstrip=True)
+    for parser_name, template in _TEST_CONFIGURATIONS.items()
+}
+
+_HEADER                                     = textwrap.dedent(
+    """\
+    //
+    // This content can be updated by running 'VSCodeCogger' from the command line.
+    //
+    """,
+).rstrip()
+
+_GROUP_HEADER                               = CompiledTemplate(
+    textwrap.dedent(
+        """
+        // ----------------------------------------------------------------------
+        // |
+        // |  {group}
+        // |
+        // ----------------------------------------------------------------------
+        """,
+    ),
+    rstrip=True,
+)
+
+# Matches the banner of `_GROUP_HEADER` in the previous output
+_GROUP_BANNER_REGEX                         = re.compile(
+    r"// -+\n// \|\n// \|  (?P<group>.+)\n// \|\n// -+",
+)
+
+
+# ----------------------------------------------------------------------
+# When set to "1", tests are classified and written a batch of groups at a time, so that the memory
+# used for their parsers and configurations doesn't grow with the number of tests. Tests are found
+# in the same way as when not streaming (see `_INDEX_ENV_VAR` and `_GIT_ENV_VAR`).
+_STREAMING_ENV_VAR                          = "VSCODE_COGGER_POPULATE_TESTS_STREAMING"
+
+_STREAMING_BATCH_SIZE                       = 2000
+
+# When set to "0", the source directory is walked every time, rather than only listing the
+# directories that changed since the last time (see `Impl/DirectoryIndex.py`).
+_INDEX_ENV_VAR                              = "VSCODE_COGGER_POPULATE_TESTS_INDEX"
+
+# When set to "1" and the source directory is within a git work tree, the tests are found among the
+# files that git tracks (or that are untracked but not ignored) rather than by searching the file
+# system. With `--incremental`, the launch.json file is cogged again when git's index, a .gitignore
+# file, or the entries of a directory that contains any of git's files change.
+_GIT_ENV_VAR                                = "VSCODE_COGGER_POPULATE_TESTS_GIT"
+
+# When set to "1", configurations are also created for each test class and function, found by
+# parsing the test files (see `Impl/TestFunctionIndex.py`).
+_TEST_FUNCTIONS_ENV_VAR                     = "VSCODE_COGGER_POPULATE_TESTS_FUNCTIONS"
+
+# When set to "0", the content of every group is generated again, rather than copying the content of
+# the groups whose tests haven't changed since the last run from the previous output.
+_SELECTIVE_ENV_VAR                          = "VSCODE_COGGER_POPULATE_TESTS_SELECTIVE"
+
+_STATE_VERSION                              = 1
+
+
 # ----------------------------------------------------------------------
 def Execute() -> None:
     source_dir = Path(cog.inFile).parent.parent
+
+    streaming = os.environ.get(_STREAMING_ENV_VAR, None) == "1"
+    test_functions = os.environ.get(_TEST_FUNCTIONS_ENV_VAR, None) == "1"
+
+    # `cog.fs` is shared by all of the files cogged in this run, so directories that are also within
+    # the source directory of another launch.json file are only listed once.
+    git_filenames = GitFiles.EnumFiles(source_dir) if os.environ.get(_GIT_ENV_VAR, None) == "1" else None
+
+    if git_filenames is not None:
+        walk: Iterable[Tuple[str, List[str], List[str]]] = _WalkGitFiles(source_dir, git_filenames)
+    elif os.environ.get(_INDEX_ENV_VAR, None) == "0":
+        walk = cog.fs.walk(
+            source_dir,
+            exclude=EXCLUDED_DIRECTORIES,
+        )
+    else:
+        walk = (
+            (directory, [], filenames)
+            for directory, filenames in FindDirectories(
+                source_dir,
+                _IsTestDirectoryName,
+                exclude=EXCLUDED_DIRECTORIES,
+                fs=cog.fs,
+            )
+        )
+
+    groups: Dict[str, List[Path]] = dict(_EnumGroups(source_dir, walk))
+
+    if not groups:
+        return
+
+    test_names_lookup = Counter(
+        filename.name
+        for filenames in groups.values()
+        for filename in filenames
+    )
+
+    if streaming:
+        batches: Iterator[Dict[str, List[Path]]] = _Batch(groups.items(), _STREAMING_BATCH_SIZE)
+    else:
+        batches = iter([groups])
+
+    # Load the test parsers
+    test_parsers_env_var = "DEVELOPMENT_ENVIRONMENT_TEST_PARSERS"
+
+    # Shared by all of the files cogged by this process
+    test_parsers = GetTestParsers(test_parsers_env_var)
+
+    # The content of a group is copied from the previous output when neither its tests nor anything
+    # else that the content depends on changed since the last run, and the previous output of the
+    # group is what was generated then.
+    state_filename = GetCacheDirectory("PopulateTests") / "{}.json".format(
+        _Hash(os.path.realpath(cog.inFile)),
+    )
+
+    context = _GetContext(test_parsers, test_functions)
+
+    # The [signature, content hash] of each group generated by the last run with the same context
+    if os.environ.get(_SELECTIVE_ENV_VAR, None) == "0":
+        prev_state: Dict[str, List[str]] = {}
+    else:
+        prev_state = LoadCacheFile(state_filename, context, lambda content: content["groups"]) or {}
+
+    prev_sections = _ParseGroupSections(cog.previous) if prev_state else {}
+
+    state: Dict[str, List[str]] = {}
+
+    # The information remembered about the tests in groups that were removed is forgotten
+    removed_roots = [source_dir / group_name for group_name in prev_state if group_name not in groups]
+
+    cog.outl(_HEADER)
+
+    for batch in batches:
+        sections: Dict[str, str] = {}
+        changed_groups: Dict[str, List[Path]] = {}
+
+        for group_name, filenames in batch.items():
+            signature = _GetGroupSignature(filenames, test_names_lookup)
+            section = prev_sections.get(group_name, None)
+
+            if section is not None and prev_state.get(group_name, None) == [signature, _Hash(section)]:
+                sections[group_name] = section
+            else:
+                changed_groups[group_name] = filenames
+
+            state[group_name] = [signature]
+
+        # Find the parser for each test (concurrently, when enabled with the environment variables in
+        # `Impl/TestParserPool.py`); the results are in the same order as the tests. Decisions about
+        # test files that haven't changed since the last run are remembered.
+        ordered_filenames: List[Path] = [
+            filename
+            for filenames in changed_groups.values()
+            for filename in filenames
+        ]
+
+        if streaming or prev_state:
+            roots = [source_dir / group_name for group_name in changed_groups] + removed_roots
+            removed_roots = []
+
+            recursive = False
+        else:
+            roots = [source_dir]
+            recursive = True
+
+        supporting_parsers = dict(
+            zip(
+                ordered_filenames,
+                GetSupportingParsers(
+                    ordered_filenames,
+                    test_parsers,
+                    test_parsers_env_var,
+                    roots,
+                    recursive=recursive,
+                ),
+            ),
+        )
+
+        # Find the test classes and functions in the files that have configurations for them; files
+        # that haven't changed since the last run aren't parsed again.
+        test_items: Dict[Path, Optional[TestItems]] = {}
+
+        if test_functions:
+            indexed_filenames = [
+                filename
+                for filename in ordered_filenames
+                if (
+                    supporting_parsers[filename] is not None
+                    and supporting_parsers[filename].name in _COMPILED_TEST_CONFIGURATIONS
+                )
+            ]
+
+            test_items = dict(
+                zip(
+                    indexed_filenames,
+                    GetTestItems(indexed_filenames, roots, recursive=recursive),
+                ),
+            )
+
+        # Render the groups that changed and write the batch at once
+        for group_name, filenames in changed_groups.items():
+            output: List[str] = [_GROUP_HEADER.Render(group=group_name)]
+
+            for filename in filenames:
+                test_parser = supporting_parsers[filename]
+                if test_parser is None:
+                    continue
+
+                basename = filename.name
+                filename_str = filename.as_posix()
+                dirname = filename.parent.as_posix()
+
+                if test_names_lookup[basename] == 1:
+                    name_suffix = ""
+                else:
+                    name_suffix = " --- {}".format(group_name)
+
+                output.append(
+                    _COMPILED_CONFIGURATIONS[test_parser.name].Render(
+                        filename=filename_str,
+                        dirname=dirname,
+                        basename=basename,
+                        group=group_name,
+                        name=filename.stem + name_suffix,
+                    ),
+                )
+
+                items = test_items.get(filename, None)
+                if items is None:
+                    continue
+
+                test_template = _COMPILED_TEST_CONFIGURATIONS[test_parser.name]
+
+                for test_id, test_name in _EnumTests(test_parser.name, items):
+                    output.append(
+                        test_template.Render(
+                            filename=filename_str,
+                            dirname=dirname,
+                            basename=basename,
+                            group=group_name,
+                            name="{}.{}{}".format(filename.stem, test_name, name_suffix),
+                            test_id=test_id,
+                        ),
+                    )
+
+            sections[group_name] = "\n".join(output)
+
+        for group_name in batch:
+            state[group_name].append(_Hash(sections[group_name]))
+
+        cog.outl("\n".join(sections[group_name] for group_name in batch))
+
+    cog.outl("")
+
+    SaveCacheFile(state_filename, context, {"groups": state})
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _EnumGroups(
+    source_dir: Path,
+    walk: Iterable[Tuple[str, List[str], List[str]]],
+) -> Iterator[Tuple[str, List[Path]]]:
+    """Yields the name and tests of each test directory, in the order that they are walked."""
+
     len_source_dir_parts = len(source_dir.parts)
 
-    # Get all of the tests
-    test_filenames: List[Path] = []
+    for root_str, _, filenames in walk:
+        root = Path(root_str)
 
-    for root, _, filenames in EnumSource(source_dir):
-        if not (root.name.endswith("Tests") and root.name != "Tests"):
+        if not _IsTestDirectoryName(root.name):
             continue
 
+        test_filenames: List[Path] = []
+
         for filename in filenames:
             if filename == "__init__.py":
                 continue
@@ -132,81 +494,245 @@ def Execute() -> None:
 
             test_filenames.append(root / filename)
 
-    # Group the tests
-    if not test_filenames:
-        return
+        if test_filenames:
+            yield Path(*root.parts[len_source_dir_parts:]).as_posix(), test_filenames
 
-    groups: Dict[str, List[Path]] = {}
-    test_names_lookup: Dict[str, int] = {}
 
-    for test_filename in test_filenames:
-        test_name = test_filename.name
+# ----------------------------------------------------------------------
+def _IsTestDirectoryName(
+    name: str,
+) -> bool:
+    return name.endswith("Tests") and name != "Tests"
 
-        if test_name in test_names_lookup:
-            test_names_lookup[test_name] += 1
-        else:
-            test_names_lookup[test_name] = 1
 
-        group_name = Path(*test_filename.parts[len_source_dir_parts:]).parent.as_posix()
+# ----------------------------------------------------------------------
+def _WalkGitFiles(
+    source_dir: Path,
+    relative_filenames: List[str],
+) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """Yields the test directories among git's files, in the order that `cog.fs.walk` would."""
 
-        groups.setdefault(group_name, []).append(test_filename)
+    index_filename = GitFiles.GetIndexFilename(source_dir)
+    if index_filename is not None:
+        # Staging, committing or checking out files changes the index
+        notePath(index_filename)
 
-    # Load the test parsers
-    test_parsers = [
-        mod.TestParser()
-        for mod in DynamicPluginArchitecture.EnumeratePlugins("DEVELOPMENT_ENVIRONMENT_TEST_PARSERS")
-    ]
+    directories: Dict[Tuple[str, ...], List[str]] = {}
 
-    # ----------------------------------------------------------------------
-    def Print(
-        value: str,
-    ) -> None:
-        cog.outl(value)
+    # Untracked files aren't in the index, and git lists them in another process (whose reads
+    # aren't recorded), so the directories that contain git's files are dependencies: adding a file
+    # or directory to one of them changes its modification time.
+    noted_dirs: Set[Tuple[str, ...]] = set()
 
-    # ----------------------------------------------------------------------
+    for relative_filename in relative_filenames:
+        *dir_parts, filename = relative_filename.split("/")
+
+        parts = tuple(dir_parts)
+
+        while parts not in noted_dirs:
+            noted_dirs.add(parts)
+            notePath(os.path.join(source_dir, *parts), bDirectory=True)
+
+            if not parts:
+                break
+
+            parts = parts[:-1]
+
+        if filename == ".gitignore":
+            # Changes to the ignore rules change which untracked files are listed
+            notePath(os.path.join(source_dir, relative_filename))
+
+        dir_name = dir_parts[-1] if dir_parts else source_dir.name
+
+        if not _IsTestDirectoryName(dir_name):
+            continue
+
+        if any(IsExcluded(dir_part) for dir_part in dir_parts):
+            continue
+
+        directories.setdefault(tuple(dir_parts), []).append(filename)
+
+    # Sorting the directories' parts is the order of a sorted, top-down walk
+    for dir_parts in sorted(directories):
+        directory = os.path.join(source_dir, *dir_parts)
 
-    Print(
-        textwrap.dedent(
-            """\
-            //
-            // This content can be updated by running 'VSCodeCogger' from the command line.
-            //
-            """,
-        ).rstrip(),
+        # Tracked files that were deleted are still in the index; checking existence lists the
+        # test directory (through `cog.fs`), which also makes it a dependency of this generator.
+        filenames = [
+            filename
+            for filename in directories[dir_parts]
+            if cog.fs.isfile(os.path.join(directory, filename))
+        ]
+
+        if filenames:
+            yield directory, [], sorted(filenames)
+
+
+# ----------------------------------------------------------------------
+def _EnumTests(
+    test_parser_name: str,
+    items: TestItems,
+) -> Iterator[Tuple[str, str]]:
+    """\
+    Yields the id (as the test runner expects it) and name of each test class and function that the
+    runner would collect, in the order defined.
+    """
+
+    if test_parser_name == "Pytest":
+        # pytest's default collection rules: 'test*' functions, and 'test*' methods of 'Test*'
+        # classes without an `__init__` (or of unittest.TestCase classes)
+        for function_name in items.functions:
+            yield function_name, function_name
+
+        for test_class in items.classes:
+            if not test_class.is_test_case and (
+                not test_class.name.startswith("Test") or test_class.has_init
+            ):
+                continue
+
+            yield test_class.name, test_class.name
+
+            for method_name in test_class.methods:
+                yield (
+                    "{}::{}".format(test_class.name, method_name),
+                    "{}.{}".format(test_class.name, method_name),
+                )
+
+    elif test_parser_name == "PythonUnittest":
+        # `unittest.main` accepts the names of TestCase classes and their methods
+        for test_class in items.classes:
+            if not test_class.is_test_case:
+                continue
+
+            yield test_class.name, test_class.name
+
+            for method_name in test_class.methods:
+                test_id = "{}.{}".format(test_class.name, method_name)
+                yield test_id, test_id
+
+    else:
+        assert False, test_parser_name  # pragma: no cover
+
+
+# ----------------------------------------------------------------------
+def _Hash(
+    content: str,
+) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+# ----------------------------------------------------------------------
+def _GetContext(
+    test_parsers: List[Any],
+    test_functions: bool,
+) -> str:
+    """Returns a string that changes when the content of every group may have changed."""
+
+    # This generator (which contains the templates)
+    st = os.stat(__file__)
+
+    return _Hash(
+        json.dumps(
+            [
+                _STATE_VERSION,
+                [os.path.realpath(__file__), st.st_mtime_ns, st.st_size],
+                [[test_parser.name, GetParserVersion(test_parser)] for test_parser in test_parsers],
+                test_functions,
+            ],
+        ),
     )
 
-    for group_name, filenames in groups.items():
-        Print(
-            textwrap.dedent(
-                """
-                // ----------------------------------------------------------------------
-                // |
-                // |  {}
-                // |
-                // ----------------------------------------------------------------------
-                """,
-            ).format(group_name).rstrip(),
-        )
 
-        for filename in filenames:
-            for test_parser in test_parsers:
-                if test_parser.IsSupportedTestItem(filename):
-                    Print(
-                        _CONFIGURATIONS[test_parser.name].format(
-                            filename=filename.as_posix(),
-                            dirname=filename.parent.as_posix(),
-                            basename=filename.name,
-                            group=group_name,
-                            name="{}{}".format(
-                                filename.stem,
-                                "" if test_names_lookup[filename.name] == 1 else " --- {}".format(group_name),
-                            ),
-                        ).rstrip(),
-                    )
+# ----------------------------------------------------------------------
+def _GetGroupSignature(
+    filenames: List[Path],
+    test_names_lookup: Dict[str, int],
+) -> str:
+    """Returns a string that changes when the content of the group may have changed."""
+
+    values: List[Any] = []
+
+    for filename in filenames:
+        # The content depends on the file, whether or not it is generated again
+        notePath(filename)
+
+        try:
+            st = os.stat(filename)
+            file_signature = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            file_signature = None
+
+        values.append([filename.name, file_signature, test_names_lookup[filename.name] == 1])
+
+    return _Hash(json.dumps(values))
+
+
+# ----------------------------------------------------------------------
+def _ParseGroupSections(
+    previous: str,
+) -> Dict[str, str]:
+    """\
+    Returns the content of each group in the previous output, as it would have been generated.
+
+    The content is only reused when its hash matches the one saved when it was generated, so groups
+    that were edited by hand (or that can't be told apart) are generated again.
+    """
+
+    # cog indents the output like the markers, and the file may have Windows line endings
+    lines = reindentBlock(previous.replace("\r\n", "\n"), "").split("\n")
+
+    # Each group begins with the blank line of `_GROUP_HEADER` followed by the banner
+    starts: List[Tuple[int, str]] = []
+
+    for index in range(1, len(lines) - 4):
+        if lines[index - 1] or not lines[index].startswith("// -"):
+            continue
+
+        match = _GROUP_BANNER_REGEX.fullmatch("\n".join(lines[index:index + 5]))
+        if match:
+            starts.append((index - 1, match.group("group")))
+
+    # Groups are joined with newlines, and the output ends with a blank line
+    end = len(lines) - 2 if lines[-2:] == ["", ""] else len(lines)
+
+    sections: Dict[str, str] = {}
+    duplicates: Set[str] = set()
+
+    for start, group_name in reversed(starts):
+        if group_name in sections:
+            duplicates.add(group_name)
+
+        sections[group_name] = "\n".join(lines[start:end])
+        end = start
+
+    for group_name in duplicates:
+        del sections[group_name]
+
+    return sections
+
+
+# ----------------------------------------------------------------------
+def _Batch(
+    groups: Iterable[Tuple[str, List[Path]]],
+    batch_size: int,
+) -> Iterator[Dict[str, List[Path]]]:
+    """Yields groups in batches of (at least) `batch_size` tests, or fewer for the last batch."""
+
+    batch: Dict[str, List[Path]] = {}
+    num_tests = 0
+
+    for group_name, filenames in groups:
+        batch[group_name] = filenames
+        num_tests += len(filenames)
+
+        if num_tests >= batch_size:
+            yield batch
 
-                    break
+            batch = {}
+            num_tests = 0
 
-    Print("")
+    if batch:
+        yield batch
 
 
 # ----------------------------------------------------------------------
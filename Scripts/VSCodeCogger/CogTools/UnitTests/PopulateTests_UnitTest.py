@@ -0,0 +1,407 @@
+# ----------------------------------------------------------------------
+# |
+# |  PopulateTests_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for PopulateTests.py"""
+
+import importlib
+import os
+import re
+import shutil
+import sys
+import textwrap
+import types
+
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import pytest
+
+pytest.importorskip("Common_Foundation")
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl.cogapp.snapshot import FileSystemSnapshot    # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def populate_tests(tmp_path, monkeypatch):
+    """Returns the PopulateTests module, imported without running it and with a fake `cog` module."""
+
+    monkeypatch.setenv("__extracting_documentation__", "1")
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+
+    fake_cog = types.ModuleType("cog")
+    fake_cog.fs = FileSystemSnapshot()      # type: ignore
+
+    monkeypatch.setitem(sys.modules, "cog", fake_cog)
+    monkeypatch.syspath_prepend(str(Path(__file__).parent.parent))
+    monkeypatch.delitem(sys.modules, "PopulateTests", raising=False)
+
+    return importlib.import_module("PopulateTests")
+
+
+# ----------------------------------------------------------------------
+class _TestParser(object):
+    """Supports the tests in the directories whose names start with the parser's name."""
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        name: str,
+    ):
+        self.name                           = name
+        self.version                        = 1
+
+    # ----------------------------------------------------------------------
+    def IsSupportedTestItem(
+        self,
+        filename: Path,
+    ) -> bool:
+        return filename.parent.parent.name.startswith(self.name)
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def source_dir(tmp_path):
+    source_dir = tmp_path / "Source"
+
+    (source_dir / ".vscode").mkdir(parents=True)
+
+    return source_dir
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def execute(populate_tests, source_dir, monkeypatch):
+    """Returns a function that cogs the launch.json file in the source directory and returns the output."""
+
+    test_parsers = [_TestParser("Pytest"), _TestParser("PythonUnittest")]
+
+    monkeypatch.setattr(populate_tests, "GetTestParsers", lambda plugins_env_var: test_parsers)
+
+    # ----------------------------------------------------------------------
+    def Execute(
+        previous: str="",
+        env: Dict[str, str]={},  # pylint: disable=dangerous-default-value
+    ) -> str:
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+
+        output: List[str] = []
+
+        populate_tests.cog.inFile = str(source_dir / ".vscode" / "launch.json")
+        populate_tests.cog.previous = previous
+        populate_tests.cog.outl = lambda line="": output.append(line + "\n")
+        populate_tests.cog.fs = FileSystemSnapshot()
+
+        populate_tests.Execute()
+
+        return "".join(output)
+
+    # ----------------------------------------------------------------------
+
+    return Execute
+
+
+# ----------------------------------------------------------------------
+def _WriteTest(
+    filename: Path,
+    content: str="",
+) -> None:
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_text(textwrap.dedent(content))
+
+
+# ----------------------------------------------------------------------
+def _GetConfigurations(
+    output: str,
+) -> List[List[str]]:
+    """Returns the name, group and test arguments of each configuration."""
+
+    results: List[List[str]] = []
+
+    for configuration in re.split(r"^{$", output, flags=re.MULTILINE)[1:]:
+        name = re.search(r'^    "name": "(.*)",$', configuration, re.MULTILINE)
+        group = re.search(r'^        "group": "(.*)",$', configuration, re.MULTILINE)
+        args = re.findall(r'^        "([^"]*)",$', configuration, re.MULTILINE)
+
+        assert name is not None and group is not None
+
+        results.append([name.group(1), group.group(1)] + [arg for arg in args if not arg.startswith("-") and "=" not in arg])
+
+    return results
+
+
+# ----------------------------------------------------------------------
+class TestFunctionConfigurations(object):
+    # ----------------------------------------------------------------------
+    @pytest.fixture
+    def tests(self, source_dir):
+        _WriteTest(
+            source_dir / "PytestComponent" / "UnitTests" / "One_UnitTest.py",
+            """\
+            def test_function(): pass
+
+            class TestClass(object):
+                def test_one(self): pass
+                def test_two(self): pass
+
+            class Helper(object):
+                def test_ignored(self): pass
+            """,
+        )
+
+        _WriteTest(
+            source_dir / "PythonUnittestComponent" / "UnitTests" / "Two_UnitTest.py",
+            """\
+            import unittest
+
+            def test_ignored(): pass
+
+            class Case(unittest.TestCase):
+                def test_one(self): pass
+            """,
+        )
+
+    # ----------------------------------------------------------------------
+    @pytest.mark.usefixtures("tests")
+    def test_Files(self, execute):
+        assert _GetConfigurations(execute()) == [
+            ["One_UnitTest", "PytestComponent/UnitTests", "One_UnitTest.py"],
+            ["Two_UnitTest", "{group}"],
+        ]
+
+    # ----------------------------------------------------------------------
+    @pytest.mark.usefixtures("tests")
+    def test_Functions(self, execute):
+        output = execute(env={"VSCODE_COGGER_POPULATE_TESTS_FUNCTIONS": "1"})
+
+        # The configurations of a file's tests are in the same group as the file's configuration
+        assert _GetConfigurations(output) == [
+            ["One_UnitTest", "PytestComponent/UnitTests", "One_UnitTest.py"],
+            ["One_UnitTest.test_function", "PytestComponent/UnitTests", "One_UnitTest.py::test_function"],
+            ["One_UnitTest.TestClass", "PytestComponent/UnitTests", "One_UnitTest.py::TestClass"],
+            ["One_UnitTest.TestClass.test_one", "PytestComponent/UnitTests", "One_UnitTest.py::TestClass::test_one"],
+            ["One_UnitTest.TestClass.test_two", "PytestComponent/UnitTests", "One_UnitTest.py::TestClass::test_two"],
+            ["Two_UnitTest", "{group}"],
+            ["Two_UnitTest.Case", "{group}", "Case"],
+            ["Two_UnitTest.Case.test_one", "{group}", "Case.test_one"],
+        ]
+
+    # ----------------------------------------------------------------------
+    def test_DuplicateNames(self, execute, source_dir):
+        for component in ["PytestOne", "PytestTwo"]:
+            _WriteTest(source_dir / component / "UnitTests" / "Same_UnitTest.py", "def test_function(): pass\n")
+
+        output = execute(env={"VSCODE_COGGER_POPULATE_TESTS_FUNCTIONS": "1"})
+
+        assert [configuration[0] for configuration in _GetConfigurations(output)] == [
+            "Same_UnitTest --- PytestOne/UnitTests",
+            "Same_UnitTest.test_function --- PytestOne/UnitTests",
+            "Same_UnitTest --- PytestTwo/UnitTests",
+            "Same_UnitTest.test_function --- PytestTwo/UnitTests",
+        ]
+
+
+# ----------------------------------------------------------------------
+class TestWalkGitFiles(object):
+    # ----------------------------------------------------------------------
+    def test_Dependencies(self, populate_tests, tmp_path, monkeypatch):
+        source_dir = tmp_path / "Source"
+
+        filenames = [
+            ".gitignore",
+            "A/B/UnitTests/One_UnitTest.py",
+            "A/Other.py",
+            "C/Data.txt",
+        ]
+
+        for filename in filenames:
+            (source_dir / filename).parent.mkdir(parents=True, exist_ok=True)
+            (source_dir / filename).write_text("")
+
+        noted_files = []
+        noted_dirs = []
+
+        monkeypatch.setattr(
+            populate_tests,
+            "notePath",
+            lambda path, bDirectory=False: (noted_dirs if bDirectory else noted_files).append(Path(path)),
+        )
+
+        assert list(populate_tests._WalkGitFiles(source_dir, filenames)) == [  # pylint: disable=protected-access
+            (str(source_dir / "A" / "B" / "UnitTests"), [], ["One_UnitTest.py"]),
+        ]
+
+        # A new, untracked test directory changes the modification time of a directory that
+        # contains one of git's files (or of the source directory)
+        assert sorted(noted_dirs) == [
+            source_dir,
+            source_dir / "A",
+            source_dir / "A" / "B",
+            source_dir / "A" / "B" / "UnitTests",
+            source_dir / "C",
+        ]
+
+        assert noted_files == [source_dir / ".gitignore"]
+
+
+# ----------------------------------------------------------------------
+class TestSelective(object):
+    """Groups whose tests didn't change are copied from the previous output, which must be the same as generating everything again."""
+
+    # ----------------------------------------------------------------------
+    @pytest.fixture
+    def previous(self, source_dir, execute):
+        for group in ["PytestA", "PytestB", "PythonUnittestC"]:
+            for name in ["One", "Two"]:
+                _WriteTest(source_dir / group / "UnitTests" / "{}{}_UnitTest.py".format(group, name))
+
+        return execute()
+
+    # ----------------------------------------------------------------------
+    @pytest.fixture
+    def rendered_groups(self, populate_tests, monkeypatch):
+        """The groups generated again by the last selective run."""
+
+        rendered_groups: Set[str] = set()
+
+        group_header = populate_tests._GROUP_HEADER  # pylint: disable=protected-access
+
+        # ----------------------------------------------------------------------
+        class GroupHeader(object):
+            # ----------------------------------------------------------------------
+            @staticmethod
+            def Render(**values: str) -> str:
+                rendered_groups.add(values["group"])
+                return group_header.Render(**values)
+
+        # ----------------------------------------------------------------------
+
+        monkeypatch.setattr(populate_tests, "_GROUP_HEADER", GroupHeader)
+
+        return rendered_groups
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _Execute(
+        execute,
+        previous: str,
+        rendered_groups: Set[str],
+        expected_groups: Set[str],
+        expected_output: Optional[str]=None,
+    ) -> None:
+        rendered_groups.clear()
+        output = execute(previous)
+
+        assert rendered_groups == expected_groups
+
+        # Compare with the content generated from scratch, after the selective run (which saves the
+        # state)
+        assert output == (expected_output or execute(previous, {"VSCODE_COGGER_POPULATE_TESTS_SELECTIVE": "0"}))
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _AddTest(
+        filename: Path,
+    ) -> None:
+        _WriteTest(filename, "def test_function(): pass\n")
+
+    # ----------------------------------------------------------------------
+    def test_Unchanged(self, execute, previous, rendered_groups):
+        self._Execute(execute, previous, rendered_groups, set(), previous)
+
+    # ----------------------------------------------------------------------
+    def test_FirstGroupChanged(self, execute, previous, rendered_groups, source_dir):
+        self._AddTest(source_dir / "PytestA" / "UnitTests" / "Three_UnitTest.py")
+
+        self._Execute(execute, previous, rendered_groups, {"PytestA/UnitTests"})
+
+    # ----------------------------------------------------------------------
+    def test_LastGroupChanged(self, execute, previous, rendered_groups, source_dir):
+        os.remove(source_dir / "PythonUnittestC" / "UnitTests" / "PythonUnittestCTwo_UnitTest.py")
+
+        self._Execute(execute, previous, rendered_groups, {"PythonUnittestC/UnitTests"})
+
+    # ----------------------------------------------------------------------
+    def test_AddedGroup(self, execute, previous, rendered_groups, source_dir):
+        self._AddTest(source_dir / "PytestAB" / "UnitTests" / "Three_UnitTest.py")
+        self._AddTest(source_dir / "PythonUnittestD" / "UnitTests" / "Four_UnitTest.py")
+
+        self._Execute(
+            execute,
+            previous,
+            rendered_groups,
+            {"PytestAB/UnitTests", "PythonUnittestD/UnitTests"},
+        )
+
+    # ----------------------------------------------------------------------
+    @pytest.mark.parametrize("group", ["PytestA", "PytestB", "PythonUnittestC"])
+    def test_RemovedGroup(self, execute, previous, rendered_groups, source_dir, group):
+        shutil.rmtree(source_dir / group)
+
+        self._Execute(execute, previous, rendered_groups, set())
+
+    # ----------------------------------------------------------------------
+    def test_DuplicateNameAdded(self, execute, previous, rendered_groups, source_dir):
+        # The names of the tests in the other group are disambiguated now
+        self._AddTest(source_dir / "PytestB" / "UnitTests" / "PytestAOne_UnitTest.py")
+
+        self._Execute(execute, previous, rendered_groups, {"PytestA/UnitTests", "PytestB/UnitTests"})
+
+    # ----------------------------------------------------------------------
+    def test_HandEdited(self, execute, previous, rendered_groups):
+        edited = previous.replace('"name": "PytestBOne_UnitTest"', '"name": "Edited"')
+        assert edited != previous
+
+        self._Execute(execute, edited, rendered_groups, {"PytestB/UnitTests"}, previous)
+
+    # ----------------------------------------------------------------------
+    def test_HandEditedBannerName(self, execute, previous, rendered_groups):
+        edited = previous.replace("// |  PytestB/UnitTests", "// |  Edited")
+        assert edited != previous
+
+        self._Execute(execute, edited, rendered_groups, {"PytestB/UnitTests"}, previous)
+
+    # ----------------------------------------------------------------------
+    def test_HandEditedBanner(self, execute, previous, rendered_groups):
+        # The group's banner is no longer recognized, so its content belongs to the previous group
+        edited = previous.replace("// |  PytestB/UnitTests", "//    PytestB/UnitTests")
+        assert edited != previous
+
+        self._Execute(execute, edited, rendered_groups, {"PytestA/UnitTests", "PytestB/UnitTests"}, previous)
+
+    # ----------------------------------------------------------------------
+    def test_HandEditedSeparator(self, execute, previous, rendered_groups):
+        # An extra blank line between groups
+        banner = "\n// ----------------------------------------------------------------------\n// |\n// |  PytestB/UnitTests"
+        assert banner in previous
+
+        edited = previous.replace(banner, "\n" + banner)
+
+        self._Execute(execute, edited, rendered_groups, {"PytestA/UnitTests"}, previous)
+
+    # ----------------------------------------------------------------------
+    def test_WindowsLineEndings(self, execute, previous, rendered_groups):
+        self._Execute(execute, previous.replace("\n", "\r\n"), rendered_groups, set(), previous)
+
+    # ----------------------------------------------------------------------
+    def test_Indented(self, execute, previous, rendered_groups):
+        indented = "".join(
+            "    " + line if line.strip() else line
+            for line in previous.splitlines(True)
+        )
+
+        self._Execute(execute, indented, rendered_groups, set(), previous)
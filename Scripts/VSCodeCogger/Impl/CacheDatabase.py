@@ -0,0 +1,87 @@
+# ----------------------------------------------------------------------
+# |
+# |  CacheDatabase.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""sqlite databases of information about files, stored in the cache directory."""
+
+import os
+import sqlite3
+
+from pathlib import Path
+from typing import Iterable
+
+from Impl.CacheDirectory import GetCacheDirectory
+
+
+# ----------------------------------------------------------------------
+def Connect(
+    name: str,
+    schema_version: int,
+    create_table_statement: str,
+) -> sqlite3.Connection:
+    """\
+    Returns a connection to the database `name` (within a directory of the same name in the cache
+    directory), creating its table with `create_table_statement` if necessary. Databases with other
+    schema versions are separate files.
+    """
+
+    filename = GetCacheDirectory(name) / "{}.v{}.db".format(name, schema_version)
+
+    # Files are cogged concurrently, by threads and processes that each have their own connection
+    connection = sqlite3.connect(str(filename), timeout=30)
+
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+
+        with connection:
+            connection.execute(create_table_statement)
+
+    except:
+        connection.close()
+        raise
+
+    return connection
+
+
+# ----------------------------------------------------------------------
+def RemoveMissing(
+    connection: sqlite3.Connection,
+    table_name: str,
+    root: Path,
+    filenames: Iterable[Path],
+    *,
+    recursive: bool=True,
+) -> None:
+    """\
+    Deletes the rows of `table_name` for the files within `root` (or directly within it, when not
+    `recursive`) that aren't in `filenames`, identified by the table's `path` column. The caller
+    commits the changes.
+    """
+
+    existing = set(str(filename) for filename in filenames)
+
+    root_str = str(root)
+    prefix = os.path.join(root_str, "")
+    like_prefix = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    missing = [
+        (path, )
+        for (path, ) in connection.execute(
+            "SELECT DISTINCT path FROM {} WHERE path LIKE ? ESCAPE '\\'".format(table_name),
+            (like_prefix + "%", ),
+        )
+        if path not in existing and (recursive or os.path.dirname(path) == root_str)
+    ]
+
+    if missing:
+        connection.executemany("DELETE FROM {} WHERE path = ?".format(table_name), missing)
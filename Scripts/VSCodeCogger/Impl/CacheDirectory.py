@@ -0,0 +1,111 @@
+# ----------------------------------------------------------------------
+# |
+# |  CacheDirectory.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Location of information persisted between VSCodeCogger invocations."""
+
+import json
+import os
+import sys
+import tempfile
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+
+# ----------------------------------------------------------------------
+CACHE_DIR_ENV_VAR                           = "VSCODE_COGGER_CACHE_DIR"
+
+# Modification times this recent may not reflect changes made right after a file or directory was
+# read (on file systems with coarse timestamps), so information saved with them isn't reused.
+MTIME_GRANULARITY_NS                        = 2 * 1000 * 1000 * 1000
+
+
+# ----------------------------------------------------------------------
+def GetCacheDirectory(
+    *names: str,
+) -> Path:
+    """\
+    Returns (and creates) a directory for cached information.
+
+    The root is the directory in `VSCODE_COGGER_CACHE_DIR` if it is defined, or a `VSCodeCogger`
+    directory within the user's cache directory. Everything stored here can be deleted at any time.
+    """
+
+    root = os.environ.get(CACHE_DIR_ENV_VAR, None)
+
+    if root:
+        result = Path(root)
+    else:
+        if sys.platform.startswith("win"):
+            user_cache_dir = os.environ.get("LOCALAPPDATA", None)
+        else:
+            user_cache_dir = os.environ.get("XDG_CACHE_HOME", None)
+
+        result = Path(user_cache_dir) if user_cache_dir else Path.home() / ".cache"
+        result /= "VSCodeCogger"
+
+    result = result.joinpath(*names)
+    result.mkdir(parents=True, exist_ok=True)
+
+    return result
+
+
+# ----------------------------------------------------------------------
+_DecodedT                                   = TypeVar("_DecodedT")
+
+
+# ----------------------------------------------------------------------
+def LoadCacheFile(
+    filename: Path,
+    version: Any,
+    decode_func: Callable[[Dict[str, Any]], _DecodedT],
+) -> Optional[_DecodedT]:
+    """\
+    Returns the content saved by `SaveCacheFile` with the same `version`, as returned by
+    `decode_func`, or None if the file doesn't exist, can't be read or decoded, or was saved with a
+    different version.
+    """
+
+    try:
+        with filename.open() as f:
+            content = json.load(f)
+
+        if not isinstance(content, dict) or content.get("version") != version:
+            return None
+
+        return decode_func(content)
+
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+# ----------------------------------------------------------------------
+def SaveCacheFile(
+    filename: Path,
+    version: Any,
+    content: Dict[str, Any],
+) -> None:
+    """Saves `content` as JSON, replacing the file at once so that concurrent readers never see part of it."""
+
+    fd, temp_filename = tempfile.mkstemp(dir=filename.parent, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(content, version=version), f)
+
+        os.replace(temp_filename, filename)
+
+    except:
+        os.remove(temp_filename)
+        raise
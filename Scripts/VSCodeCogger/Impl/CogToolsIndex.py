@@ -0,0 +1,141 @@
+# ----------------------------------------------------------------------
+# |
+# |  CogToolsIndex.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Documentation of the CogTools modules, extracted without importing them."""
+
+import ast
+import hashlib
+import os
+import threading
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from Impl.CacheDirectory import GetCacheDirectory, LoadCacheFile, SaveCacheFile
+
+
+# ----------------------------------------------------------------------
+class CogToolInfo(NamedTuple):
+    name: str
+    description: str
+    path: Path
+
+
+# ----------------------------------------------------------------------
+def GetCogToolsIndex(
+    cog_tools_dir: Path,
+) -> List[CogToolInfo]:
+    """\
+    Returns information about each module in `cog_tools_dir`, sorted by name.
+
+    Module docstrings are read by parsing the source with `ast`, so the modules (and everything they
+    import) aren't loaded. Results are cached on disk by each file's modification time and size, and
+    in memory for the rest of the process, so that concurrent tasks share the work.
+    """
+
+    cog_tools_dir = cog_tools_dir.resolve()
+
+    with _index_lock:
+        stats = _StatModules(cog_tools_dir)
+
+        cached = _index_cache.get(cog_tools_dir)
+        if cached is not None and cached[0] == stats:
+            return cached[1]
+
+        result = _CreateIndex(cog_tools_dir, stats)
+
+        _index_cache[cog_tools_dir] = (stats, result)
+        return result
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_CACHE_VERSION                              = 1
+
+_index_lock                                 = threading.Lock()
+_index_cache: Dict[Path, Tuple[Dict[str, Tuple[int, int]], List[CogToolInfo]]] = {}
+
+
+# ----------------------------------------------------------------------
+def _StatModules(
+    cog_tools_dir: Path,
+) -> Dict[str, Tuple[int, int]]:
+    stats: Dict[str, Tuple[int, int]] = {}
+
+    with os.scandir(cog_tools_dir) as it:
+        for entry in it:
+            if not entry.is_file() or not entry.name.endswith(".py"):
+                continue
+
+            st = entry.stat()
+            stats[entry.name] = (st.st_mtime_ns, st.st_size)
+
+    return stats
+
+
+# ----------------------------------------------------------------------
+def _CreateIndex(
+    cog_tools_dir: Path,
+    stats: Dict[str, Tuple[int, int]],
+) -> List[CogToolInfo]:
+    cache_filename = GetCacheDirectory("CogToolsIndex") / "{}.json".format(
+        hashlib.sha256(str(cog_tools_dir).encode("utf-8")).hexdigest(),
+    )
+
+    cached_files: Dict[str, Dict] = LoadCacheFile(
+        cache_filename,
+        _CACHE_VERSION,
+        lambda content: content["files"],
+    ) or {}
+
+    files: Dict[str, Dict] = {}
+    is_dirty = len(cached_files) != len(stats)
+
+    for name, (mtime_ns, size) in stats.items():
+        info = cached_files.get(name)
+
+        if info is None or info["mtime_ns"] != mtime_ns or info["size"] != size:
+            info = {
+                "mtime_ns": mtime_ns,
+                "size": size,
+                "description": _ExtractDocstring(cog_tools_dir / name),
+            }
+
+            is_dirty = True
+
+        files[name] = info
+
+    if is_dirty:
+        SaveCacheFile(cache_filename, _CACHE_VERSION, {"files": files})
+
+    return [
+        CogToolInfo(os.path.splitext(name)[0], files[name]["description"], cog_tools_dir / name)
+        for name in sorted(files)
+    ]
+
+
+# ----------------------------------------------------------------------
+def _ExtractDocstring(
+    filename: Path,
+) -> str:
+    try:
+        with filename.open("rb") as f:
+            tree = ast.parse(f.read(), str(filename))
+
+    except (OSError, SyntaxError, ValueError):
+        return ""
+
+    # `clean=True` matches `inspect.getdoc` on the imported module
+    return ast.get_docstring(tree, clean=True) or ""
@@ -0,0 +1,98 @@
+# ----------------------------------------------------------------------
+# |
+# |  CompiledTemplate.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""`str.format` templates that are parsed once and rendered many times."""
+
+import operator
+import string
+
+from typing import Any, Callable, List, Tuple
+
+
+# ----------------------------------------------------------------------
+class CompiledTemplate(object):
+    """\
+    A `str.format` template (with named fields only), compiled into its literal chunks and slots.
+
+    Rendering is a single %-format operation on a tuple of the values, so the template isn't parsed
+    again and no intermediate strings are created.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        template: str,
+        *,
+        rstrip: bool=False,
+    ):
+        chunks: List[str] = []
+        names: List[str] = []
+
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            if literal:
+                # `parse` has already replaced '{{' and '}}' with literal braces
+                chunks.append(literal.replace("%", "%%"))
+
+            if field_name is not None:
+                if not field_name.isidentifier() or format_spec or conversion:
+                    raise Exception("'{{{}}}' is not supported; only named fields are.".format(field_name))
+
+                chunks.append("%s")
+                names.append(field_name)
+
+        # The trailing whitespace can be removed now, unless a value could end up at the end
+        runtime_rstrip = False
+
+        if rstrip:
+            while chunks and chunks[-1] != "%s" and not chunks[-1].rstrip():
+                chunks.pop()
+
+            if chunks and chunks[-1] != "%s":
+                chunks[-1] = chunks[-1].rstrip()
+            else:
+                runtime_rstrip = rstrip
+
+        self.names                          = names
+
+        self._format                        = "".join(chunks)
+        self._runtime_rstrip                = runtime_rstrip
+        self._get_values: Callable[[Any], Tuple]
+
+        if not names:
+            self._get_values = lambda values: ()
+        elif len(names) == 1:
+            name = names[0]
+            self._get_values = lambda values: (values[name], )
+        else:
+            self._get_values = operator.itemgetter(*names)
+
+    # ----------------------------------------------------------------------
+    def Render(self, **values: str) -> str:
+        """Equivalent to `template.format(**values)` (followed by `rstrip()` when compiled with `rstrip`)."""
+
+        return self.RenderValues(values)
+
+    # ----------------------------------------------------------------------
+    def RenderValues(
+        self,
+        values: Any,
+    ) -> str:
+        """Renders with a mapping of values; avoids the keyword arguments dict of `Render`."""
+
+        result = self._format % self._get_values(values)
+
+        if self._runtime_rstrip:
+            result = result.rstrip()
+
+        return result
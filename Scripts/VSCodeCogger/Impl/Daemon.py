@@ -0,0 +1,332 @@
+# ----------------------------------------------------------------------
+# |
+# |  Daemon.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Server and client for a long-running VSCodeCogger process listening on a Unix domain socket."""
+
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+from Impl.CacheDirectory import GetCacheDirectory
+
+
+# ----------------------------------------------------------------------
+# The protocol is one JSON object per line. The client sends:
+#
+#     {"args": [...], "cwd": "...", "environ": {...}}
+#
+# and the server streams back any number of:
+#
+#     {"output": "..."}
+#
+# followed by:
+#
+#     {"result": <int>}
+#
+ExecuteFuncType                             = Callable[[List[str]], int]
+
+
+# ----------------------------------------------------------------------
+def GetSocketPath() -> Path:
+    """Returns the default socket path, which is specific to the current user."""
+
+    # The directory is created by `Serve`, which restricts access to it
+    return GetCacheDirectory() / "Daemon" / "VSCodeCogger.sock"
+
+
+# ----------------------------------------------------------------------
+def IsSupported() -> bool:
+    return hasattr(socket, "AF_UNIX") and hasattr(socketserver, "ThreadingUnixStreamServer")
+
+
+# ----------------------------------------------------------------------
+def Serve(
+    socket_path: Path,
+    execute_func: ExecuteFuncType,
+    on_ready_func: Optional[Callable[[], None]]=None,
+) -> None:
+    """\
+    Listens on `socket_path` until interrupted, invoking `execute_func` with the args of each request.
+
+    Requests are executed one at a time, as each one changes the current directory, environment and
+    standard streams of this process; `execute_func` can still use threads internally. Everything
+    imported by earlier requests (typer, Common_Foundation, plugins, ...) stays loaded. Generator
+    modules in CogTools don't need to be reloaded when they change, as cog imports them for each
+    file (and Python revalidates their bytecode against the source's mtime).
+
+    Requests run with the client's environment, which selects the plugins imported, so only the
+    current user can connect: the socket's directory must be owned by the current user and not be
+    writable by anyone else, the socket is only accessible by the current user from the moment it is
+    created, and connections from processes of other users are refused (where the platform reports
+    the peer's credentials).
+    """
+
+    if not IsSupported():
+        raise Exception("Unix domain sockets are not supported on this platform.")
+
+    _EnsurePrivateDirectory(socket_path.parent)
+
+    if socket_path.exists():
+        if _IsListening(socket_path):
+            raise Exception("A server is already listening on '{}'.".format(socket_path))
+
+        # A stale socket from a server that didn't exit cleanly
+        socket_path.unlink()
+
+    execute_lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    class Handler(socketserver.StreamRequestHandler):
+        # ----------------------------------------------------------------------
+        def handle(self):
+            peer_uid = _GetPeerUid(self.request)
+
+            if peer_uid is not None and peer_uid != os.getuid():
+                # Close the connection without reading the request
+                return
+
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+
+            output = _StreamWriter(self.wfile)
+
+            with execute_lock:
+                try:
+                    with _RequestContext(request["cwd"], request["environ"], output):
+                        result = execute_func(request["args"])
+
+                except SystemExit as ex:
+                    result = ex.code if isinstance(ex.code, int) else (0 if ex.code is None else 1)
+
+                except Exception as ex:  # pylint: disable=broad-except
+                    output.write("{}\n".format(ex))
+                    result = -1
+
+            self.wfile.write(_Encode({"result": result}))
+
+    # ----------------------------------------------------------------------
+
+    # The socket is created with the permissions allowed by the umask, so it is never accessible by
+    # other users (even briefly)
+    prev_umask = os.umask(0o077)
+
+    try:
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), Handler)
+    finally:
+        os.umask(prev_umask)
+
+    with server:
+        try:
+            if on_ready_func is not None:
+                on_ready_func()
+
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                socket_path.unlink()
+
+
+# ----------------------------------------------------------------------
+def Client(
+    socket_path: Path,
+    args: List[str],
+    output_stream: TextIO,
+) -> Optional[int]:
+    """\
+    Forwards `args` to the server listening on `socket_path`, streaming its output to `output_stream`.
+
+    Returns the result of the command, or None if no server is listening.
+    """
+
+    if not IsSupported() or not socket_path.exists():
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        try:
+            sock.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+
+        try:
+            sock.sendall(
+                _Encode(
+                    {
+                        "args": args,
+                        "cwd": os.getcwd(),
+                        "environ": dict(os.environ),
+                    },
+                ),
+            )
+
+            with sock.makefile("rb") as f:
+                for line in f:
+                    message = json.loads(line.decode("utf-8"))
+
+                    if "output" in message:
+                        output_stream.write(message["output"])
+                        output_stream.flush()
+                    else:
+                        return message["result"]
+
+        except (BrokenPipeError, ConnectionResetError):
+            # The server refused the connection (see `Serve`) or exited
+            pass
+
+        raise Exception("The server closed the connection before sending a result.")
+
+    finally:
+        sock.close()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+class _StreamWriter(object):
+    """Text stream that forwards everything written to the client."""
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        wfile,
+    ):
+        self._wfile                         = wfile
+        self._lock                          = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def write(
+        self,
+        content: str,
+    ) -> int:
+        if content:
+            with self._lock:
+                self._wfile.write(_Encode({"output": content}))
+                self._wfile.flush()
+
+        return len(content)
+
+    # ----------------------------------------------------------------------
+    def flush(self) -> None:
+        pass
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def isatty() -> bool:
+        return False
+
+    # ----------------------------------------------------------------------
+    @property
+    def encoding(self) -> str:
+        return "utf-8"
+
+
+# ----------------------------------------------------------------------
+@contextlib.contextmanager
+def _RequestContext(
+    cwd: str,
+    environ: Dict[str, str],
+    output: _StreamWriter,
+) -> Iterator[None]:
+    prev_cwd = os.getcwd()
+    prev_environ = dict(os.environ)
+    prev_stdout = sys.stdout
+    prev_stderr = sys.stderr
+
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(environ)
+    sys.stdout = output  # type: ignore
+    sys.stderr = output  # type: ignore
+
+    try:
+        yield
+
+    finally:
+        sys.stdout = prev_stdout
+        sys.stderr = prev_stderr
+        os.environ.clear()
+        os.environ.update(prev_environ)
+        os.chdir(prev_cwd)
+
+
+# ----------------------------------------------------------------------
+def _EnsurePrivateDirectory(
+    directory: Path,
+) -> None:
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    st = os.lstat(directory)
+
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise Exception("'{}' must be a directory owned by the current user.".format(directory))
+
+    if stat.S_IMODE(st.st_mode) & (stat.S_IWGRP | stat.S_IWOTH):
+        raise Exception(
+            "'{}' must not be writable by other users (its mode is {:o}).".format(
+                directory,
+                stat.S_IMODE(st.st_mode),
+            ),
+        )
+
+
+# ----------------------------------------------------------------------
+def _GetPeerUid(
+    sock: socket.socket,
+) -> Optional[int]:
+    """Returns the user id of the process connected to `sock`, or None if the platform doesn't report it."""
+
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+
+    # struct ucred: pid, uid, gid
+    ucred = struct.Struct("3i")
+
+    _, uid, _ = ucred.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, ucred.size))
+
+    return uid
+
+
+# ----------------------------------------------------------------------
+def _IsListening(
+    socket_path: Path,
+) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+# ----------------------------------------------------------------------
+def _Encode(
+    message: Dict,
+) -> bytes:
+    return (json.dumps(message) + "\n").encode("utf-8")
@@ -0,0 +1,163 @@
+# ----------------------------------------------------------------------
+# |
+# |  DirectoryIndex.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Persisted index of the directories in a tree, revalidated with directory modification times."""
+
+import fnmatch
+import hashlib
+import json
+import os
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from Impl.CacheDirectory import GetCacheDirectory, LoadCacheFile, MTIME_GRANULARITY_NS, SaveCacheFile
+
+
+# ----------------------------------------------------------------------
+def FindDirectories(
+    root: Path,
+    is_match_func: Callable[[str], bool],
+    *,
+    exclude: Iterable[str]=(),
+    fs: Optional[Any]=None,
+) -> List[Tuple[str, List[str]]]:
+    """\
+    Returns the path and (sorted) file names of each directory within `root` (including `root`)
+    whose name satisfies `is_match_func`, in the order of a sorted, top-down walk. Directories
+    whose names match any of the fnmatch patterns in `exclude` and links to directories aren't
+    descended into.
+
+    The subdirectories of every directory (and the files of the matching ones) are saved along with
+    its modification time, which changes whenever entries are added, removed or renamed. Later
+    searches stat each directory and only list those whose modification times changed.
+
+    Directories are listed and stat'ed through `fs` (a cog `FileSystemSnapshot`, which the
+    searches of a cog run can share) when provided, and each directory is recorded as a dependency
+    of the generator running, as it would be if it had been listed.
+    """
+
+    from Impl.cogapp.dependencies import notePath
+
+    exclude = list(exclude)
+    root_str = str(root)
+
+    cache_filename = GetCacheDirectory("DirectoryIndex") / "{}.json".format(
+        hashlib.sha256(json.dumps([root_str, exclude]).encode("utf-8")).hexdigest(),
+    )
+
+    cached_dirs = LoadCacheFile(cache_filename, _CACHE_VERSION, _DecodeCache) or {}
+
+    stat_func = os.stat if fs is None else fs.stat
+
+    # Directories listed this soon after they changed are listed again next time
+    trusted_mtime_ns = time.time_ns() - MTIME_GRANULARITY_NS
+
+    results: List[Tuple[str, List[str]]] = []
+    walked_dirs: Dict[str, _DirectoryInfo] = {}
+
+    directories = [root_str]
+
+    while directories:
+        directory = directories.pop()
+
+        try:
+            # Before listing, so that changes made while listing are seen next time
+            mtime_ns = stat_func(directory).st_mtime_ns
+        except OSError:
+            continue
+
+        info = cached_dirs.get(directory)
+        is_match = is_match_func(os.path.basename(directory))
+
+        if info is None or info[0] != mtime_ns or (info[2] is not None) != is_match:
+            info = _ListDirectory(directory, mtime_ns, is_match, exclude, fs)
+            if info is None:
+                continue
+        else:
+            notePath(directory, bDirectory=True)
+
+        walked_dirs[directory] = (mtime_ns if mtime_ns < trusted_mtime_ns else -1, info[1], info[2])
+
+        if info[2] is not None:
+            results.append((directory, info[2]))
+
+        directories += [os.path.join(directory, name) for name in reversed(info[1])]
+
+    if walked_dirs != cached_dirs:
+        SaveCacheFile(cache_filename, _CACHE_VERSION, {"directories": walked_dirs})
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# (mtime_ns, [subdir name, ...], [file name, ...] for matching directories or None)
+_DirectoryInfo                              = Tuple[int, List[str], Optional[List[str]]]
+
+_CACHE_VERSION                              = 1
+
+
+# ----------------------------------------------------------------------
+def _ListDirectory(
+    directory: str,
+    mtime_ns: int,
+    is_match: bool,
+    exclude: List[str],
+    fs: Optional[Any],
+) -> Optional[_DirectoryInfo]:
+    subdirs: List[str] = []
+    filenames: List[str] = []
+
+    try:
+        if fs is not None:
+            # SnapshotEntry: name, path, is_dir, is_file, is_symlink
+            entries = [(entry.name, entry.is_dir, entry.is_symlink) for entry in fs.scandir(directory)]
+        else:
+            entries = []
+
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    entries.append((entry.name, is_dir, entry.is_symlink()))
+
+    except OSError:
+        return None
+
+    for name, is_dir, is_symlink in entries:
+        if not is_dir:
+            filenames.append(name)
+        elif not is_symlink and not any(fnmatch.fnmatch(name, pattern) for pattern in exclude):
+            subdirs.append(name)
+
+    subdirs.sort()
+    filenames.sort()
+
+    return mtime_ns, subdirs, filenames if is_match else None
+
+
+# ----------------------------------------------------------------------
+def _DecodeCache(
+    content: Dict[str, Any],
+) -> Dict[str, _DirectoryInfo]:
+    return {
+        directory: (mtime_ns, subdirs, filenames)
+        for directory, (mtime_ns, subdirs, filenames) in content["directories"].items()
+    }
@@ -0,0 +1,295 @@
+# ----------------------------------------------------------------------
+# |
+# |  DirectoryWalker.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Finds files in large (and possibly network-mounted) directory trees using multiple threads."""
+
+import fnmatch
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from Impl.CacheDirectory import GetCacheDirectory, LoadCacheFile, MTIME_GRANULARITY_NS, SaveCacheFile
+from Impl.ExcludedDirectories import EXCLUDED_DIRECTORIES
+
+
+# ----------------------------------------------------------------------
+def FindFiles(
+    root: Path,
+    target: str,
+    *,
+    prune_patterns: Iterable[str]=EXCLUDED_DIRECTORIES,
+    num_threads: Optional[int]=None,
+    follow_symlinks: bool=True,
+    use_cache: bool=False,
+    rescan: bool=False,
+) -> List[Path]:
+    """\
+    Returns the files within `root` at the relative path `target` (for example, "launch.json" or
+    ".vscode/launch.json") from any directory, sorted.
+
+    When `target` has multiple components, only its first one is matched against the entries of
+    each directory and the rest is checked directly, so the directories that contain the target
+    (".vscode" in the example above) are never listed. Directories whose names match any of the
+    `prune_patterns` (fnmatch-style) are not descended into.
+
+    Directories are listed concurrently by `num_threads` threads (os.scandir releases the GIL, so
+    this helps most on slow file systems). Entry types come from the directory listings, so files
+    are never stat'ed; directories are identified by the device and inode of their own stat so that
+    each is listed once, even when symlinks create loops or file systems are mounted within `root`.
+
+    With `use_cache`, the subdirectories of each directory walked are saved along with its
+    modification time, which changes whenever entries are added, removed or renamed. The next
+    search only stats the directories that it reuses and lists the ones whose modification times
+    changed. `rescan` lists every directory, replacing the cached information.
+    """
+
+    target_parts = Path(target).parts
+    assert target_parts and not Path(target).is_absolute(), target
+
+    first_part = target_parts[0]
+    remaining_path = os.path.join(*target_parts[1:]) if len(target_parts) > 1 else None
+
+    prune_patterns = list(prune_patterns)
+
+    if num_threads is None:
+        num_threads = min(32, (os.cpu_count() or 1) + 4)
+
+    num_threads = max(1, num_threads)
+
+    root = root.resolve()
+
+    cache_filename: Optional[Path] = None
+    cached_dirs: Dict[str, _DirectoryInfo] = {}
+
+    if use_cache:
+        cache_filename = GetCacheDirectory("DirectoryWalker") / "{}.json".format(
+            hashlib.sha256(
+                json.dumps([str(root), target, prune_patterns, follow_symlinks]).encode("utf-8"),
+            ).hexdigest(),
+        )
+
+        if not rescan:
+            cached_dirs = LoadCacheFile(cache_filename, _CACHE_VERSION, _DecodeCache) or {}
+
+    # Directories listed this soon after they changed are listed again next time
+    trusted_mtime_ns = time.time_ns() - MTIME_GRANULARITY_NS
+
+    results: List[Path] = []
+    walked_dirs: Dict[str, _DirectoryInfo] = {}
+    visited: Set[Tuple[int, int]] = set()
+    lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def ShouldVisit(
+        key: Tuple[int, int],
+    ) -> bool:
+        with lock:
+            if key in visited:
+                return False
+
+            visited.add(key)
+            return True
+
+    # ----------------------------------------------------------------------
+    def ListDirectory(
+        directory: str,
+    ) -> Optional[_DirectoryInfo]:
+        try:
+            # Before listing, so that changes made while listing are seen next time
+            mtime_ns = os.stat(directory).st_mtime_ns if use_cache else 0
+
+            it = os.scandir(directory)
+        except OSError:
+            # Removed since it was listed, or not readable (as with os.walk, errors are ignored)
+            return None
+
+        has_target = False
+        subdirs: List[Tuple[str, int, int]] = []
+
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                except OSError:
+                    continue
+
+                if entry.name == first_part and is_dir == (remaining_path is not None):
+                    has_target = True
+
+                if not is_dir or any(fnmatch.fnmatch(entry.name, pattern) for pattern in prune_patterns):
+                    continue
+
+                # Neither the inode from the listing nor the parent's device identifies a mount
+                # point or a symlink's target, so each directory is identified by its own stat
+                key = _GetDirectoryKey(entry.path)
+                if key is None:
+                    continue
+
+                subdirs.append((entry.name, *key))
+
+        return mtime_ns, has_target, subdirs
+
+    # ----------------------------------------------------------------------
+    def ProcessDirectory(
+        directory: str,
+        enqueue_func: Callable[[str], None],
+    ) -> None:
+        info = cached_dirs.get(directory)
+
+        if info is not None:
+            try:
+                if os.stat(directory).st_mtime_ns != info[0]:
+                    info = None
+            except OSError:
+                return
+
+        if info is None:
+            info = ListDirectory(directory)
+            if info is None:
+                return
+
+        mtime_ns, has_target, subdirs = info
+
+        if has_target:
+            if remaining_path is None:
+                found = os.path.join(directory, first_part)
+            else:
+                # The directory that contains the file isn't listed, so this is checked every time
+                found = os.path.join(directory, first_part, remaining_path)
+                if not os.path.isfile(found):
+                    found = None
+
+            if found is not None:
+                with lock:
+                    results.append(Path(found))
+
+        if use_cache:
+            with lock:
+                walked_dirs[directory] = (mtime_ns if mtime_ns < trusted_mtime_ns else -1, has_target, subdirs)
+
+        for name, device, inode in subdirs:
+            if ShouldVisit((device, inode)):
+                enqueue_func(os.path.join(directory, name))
+
+    # ----------------------------------------------------------------------
+
+    root_key = _GetDirectoryKey(str(root))
+    if root_key is None:
+        raise FileNotFoundError("'{}' does not exist.".format(root))
+
+    visited.add(root_key)
+
+    _Execute(str(root), ProcessDirectory, num_threads)
+
+    if cache_filename is not None:
+        SaveCacheFile(cache_filename, _CACHE_VERSION, {"directories": walked_dirs})
+
+    return sorted(results)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# (mtime_ns, contains the first component of the target, [(subdir name, device, inode), ...])
+_DirectoryInfo                              = Tuple[int, bool, List[Tuple[str, int, int]]]
+
+_CACHE_VERSION                              = 2
+
+
+# ----------------------------------------------------------------------
+def _GetDirectoryKey(
+    path: str,
+) -> Optional[Tuple[int, int]]:
+    """Returns the (device, inode) of the directory at `path`, following symlinks."""
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    return st.st_dev, st.st_ino
+
+
+# ----------------------------------------------------------------------
+def _DecodeCache(
+    content: Dict[str, Any],
+) -> Dict[str, _DirectoryInfo]:
+    return {
+        directory: (mtime_ns, has_target, [tuple(subdir) for subdir in subdirs])  # type: ignore
+        for directory, (mtime_ns, has_target, subdirs) in content["directories"].items()
+    }
+
+
+# ----------------------------------------------------------------------
+def _Execute(
+    initial_item: str,
+    process_func: Callable[[str, Callable[[str], None]], None],
+    num_threads: int,
+) -> None:
+    """Invokes `process_func` for `initial_item` and every item that it enqueues, using `num_threads` threads."""
+
+    if num_threads == 1:
+        items = [initial_item]
+
+        while items:
+            process_func(items.pop(), items.append)
+
+        return
+
+    work: queue.Queue = queue.Queue()
+    errors: List[BaseException] = []
+
+    # ----------------------------------------------------------------------
+    def Worker() -> None:
+        while True:
+            item = work.get()
+
+            try:
+                if item is None:
+                    return
+
+                # Once something failed, drain the queue without doing any more work
+                if not errors:
+                    process_func(item, work.put)
+
+            except BaseException as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+            finally:
+                work.task_done()
+
+    # ----------------------------------------------------------------------
+
+    threads = [threading.Thread(target=Worker, daemon=True) for _ in range(num_threads)]
+
+    for thread in threads:
+        thread.start()
+
+    work.put(initial_item)
+    work.join()
+
+    for _ in threads:
+        work.put(None)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
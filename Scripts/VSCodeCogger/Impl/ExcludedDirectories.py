@@ -0,0 +1,54 @@
+# ----------------------------------------------------------------------
+# |
+# |  ExcludedDirectories.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Directories that are never searched for launch.json files or tests, nor watched."""
+
+import fnmatch
+import os
+
+from pathlib import Path
+from typing import Iterator
+
+
+# ----------------------------------------------------------------------
+# fnmatch-style patterns matched against directory names
+EXCLUDED_DIRECTORIES                        = [
+    ".git",
+    ".hg",
+    ".svn",
+    "__pycache__",
+    "node_modules",
+]
+
+
+# ----------------------------------------------------------------------
+def IsExcluded(
+    name: str,
+) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in EXCLUDED_DIRECTORIES)
+
+
+# ----------------------------------------------------------------------
+def EnumDirectories(
+    root: Path,
+) -> Iterator[Path]:
+    """\
+    Yields `root` and the directories within it, in the order of a sorted, top-down walk. Excluded
+    directories and links to directories aren't descended into.
+    """
+
+    for directory, dirnames, _ in os.walk(root):
+        dirnames[:] = sorted(dirname for dirname in dirnames if not IsExcluded(dirname))
+
+        yield Path(directory)
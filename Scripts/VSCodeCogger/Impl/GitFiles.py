@@ -0,0 +1,80 @@
+# ----------------------------------------------------------------------
+# |
+# |  GitFiles.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Enumerates the files in a git work tree from its index, rather than by walking the file system."""
+
+import os
+import subprocess
+
+from pathlib import Path
+from typing import List, Optional
+
+
+# ----------------------------------------------------------------------
+def EnumFiles(
+    directory: Path,
+) -> Optional[List[str]]:
+    """\
+    Returns the sorted paths (relative to `directory`, with '/' separators) of the files within
+    `directory` that are tracked by git or untracked but not ignored, or None if `directory` isn't
+    within a git work tree (or git isn't available).
+
+    Only the local repository is used (`git ls-files` reads the index and lists untracked files
+    with the ignore rules), so this works offline. Tracked files deleted from the work tree are
+    still listed, and the contents of submodules are not.
+    """
+
+    env = dict(os.environ)
+
+    # Never take the index lock, as cog may run while other git commands are running
+    env["GIT_OPTIONAL_LOCKS"] = "0"
+
+    try:
+        result = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=directory,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+        )
+    except OSError:
+        return None
+
+    if result.returncode != 0:
+        return None
+
+    # With `-z`, paths aren't quoted; the index has a path more than once during merges
+    return sorted(set(os.fsdecode(path) for path in result.stdout.split(b"\0") if path))
+
+
+# ----------------------------------------------------------------------
+def GetIndexFilename(
+    directory: Path,
+) -> Optional[Path]:
+    """Returns the index file of the work tree that contains `directory`, or None."""
+
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--absolute-git-dir"],
+            cwd=directory,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+        )
+    except OSError:
+        return None
+
+    if result.returncode != 0:
+        return None
+
+    return Path(os.fsdecode(result.stdout.strip())) / "index"
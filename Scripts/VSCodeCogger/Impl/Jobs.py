@@ -0,0 +1,48 @@
+# ----------------------------------------------------------------------
+# |
+# |  Jobs.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Number of concurrent jobs, as configured by environment variables."""
+
+import os
+
+
+# ----------------------------------------------------------------------
+def GetNumJobs(
+    env_var: str,
+    default: int,
+) -> int:
+    """\
+    Returns the number of jobs in the environment variable (or `default` when it isn't defined),
+    where 0 is the number of CPUs.
+    """
+
+    value = os.environ.get(env_var, None)
+
+    if not value:
+        num_jobs = default
+    else:
+        try:
+            num_jobs = int(value)
+            if num_jobs < 0:
+                raise ValueError()
+
+        except ValueError:
+            raise Exception(
+                "'{}' must be a non-negative number of jobs ('{}' was provided).".format(env_var, value),
+            )
+
+    if num_jobs == 0:
+        num_jobs = os.cpu_count() or 1
+
+    return num_jobs
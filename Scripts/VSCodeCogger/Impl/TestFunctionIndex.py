@@ -0,0 +1,279 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestFunctionIndex.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Test classes and functions defined by test files, found with `ast` and cached on disk."""
+
+import ast
+import hashlib
+import json
+import os
+import sqlite3
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from Impl import CacheDatabase
+from Impl.Jobs import GetNumJobs
+
+
+# ----------------------------------------------------------------------
+# The number of processes that parse the files that changed (0, the default, for the number of
+# CPUs); set to "1" to parse them in this process.
+JOBS_ENV_VAR                                = "VSCODE_COGGER_TEST_INDEX_JOBS"
+
+
+# ----------------------------------------------------------------------
+class TestClass(NamedTuple):
+    name: str
+    is_test_case: bool                      # Derives from a class named '*TestCase'
+    has_init: bool                          # Defines `__init__`
+    methods: List[str]                      # Methods named 'test*', in the order defined
+
+
+# ----------------------------------------------------------------------
+class TestItems(NamedTuple):
+    classes: List[TestClass]
+    functions: List[str]                    # Module-level functions named 'test*', in the order defined
+
+
+# ----------------------------------------------------------------------
+def GetTestItems(
+    filenames: List[Path],
+    roots: Iterable[Path]=(),
+    *,
+    recursive: bool=True,
+) -> List[Optional[TestItems]]:
+    """\
+    Returns the test classes and functions defined by each file (None if it can't be read or
+    parsed), in the order of `filenames`.
+
+    Results are saved in a sqlite database in the cache directory along with the file's
+    modification time, size and hash. Files whose modification time and size haven't changed
+    aren't read; files that changed are read and hashed, and only parsed when their content
+    changed. Files are parsed by a pool of processes when there are enough of them.
+
+    When `roots` are provided, `filenames` are all of the tests within them (or directly within
+    them, when not `recursive`) and the results for other files in them are forgotten.
+    """
+
+    from Impl.cogapp.dependencies import notePath
+
+    # The results depend on the content of the files, which aren't read when the results are cached
+    for filename in filenames:
+        notePath(filename)
+
+    connection = _Connect()
+
+    try:
+        cached = _Query(connection, filenames)
+
+        results: List[Optional[TestItems]] = []
+        pending: List[Tuple[int, Tuple[int, int], Path, Optional[str]]] = []
+
+        for filename in filenames:
+            try:
+                st = os.stat(filename)
+            except OSError:
+                results.append(None)
+                continue
+
+            signature = (st.st_mtime_ns, st.st_size)
+            row = cached.get(str(filename))
+
+            if row is not None and row[:2] == signature:
+                results.append(_Decode(row[3]))
+                continue
+
+            pending.append((len(results), signature, filename, None if row is None else row[2]))
+            results.append(None)
+
+        rows: List[Tuple[str, int, int, str, Optional[str]]] = []
+
+        for (result_index, signature, filename, prev_hash), (content_hash, content) in zip(
+            pending,
+            _IndexFiles([(filename, prev_hash) for _, _, filename, prev_hash in pending]),
+        ):
+            if content_hash is None:
+                # The file couldn't be read; try again next time
+                continue
+
+            if content_hash == prev_hash:
+                # Only the modification time changed (the file was touched, checked out, ...)
+                content = cached[str(filename)][3]
+
+            rows.append((str(filename), signature[0], signature[1], content_hash, content))
+            results[result_index] = _Decode(content)
+
+        with connection:
+            if rows:
+                connection.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?)", rows)
+
+            for root in roots:
+                CacheDatabase.RemoveMissing(connection, "items", root, filenames, recursive=recursive)
+
+    finally:
+        connection.close()
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_SCHEMA_VERSION                             = 1
+
+# Starting processes takes longer than parsing a few files
+_MIN_FILES_PER_PROCESS                      = 100
+
+# sqlite's default limit on the number of variables in a statement is 999
+_QUERY_BATCH_SIZE                           = 500
+
+
+# ----------------------------------------------------------------------
+def _Connect() -> sqlite3.Connection:
+    return CacheDatabase.Connect(
+        "TestFunctionIndex",
+        _SCHEMA_VERSION,
+        """\
+        CREATE TABLE IF NOT EXISTS items (
+            path TEXT NOT NULL PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            content TEXT
+        )
+        """,
+    )
+
+
+# ----------------------------------------------------------------------
+def _Query(
+    connection: sqlite3.Connection,
+    filenames: List[Path],
+) -> Dict[str, Tuple[int, int, str, Optional[str]]]:
+    """Returns the (mtime_ns, size, hash, content) saved for each file."""
+
+    paths = [str(filename) for filename in filenames]
+    results: Dict[str, Tuple[int, int, str, Optional[str]]] = {}
+
+    for index in range(0, len(paths), _QUERY_BATCH_SIZE):
+        batch = paths[index:index + _QUERY_BATCH_SIZE]
+
+        for path, mtime_ns, size, content_hash, content in connection.execute(
+            "SELECT path, mtime_ns, size, hash, content FROM items WHERE path IN ({})".format(
+                ", ".join("?" * len(batch)),
+            ),
+            batch,
+        ):
+            results[path] = (mtime_ns, size, content_hash, content)
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def _IndexFiles(
+    items: List[Tuple[Path, Optional[str]]],
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    num_jobs = min(GetNumJobs(JOBS_ENV_VAR, 0), len(items) // _MIN_FILES_PER_PROCESS)
+
+    if num_jobs < 2:
+        return [_IndexFile(item) for item in items]
+
+    import multiprocessing
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(num_jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(_IndexFile, items, chunksize=max(1, len(items) // (num_jobs * 4))))
+
+
+# ----------------------------------------------------------------------
+def _IndexFile(
+    item: Tuple[Path, Optional[str]],
+) -> Tuple[Optional[str], Optional[str]]:
+    """\
+    Returns the hash of the file's content (None if it can't be read) and the encoded test items (None
+    if the file can't be parsed, or the content is the same as when `item`'s hash was saved).
+    """
+
+    filename, prev_hash = item
+
+    try:
+        with open(filename, "rb") as f:
+            content = f.read()
+    except OSError:
+        return None, None
+
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    if content_hash == prev_hash:
+        return content_hash, None
+
+    try:
+        tree = ast.parse(content, str(filename))
+    except (SyntaxError, ValueError):
+        return content_hash, None
+
+    return content_hash, json.dumps(_Extract(tree))
+
+
+# ----------------------------------------------------------------------
+def _Extract(
+    tree: ast.Module,
+) -> List[Any]:
+    classes: List[Any] = []
+    functions: List[str] = []
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name.startswith("test"):
+                functions.append(node.name)
+
+        elif isinstance(node, ast.ClassDef):
+            is_test_case = False
+
+            for base in node.bases:
+                base_name = base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "")
+
+                if base_name.endswith("TestCase"):
+                    is_test_case = True
+                    break
+
+            has_init = False
+            methods: List[str] = []
+
+            for child in node.body:
+                if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    continue
+
+                if child.name == "__init__":
+                    has_init = True
+                elif child.name.startswith("test"):
+                    methods.append(child.name)
+
+            classes.append([node.name, is_test_case, has_init, methods])
+
+    return [classes, functions]
+
+
+# ----------------------------------------------------------------------
+def _Decode(
+    content: Optional[str],
+) -> Optional[TestItems]:
+    if content is None:
+        return None
+
+    classes, functions = json.loads(content)
+
+    return TestItems([TestClass(*values) for values in classes], functions)
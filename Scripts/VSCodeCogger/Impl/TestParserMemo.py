@@ -0,0 +1,209 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestParserMemo.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Remembers whether test parsers support test files, for as long as neither the file nor the parser changes."""
+
+import contextlib
+import hashlib
+import inspect
+import os
+import sqlite3
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from Impl import CacheDatabase
+
+
+# ----------------------------------------------------------------------
+# Set to "0" to always ask the parsers
+ENABLED_ENV_VAR                             = "VSCODE_COGGER_TEST_PARSER_MEMO"
+
+
+# ----------------------------------------------------------------------
+class TestParserMemo(object):
+    """\
+    Decisions of `IsSupportedTestItem`, keyed by the parser's name and version and the test file's
+    path, modification time and size, stored in a sqlite database in the cache directory.
+    """
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    @contextlib.contextmanager
+    def Open(
+        cls,
+        test_parsers: List[Any],
+    ) -> Iterator[Optional["TestParserMemo"]]:
+        """Yields the memo, or None if it is disabled."""
+
+        if os.environ.get(ENABLED_ENV_VAR, None) == "0":
+            yield None
+            return
+
+        connection = _Connect()
+
+        try:
+            yield cls(connection, test_parsers)
+        finally:
+            connection.close()
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        test_parsers: List[Any],
+    ):
+        self._connection                    = connection
+        self._parser_keys: List[Tuple[str, str]] = [
+            (test_parser.name, GetParserVersion(test_parser))
+            for test_parser in test_parsers
+        ]
+
+    # ----------------------------------------------------------------------
+    def Get(
+        self,
+        filenames: Iterable[Path],
+    ) -> Dict[Path, Tuple[Tuple[int, int], List[Optional[bool]]]]:
+        """\
+        Returns the (mtime_ns, size) of each file that exists, along with the remembered decision of
+        each parser (None when unknown or out of date).
+        """
+
+        results: Dict[Path, Tuple[Tuple[int, int], List[Optional[bool]]]] = {}
+
+        for filename in filenames:
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+
+            signature = (st.st_mtime_ns, st.st_size)
+
+            rows = {
+                parser_name: (version, mtime_ns, size, supported)
+                for parser_name, version, mtime_ns, size, supported in self._connection.execute(
+                    "SELECT parser, version, mtime_ns, size, supported FROM support WHERE path = ?",
+                    (str(filename), ),
+                )
+            }
+
+            decisions: List[Optional[bool]] = []
+
+            for parser_name, version in self._parser_keys:
+                row = rows.get(parser_name)
+
+                if row is None or row[:3] != (version, *signature):
+                    decisions.append(None)
+                else:
+                    decisions.append(bool(row[3]))
+
+            results[filename] = (signature, decisions)
+
+        return results
+
+    # ----------------------------------------------------------------------
+    def Update(
+        self,
+        decisions: Dict[Path, Tuple[Tuple[int, int], List[Optional[bool]]]],
+    ) -> None:
+        """Remembers decisions, where `decisions` is in the form returned by `Get`."""
+
+        rows = [
+            (parser_name, str(filename), version, signature[0], signature[1], int(supported))
+            for filename, (signature, file_decisions) in decisions.items()
+            for (parser_name, version), supported in zip(self._parser_keys, file_decisions)
+            if supported is not None
+        ]
+
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO support VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    # ----------------------------------------------------------------------
+    def RemoveMissing(
+        self,
+        root: Path,
+        filenames: Iterable[Path],
+        *,
+        recursive: bool=True,
+    ) -> None:
+        """\
+        Forgets the files within `root` (or directly within it, when not `recursive`) that aren't in
+        `filenames`, as they were removed (or are no longer tests).
+        """
+
+        with self._connection:
+            CacheDatabase.RemoveMissing(self._connection, "support", root, filenames, recursive=recursive)
+
+
+# ----------------------------------------------------------------------
+def Invalidate() -> None:
+    """Forgets every decision."""
+
+    connection = _Connect()
+
+    try:
+        with connection:
+            connection.execute("DELETE FROM support")
+    finally:
+        connection.close()
+
+
+# ----------------------------------------------------------------------
+def GetParserVersion(
+    test_parser: Any,
+) -> str:
+    """\
+    Returns a string that changes when the parser changes: the parser's `version` when it has one,
+    and otherwise the state of the file that defines it.
+    """
+
+    version = getattr(test_parser, "version", None)
+    if version is not None:
+        return str(version)
+
+    try:
+        filename = inspect.getfile(type(test_parser))
+        st = os.stat(filename)
+    except (TypeError, OSError):
+        # Without a version, decisions can't be reused safely
+        return "unknown:{}".format(id(test_parser))
+
+    return hashlib.sha256(
+        "{}|{}|{}".format(os.path.realpath(filename), st.st_mtime_ns, st.st_size).encode("utf-8"),
+    ).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_SCHEMA_VERSION                             = 1
+
+
+# ----------------------------------------------------------------------
+def _Connect() -> sqlite3.Connection:
+    return CacheDatabase.Connect(
+        "TestParserMemo",
+        _SCHEMA_VERSION,
+        """\
+        CREATE TABLE IF NOT EXISTS support (
+            parser TEXT NOT NULL,
+            path TEXT NOT NULL,
+            version TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            supported INTEGER NOT NULL,
+            PRIMARY KEY (parser, path)
+        )
+        """,
+    )
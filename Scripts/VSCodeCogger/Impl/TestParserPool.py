@@ -0,0 +1,269 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestParserPool.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Finds the test parser that supports each of many test files, optionally with a pool of threads or processes."""
+
+import os
+
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+# ----------------------------------------------------------------------
+# The number of threads or processes used (0 for the number of CPUs); files are classified serially
+# when this isn't defined.
+JOBS_ENV_VAR                                = "VSCODE_COGGER_TEST_PARSER_JOBS"
+
+# Test parsers may provide `IsSupportedTestItems(filenames: List[Path]) -> List[bool]`, which is
+# called rather than `IsSupportedTestItem(filename: Path) -> bool` for each file, so that parsers
+# can read files in bulk and amortize their setup.
+BATCH_METHOD_NAME                           = "IsSupportedTestItems"
+
+# "thread" (the default) or "process"; processes help when the parsers are CPU-bound python code,
+# and require the parsers to be enumerated from an environment variable (so that each process can
+# create them).
+POOL_ENV_VAR                                = "VSCODE_COGGER_TEST_PARSER_POOL"
+
+
+# ----------------------------------------------------------------------
+def GetSupportingParsers(
+    filenames: List[Path],
+    test_parsers: List[Any],
+    plugins_env_var: str,
+    roots: Iterable[Path]=(),
+    *,
+    recursive: bool=True,
+) -> List[Optional[Any]]:
+    """\
+    Returns the first of `test_parsers` that supports each filename (or None), in the order of
+    `filenames`. Each parser is asked about all of the files that it needs to decide at once when it
+    provides `IsSupportedTestItems`, and about each file otherwise.
+
+    `test_parsers` are created from the plugins enumerated from `plugins_env_var`; in process pools,
+    each process creates its own parsers in the same way.
+
+    Decisions are remembered (see `TestParserMemo`), so parsers are only asked about files that
+    changed since they were last asked. When `roots` are provided, `filenames` are all of the tests
+    within them (or directly within them, when not `recursive`) and the decisions for other files
+    in them are forgotten.
+    """
+
+    from Impl.cogapp.dependencies import notePath
+    from Impl.TestParserMemo import TestParserMemo
+
+    # The parsers inspect the test files, but they aren't read when the decisions are remembered
+    # (or when they are read by other processes); record them as dependencies of the generator
+    for filename in filenames:
+        notePath(filename)
+
+    with TestParserMemo.Open(test_parsers) as memo:
+        if memo is None:
+            known = {}
+        else:
+            known = memo.Get(filenames)
+
+            for root in roots:
+                memo.RemoveMissing(root, filenames, recursive=recursive)
+
+        results: List[Optional[int]] = []
+        pending: List[Tuple[int, Path, List[Optional[bool]]]] = []
+
+        for filename in filenames:
+            decisions = known[filename][1] if filename in known else [None] * len(test_parsers)
+
+            is_resolved, index = _Resolve(decisions)
+
+            if not is_resolved:
+                pending.append((len(results), filename, decisions))
+
+            results.append(index)
+
+        classified = _Classify(
+            test_parsers,
+            plugins_env_var,
+            [(filename, decisions) for _, filename, decisions in pending],
+        )
+
+        for (result_index, filename, _), (index, decisions) in zip(pending, classified):
+            results[result_index] = index
+
+            if filename in known:
+                known[filename] = (known[filename][0], decisions)
+
+        if memo is not None and pending:
+            memo.Update(
+                {
+                    filename: known[filename]
+                    for _, filename, _ in pending
+                    if filename in known
+                },
+            )
+
+    return [None if index is None else test_parsers[index] for index in results]
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_worker_test_parsers: List[Any]             = []
+
+# (filename, decision of each parser (None if unknown))
+_WorkItem                                   = Tuple[Path, List[Optional[bool]]]
+
+# (index of the supporting parser (or None), decision of each parser)
+_WorkResult                                 = Tuple[Optional[int], List[Optional[bool]]]
+
+
+# ----------------------------------------------------------------------
+def _Classify(
+    test_parsers: List[Any],
+    plugins_env_var: str,
+    items: List[_WorkItem],
+) -> List[_WorkResult]:
+    num_jobs, use_processes = _GetOptions()
+
+    if num_jobs < 2 or len(items) < 2:
+        return _ClassifyChunk(test_parsers, items)
+
+    # The files are classified in chunks (a few per job, to balance the load), so that batch calls
+    # remain large
+    chunk_size = max(1, -(-len(items) // (num_jobs * 4)))
+    chunks = [items[index:index + chunk_size] for index in range(0, len(items), chunk_size)]
+
+    if not use_processes:
+        import contextvars
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Each chunk is classified in a copy of this context, so that cog records the files read by
+        # the parsers as dependencies of the generator (as it does in the serial case).
+        contexts = [contextvars.copy_context() for _ in chunks]
+
+        with ThreadPoolExecutor(num_jobs) as executor:
+            chunk_results = list(
+                executor.map(
+                    lambda chunk, context: context.run(_ClassifyChunk, test_parsers, chunk),
+                    chunks,
+                    contexts,
+                ),
+            )
+
+    else:
+        import multiprocessing
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            num_jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_InitializeWorker,
+            initargs=(plugins_env_var, ),
+        ) as executor:
+            chunk_results = list(executor.map(_ClassifyWorkerChunk, chunks))
+
+    return [result for results in chunk_results for result in results]
+
+
+# ----------------------------------------------------------------------
+def _GetOptions() -> Tuple[int, bool]:
+    from Impl.Jobs import GetNumJobs
+
+    num_jobs = GetNumJobs(JOBS_ENV_VAR, 1)
+
+    pool = os.environ.get(POOL_ENV_VAR, None) or "thread"
+
+    if pool not in ["thread", "process"]:
+        raise Exception(
+            "'{}' must be 'thread' or 'process' ('{}' was provided).".format(POOL_ENV_VAR, pool),
+        )
+
+    return num_jobs, pool == "process"
+
+
+# ----------------------------------------------------------------------
+def _Resolve(
+    decisions: List[Optional[bool]],
+) -> Tuple[bool, Optional[int]]:
+    """Returns (True, index of the supporting parser or None) if the decisions are enough to know it."""
+
+    for index, decision in enumerate(decisions):
+        if decision is None:
+            return False, None
+
+        if decision:
+            return True, index
+
+    return True, None
+
+
+# ----------------------------------------------------------------------
+def _ClassifyChunk(
+    test_parsers: List[Any],
+    items: List[_WorkItem],
+) -> List[_WorkResult]:
+    """Asks each parser in turn about the files that aren't supported by an earlier parser."""
+
+    all_decisions = [list(decisions) for _, decisions in items]
+
+    for parser_index, test_parser in enumerate(test_parsers):
+        pending = [
+            item_index
+            for item_index, decisions in enumerate(all_decisions)
+            if decisions[parser_index] is None and not _Resolve(decisions)[0]
+        ]
+
+        if not pending:
+            continue
+
+        filenames = [items[item_index][0] for item_index in pending]
+
+        batch_func = getattr(test_parser, BATCH_METHOD_NAME, None)
+
+        if batch_func is not None:
+            results = list(batch_func(filenames))
+
+            if len(results) != len(filenames):
+                raise Exception(
+                    "'{}.{}' returned {} results for {} files.".format(
+                        test_parser.name,
+                        BATCH_METHOD_NAME,
+                        len(results),
+                        len(filenames),
+                    ),
+                )
+        else:
+            results = [test_parser.IsSupportedTestItem(filename) for filename in filenames]
+
+        for item_index, result in zip(pending, results):
+            all_decisions[item_index][parser_index] = bool(result)
+
+    return [(_Resolve(decisions)[1], decisions) for decisions in all_decisions]
+
+
+# ----------------------------------------------------------------------
+def _InitializeWorker(
+    plugins_env_var: str,
+) -> None:
+    from Impl.TestParsers import GetTestParsers
+
+    global _worker_test_parsers  # pylint: disable=global-statement
+
+    _worker_test_parsers = GetTestParsers(plugins_env_var)
+
+
+# ----------------------------------------------------------------------
+def _ClassifyWorkerChunk(
+    items: List[_WorkItem],
+) -> List[_WorkResult]:
+    return _ClassifyChunk(_worker_test_parsers, items)
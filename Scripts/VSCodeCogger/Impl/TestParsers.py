@@ -0,0 +1,193 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestParsers.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Test parser plugins, loaded once per process and located through an on-disk manifest."""
+
+import hashlib
+import importlib.util
+import os
+import sys
+import threading
+
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ----------------------------------------------------------------------
+def GetTestParsers(
+    plugins_env_var: str,
+) -> List[Any]:
+    """\
+    Returns a `TestParser` instance from each plugin enumerated from `plugins_env_var`.
+
+    The parsers are created once per process (and value of the environment variable) and shared by
+    every caller, so they must not keep per-call state. They are created again when a plugin's file
+    or the file named by the environment variable (which may list the plugins) changes, so that
+    long-running processes see those changes.
+
+    The modules found by `DynamicPluginArchitecture.EnumeratePlugins` are saved in a manifest keyed
+    by the environment variable's value, so that later processes load them directly.
+    """
+
+    value = os.environ.get(plugins_env_var, "")
+    key = (plugins_env_var, value)
+
+    # The modification time and size of the file that the value names, if any; the same signatures
+    # are saved in the manifest
+    source_signature = _GetSignatures([value])[0] if value else None
+
+    with _cache_lock:
+        cached = _cache.get(key)
+
+        if cached is not None:
+            if (
+                cached[0] == source_signature
+                and _GetSignatures([filename for _, filename in cached[1]]) == cached[2]
+            ):
+                return cached[3]
+
+            # The plugins (or the list of them) changed; load the modules again
+            for name, _ in cached[1]:
+                sys.modules.pop(name, None)
+
+        modules = _LoadModules(plugins_env_var, value, source_signature)
+
+        module_infos = [(mod.__name__, getattr(mod, "__file__", None) or "") for mod in modules]
+        test_parsers = [mod.TestParser() for mod in modules]
+
+        _cache[key] = (
+            source_signature,
+            module_infos,
+            _GetSignatures([filename for _, filename in module_infos]),
+            test_parsers,
+        )
+
+        return test_parsers
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_MANIFEST_VERSION                           = 1
+
+_cache_lock                                 = threading.Lock()
+
+# (env var name, value) -> (source signature, [(module name, filename), ...], signatures, test parsers)
+_cache: Dict[
+    Tuple[str, str],
+    Tuple[Optional[List[int]], List[Tuple[str, str]], List[Optional[List[int]]], List[Any]],
+] = {}
+
+
+# ----------------------------------------------------------------------
+def _GetSignatures(
+    filenames: List[str],
+) -> List[Optional[List[int]]]:
+    results: List[Optional[List[int]]] = []
+
+    for filename in filenames:
+        try:
+            st = os.stat(filename)
+        except OSError:
+            results.append(None)
+            continue
+
+        results.append([st.st_mtime_ns, st.st_size])
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def _LoadModules(
+    plugins_env_var: str,
+    value: str,
+    source_signature: Optional[List[int]],
+) -> List[ModuleType]:
+    from Impl.CacheDirectory import LoadCacheFile, SaveCacheFile
+
+    # The value may name a file that lists the plugins; its changes invalidate the manifest too
+    manifest_filename = _GetManifestFilename(plugins_env_var, value)
+
+    manifest = LoadCacheFile(manifest_filename, _MANIFEST_VERSION, lambda content: content)
+
+    try:
+        if (
+            manifest is not None
+            and manifest["source"] == source_signature
+            and all(
+                signature is not None
+                for signature in _GetSignatures([filename for _, filename in manifest["modules"]])
+            )
+        ):
+            return [_LoadModule(name, filename) for name, filename in manifest["modules"]]
+
+    except Exception:  # pylint: disable=broad-except
+        # An invalid manifest, or plugins that need something that discovery does
+        pass
+
+    from Common_Foundation import DynamicPluginArchitecture
+
+    modules = list(DynamicPluginArchitecture.EnumeratePlugins(plugins_env_var))
+
+    if all(getattr(mod, "__file__", None) for mod in modules):
+        SaveCacheFile(
+            manifest_filename,
+            _MANIFEST_VERSION,
+            {
+                "source": source_signature,
+                "modules": [[mod.__name__, os.path.realpath(mod.__file__)] for mod in modules],
+            },
+        )
+
+    return modules
+
+
+# ----------------------------------------------------------------------
+def _GetManifestFilename(
+    plugins_env_var: str,
+    value: str,
+) -> Path:
+    from Impl.CacheDirectory import GetCacheDirectory
+
+    return GetCacheDirectory("PluginManifests") / "{}.json".format(
+        hashlib.sha256("{}\0{}".format(plugins_env_var, value).encode("utf-8")).hexdigest(),
+    )
+
+
+# ----------------------------------------------------------------------
+def _LoadModule(
+    name: str,
+    filename: str,
+) -> ModuleType:
+    module = sys.modules.get(name)
+
+    if module is not None and os.path.realpath(getattr(module, "__file__", None) or "") == filename:
+        return module
+
+    spec = importlib.util.spec_from_file_location(name, filename)
+    assert spec is not None and spec.loader is not None, filename
+
+    module = importlib.util.module_from_spec(spec)
+
+    # Registered before it is executed, as the import system does
+    sys.modules[name] = module
+
+    try:
+        spec.loader.exec_module(module)
+    except:
+        del sys.modules[name]
+        raise
+
+    return module
@@ -0,0 +1,80 @@
+# ----------------------------------------------------------------------
+# |
+# |  CacheDatabase_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for CacheDatabase.py"""
+
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl import CacheDatabase              # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def connection(tmp_path, monkeypatch):
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+
+    connection = CacheDatabase.Connect(
+        "Test",
+        3,
+        "CREATE TABLE IF NOT EXISTS files (path TEXT NOT NULL PRIMARY KEY)",
+    )
+
+    yield connection
+
+    connection.close()
+
+
+# ----------------------------------------------------------------------
+def _GetPaths(connection):
+    return sorted(path for (path, ) in connection.execute("SELECT path FROM files"))
+
+
+# ----------------------------------------------------------------------
+def test_Connect(connection, tmp_path):
+    assert (tmp_path / "Cache" / "Test" / "Test.v3.db").is_file()
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal", )
+
+
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("recursive", [True, False])
+def test_RemoveMissing(connection, tmp_path, recursive):
+    root = tmp_path / "Root_%"
+
+    paths = [
+        root / "Kept.py",
+        root / "Removed.py",
+        root / "Nested" / "Removed.py",
+        tmp_path / "Root_%Other" / "Outside.py",
+        tmp_path / "RootX%" / "Outside.py",
+    ]
+
+    with connection:
+        connection.executemany("INSERT INTO files VALUES (?)", [(str(path), ) for path in paths])
+
+    with connection:
+        CacheDatabase.RemoveMissing(connection, "files", root, [root / "Kept.py"], recursive=recursive)
+
+    expected = [paths[0], paths[3], paths[4]]
+
+    if not recursive:
+        expected.append(paths[2])
+
+    # '_' and '%' in the root are matched literally
+    assert _GetPaths(connection) == sorted(str(path) for path in expected)
@@ -0,0 +1,61 @@
+# ----------------------------------------------------------------------
+# |
+# |  CacheDirectory_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for CacheDirectory.py"""
+
+import sys
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl.CacheDirectory import GetCacheDirectory, LoadCacheFile, SaveCacheFile  # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+def test_GetCacheDirectory(tmp_path, monkeypatch):
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+
+    assert GetCacheDirectory("One", "Two") == tmp_path / "Cache" / "One" / "Two"
+    assert (tmp_path / "Cache" / "One" / "Two").is_dir()
+
+
+# ----------------------------------------------------------------------
+def test_SaveAndLoad(tmp_path):
+    filename = tmp_path / "Cache.json"
+
+    SaveCacheFile(filename, 3, {"items": [1, 2]})
+
+    assert LoadCacheFile(filename, 3, lambda content: content["items"]) == [1, 2]
+    assert [path.name for path in tmp_path.iterdir()] == ["Cache.json"]
+
+
+# ----------------------------------------------------------------------
+def test_LoadInvalid(tmp_path):
+    filename = tmp_path / "Cache.json"
+
+    # Missing
+    assert LoadCacheFile(filename, 3, lambda content: content) is None
+
+    # Another version
+    SaveCacheFile(filename, 2, {"items": [1, 2]})
+    assert LoadCacheFile(filename, 3, lambda content: content["items"]) is None
+
+    # Content that can't be decoded
+    SaveCacheFile(filename, 3, {"other": [1, 2]})
+    assert LoadCacheFile(filename, 3, lambda content: content["items"]) is None
+
+    # Not JSON
+    filename.write_text("{")
+    assert LoadCacheFile(filename, 3, lambda content: content) is None
@@ -0,0 +1,140 @@
+# ----------------------------------------------------------------------
+# |
+# |  Daemon_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for Daemon.py"""
+
+import io
+import os
+import stat
+import subprocess
+import sys
+import textwrap
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl import Daemon                     # pylint: disable=wrong-import-position
+
+
+pytestmark = pytest.mark.skipif(not Daemon.IsSupported(), reason="Unix domain sockets are not supported")
+
+
+# ----------------------------------------------------------------------
+_SERVER_SCRIPT                              = textwrap.dedent(
+    """\
+    import os
+    import sys
+
+    from pathlib import Path
+
+    sys.path.insert(0, {root!r})
+
+    from Impl import Daemon
+
+    def Execute(args):
+        sys.stdout.write("{{}}|{{}}|{{}}\\n".format(" ".join(args), os.getcwd(), os.environ.get("DAEMON_TEST_VALUE")))
+        return 3
+
+    if sys.argv[2] == "other_user":
+        Daemon._GetPeerUid = lambda sock: os.getuid() + 1
+
+    Daemon.Serve(Path(sys.argv[1]), Execute, lambda: print("ready", flush=True))
+    """,
+).format(root=str(Path(__file__).parent.parent.parent))
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def server(tmp_path):
+    processes = []
+
+    # ----------------------------------------------------------------------
+    def Start(
+        peer: str="same_user",
+    ) -> Path:
+        socket_path = tmp_path / "Private" / "Test.sock"
+
+        process = subprocess.Popen(
+            [sys.executable, "-c", _SERVER_SCRIPT, str(socket_path), peer],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+        processes.append(process)
+
+        assert process.stdout is not None
+        assert process.stdout.readline().strip() == "ready"
+
+        return socket_path
+
+    # ----------------------------------------------------------------------
+
+    yield Start
+
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+# ----------------------------------------------------------------------
+def test_NoServer(tmp_path):
+    assert Daemon.Client(tmp_path / "Missing.sock", ["Anything"], io.StringIO()) is None
+
+
+# ----------------------------------------------------------------------
+def test_Request(server, tmp_path, monkeypatch):
+    socket_path = server()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DAEMON_TEST_VALUE", "the value")
+
+    output = io.StringIO()
+
+    assert Daemon.Client(socket_path, ["One", "Two"], output) == 3
+    assert output.getvalue() == "One Two|{}|the value\n".format(tmp_path)
+
+
+# ----------------------------------------------------------------------
+def test_Permissions(server):
+    socket_path = server()
+
+    assert stat.S_IMODE(os.stat(socket_path.parent).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) & 0o077 == 0
+
+
+# ----------------------------------------------------------------------
+def test_OtherUsersAreRefused(server):
+    socket_path = server("other_user")
+
+    output = io.StringIO()
+
+    with pytest.raises(Exception, match="closed the connection"):
+        Daemon.Client(socket_path, ["One"], output)
+
+    assert output.getvalue() == ""
+
+
+# ----------------------------------------------------------------------
+def test_SharedDirectory(tmp_path):
+    shared_dir = tmp_path / "Shared"
+    shared_dir.mkdir()
+    os.chmod(shared_dir, 0o777)
+
+    with pytest.raises(Exception, match="must not be writable by other users"):
+        Daemon.Serve(shared_dir / "Test.sock", lambda args: 0)
+
+    assert not (shared_dir / "Test.sock").exists()
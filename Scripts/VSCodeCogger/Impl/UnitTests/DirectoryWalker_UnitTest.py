@@ -0,0 +1,113 @@
+# ----------------------------------------------------------------------
+# |
+# |  DirectoryWalker_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for DirectoryWalker.py"""
+
+import os
+import sys
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl import DirectoryWalker            # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+
+    root = tmp_path / "Root"
+
+    for directory in ["One/Mount", "Two/Other"]:
+        (root / directory).mkdir(parents=True)
+        (root / directory / "launch.json").write_text("")
+
+    return root.resolve()
+
+
+# ----------------------------------------------------------------------
+def _FakeKeys(
+    monkeypatch,
+    fake_keys: Dict[Path, Tuple[int, int]],
+) -> None:
+    get_directory_key = DirectoryWalker._GetDirectoryKey  # pylint: disable=protected-access
+
+    # ----------------------------------------------------------------------
+    def GetDirectoryKey(
+        path: str,
+    ) -> Optional[Tuple[int, int]]:
+        return fake_keys.get(Path(path)) or get_directory_key(path)
+
+    # ----------------------------------------------------------------------
+
+    monkeypatch.setattr(DirectoryWalker, "_GetDirectoryKey", GetDirectoryKey)
+
+
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("num_threads", [1, 4])
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_Find(tree, num_threads, use_cache):
+    (tree / "One" / "__pycache__").mkdir()
+    (tree / "One" / "__pycache__" / "launch.json").write_text("")
+
+    expected = [
+        tree / "One" / "Mount" / "launch.json",
+        tree / "Two" / "Other" / "launch.json",
+    ]
+
+    for _ in range(2):
+        assert DirectoryWalker.FindFiles(
+            tree,
+            "launch.json",
+            num_threads=num_threads,
+            use_cache=use_cache,
+        ) == expected
+
+
+# ----------------------------------------------------------------------
+def test_MountPointInodeCollision(tree, monkeypatch):
+    # A file system mounted at 'One/Mount' whose root has the same inode as 'Two/Other' (inodes are
+    # only unique within a device)
+    other_stat = os.stat(tree / "Two" / "Other")
+
+    _FakeKeys(monkeypatch, {tree / "One" / "Mount": (other_stat.st_dev + 1, other_stat.st_ino)})
+
+    assert DirectoryWalker.FindFiles(tree, "launch.json", num_threads=1) == [
+        tree / "One" / "Mount" / "launch.json",
+        tree / "Two" / "Other" / "launch.json",
+    ]
+
+
+# ----------------------------------------------------------------------
+def test_SameDirectory(tree, monkeypatch):
+    # Directories with the same device and inode are the same directory, so it is only listed once
+    other_stat = os.stat(tree / "Two" / "Other")
+
+    _FakeKeys(monkeypatch, {tree / "One" / "Mount": (other_stat.st_dev, other_stat.st_ino)})
+
+    assert len(DirectoryWalker.FindFiles(tree, "launch.json", num_threads=1)) == 1
+
+
+# ----------------------------------------------------------------------
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks are not supported")
+def test_SymlinkLoop(tree):
+    os.symlink(tree, tree / "One" / "Loop")
+    os.symlink(tree / "Two", tree / "One" / "Alias")
+
+    assert len(DirectoryWalker.FindFiles(tree, "launch.json")) == 2
@@ -0,0 +1,86 @@
+# ----------------------------------------------------------------------
+# |
+# |  ExcludedDirectories_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for ExcludedDirectories.py"""
+
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl.cogapp.snapshot import FileSystemSnapshot                         # pylint: disable=wrong-import-position
+from Impl.DirectoryIndex import FindDirectories                             # pylint: disable=wrong-import-position
+from Impl.DirectoryWalker import FindFiles                                  # pylint: disable=wrong-import-position
+from Impl.ExcludedDirectories import EXCLUDED_DIRECTORIES, EnumDirectories  # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+
+    root = tmp_path / "Root"
+
+    for directory in [
+        "src/UnitTests",
+        "src/__pycache__",
+        "src/node_modules/package/UnitTests",
+        ".git/objects",
+        ".hg",
+        ".svn",
+        "docs/.git",
+        "Tests/IntegrationTests",
+    ]:
+        (root / directory).mkdir(parents=True)
+
+    # Every directory has the file that DirectoryWalker searches for
+    for directory in [root] + [path for path in root.rglob("*") if path.is_dir()]:
+        (directory / "Marker.txt").write_text("")
+
+    return root.resolve()
+
+
+# ----------------------------------------------------------------------
+def test_EnumDirectories(tree):
+    assert list(EnumDirectories(tree)) == [
+        tree,
+        tree / "Tests",
+        tree / "Tests" / "IntegrationTests",
+        tree / "docs",
+        tree / "src",
+        tree / "src" / "UnitTests",
+    ]
+
+
+# ----------------------------------------------------------------------
+def test_SameDirectoriesEverywhere(tree):
+    # Watch
+    expected = [str(directory) for directory in EnumDirectories(tree)]
+
+    # PopulateTests, with and without the index
+    assert [directory for directory, _ in FindDirectories(tree, lambda name: True, exclude=EXCLUDED_DIRECTORIES)] == expected
+    assert [directory for directory, _, _ in FileSystemSnapshot().walk(tree, exclude=EXCLUDED_DIRECTORIES)] == expected
+
+    # UpdateLaunchFiles
+    assert sorted(str(filename.parent) for filename in FindFiles(tree, "Marker.txt")) == sorted(expected)
+
+
+# ----------------------------------------------------------------------
+def test_SameAsEnumSource(tree):
+    EnumSource = pytest.importorskip("Common_Foundation.EnumSource").EnumSource
+
+    assert sorted(Path(directory) for directory, _, _ in EnumSource(tree)) == sorted(EnumDirectories(tree))
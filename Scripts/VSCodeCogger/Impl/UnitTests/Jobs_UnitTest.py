@@ -0,0 +1,59 @@
+# ----------------------------------------------------------------------
+# |
+# |  Jobs_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for Jobs.py"""
+
+import os
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl.Jobs import GetNumJobs            # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+_ENV_VAR                                    = "JOBS_UNIT_TEST_JOBS"
+
+
+# ----------------------------------------------------------------------
+def test_Default(monkeypatch):
+    monkeypatch.delenv(_ENV_VAR, raising=False)
+
+    assert GetNumJobs(_ENV_VAR, 1) == 1
+    assert GetNumJobs(_ENV_VAR, 0) == (os.cpu_count() or 1)
+
+    monkeypatch.setenv(_ENV_VAR, "")
+    assert GetNumJobs(_ENV_VAR, 1) == 1
+
+
+# ----------------------------------------------------------------------
+def test_Value(monkeypatch):
+    monkeypatch.setenv(_ENV_VAR, "3")
+    assert GetNumJobs(_ENV_VAR, 1) == 3
+
+    monkeypatch.setenv(_ENV_VAR, "0")
+    assert GetNumJobs(_ENV_VAR, 1) == (os.cpu_count() or 1)
+
+
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("value", ["-1", "many"])
+def test_Invalid(monkeypatch, value):
+    monkeypatch.setenv(_ENV_VAR, value)
+
+    with pytest.raises(Exception, match="'{}' must be a non-negative number of jobs \\('{}' was provided\\).".format(_ENV_VAR, value)):
+        GetNumJobs(_ENV_VAR, 1)
@@ -0,0 +1,182 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestFunctionIndex_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for TestFunctionIndex.py"""
+
+import os
+import sys
+import textwrap
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+# TestClass and TestItems aren't imported by name, as pytest would try to collect them
+from Impl import TestFunctionIndex          # pylint: disable=wrong-import-position
+from Impl.TestFunctionIndex import GetTestItems  # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+_CONTENT                                    = textwrap.dedent(
+    """\
+    import unittest
+
+    def helper(): pass
+    def test_function(): pass
+    async def test_async_function(): pass
+
+    class TestClass(object):
+        def test_one(self): pass
+        def helper(self): pass
+        def test_two(self): pass
+
+    class TestWithInit(object):
+        def __init__(self): pass
+        def test_one(self): pass
+
+    class Case(unittest.TestCase):
+        def test_one(self): pass
+
+    class OtherCase(BaseTestCase):
+        pass
+    """,
+)
+
+_EXPECTED                                   = TestFunctionIndex.TestItems(
+    [
+        TestFunctionIndex.TestClass("TestClass", False, False, ["test_one", "test_two"]),
+        TestFunctionIndex.TestClass("TestWithInit", False, True, ["test_one"]),
+        TestFunctionIndex.TestClass("Case", True, False, ["test_one"]),
+        TestFunctionIndex.TestClass("OtherCase", True, False, []),
+    ],
+    ["test_function", "test_async_function"],
+)
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def tests_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+    monkeypatch.setenv(TestFunctionIndex.JOBS_ENV_VAR, "1")
+
+    tests_dir = tmp_path / "UnitTests"
+    tests_dir.mkdir()
+
+    return tests_dir
+
+
+# ----------------------------------------------------------------------
+def _Touch(
+    filename: Path,
+) -> None:
+    # An explicit time, so that the tests don't depend on the resolution of the file system's times
+    mtime_ns = os.stat(filename).st_mtime_ns + 10 * 1000 * 1000 * 1000
+    os.utime(filename, ns=(mtime_ns, mtime_ns))
+
+
+# ----------------------------------------------------------------------
+def test_Extract(tests_dir):
+    filename = tests_dir / "One_UnitTest.py"
+    filename.write_text(_CONTENT)
+
+    assert GetTestItems([filename]) == [_EXPECTED]
+
+
+# ----------------------------------------------------------------------
+def test_Invalid(tests_dir):
+    filename = tests_dir / "Invalid_UnitTest.py"
+    filename.write_text("def test_function(:\n")
+
+    assert GetTestItems([filename, tests_dir / "Missing_UnitTest.py"]) == [None, None]
+
+
+# ----------------------------------------------------------------------
+def test_Cached(tests_dir, monkeypatch):
+    filename = tests_dir / "One_UnitTest.py"
+    filename.write_text(_CONTENT)
+
+    assert GetTestItems([filename]) == [_EXPECTED]
+
+    parsed = []
+
+    extract = TestFunctionIndex._Extract  # pylint: disable=protected-access
+    monkeypatch.setattr(TestFunctionIndex, "_Extract", lambda tree: parsed.append(tree) or extract(tree))
+
+    # Unchanged
+    assert GetTestItems([filename]) == [_EXPECTED]
+    assert not parsed
+
+    # Touched, but with the same content
+    _Touch(filename)
+
+    assert GetTestItems([filename]) == [_EXPECTED]
+    assert not parsed
+
+    # Changed
+    filename.write_text("def test_other(): pass\n")
+    _Touch(filename)
+
+    assert GetTestItems([filename]) == [TestFunctionIndex.TestItems([], ["test_other"])]
+    assert len(parsed) == 1
+
+
+# ----------------------------------------------------------------------
+def test_Processes(tests_dir, monkeypatch):
+    monkeypatch.setenv(TestFunctionIndex.JOBS_ENV_VAR, "2")
+    monkeypatch.setattr(TestFunctionIndex, "_MIN_FILES_PER_PROCESS", 2)
+
+    filenames = [tests_dir / "Module{}_UnitTest.py".format(index) for index in range(6)]
+
+    for filename in filenames:
+        filename.write_text(_CONTENT)
+
+    assert GetTestItems(filenames) == [_EXPECTED] * len(filenames)
+
+
+# ----------------------------------------------------------------------
+def test_RemoveMissing(tests_dir, monkeypatch):
+    nested_dir = tests_dir / "Nested"
+    nested_dir.mkdir()
+
+    one = tests_dir / "One_UnitTest.py"
+    two = nested_dir / "Two_UnitTest.py"
+
+    for filename in [one, two]:
+        filename.write_text(_CONTENT)
+
+    GetTestItems([one, two])
+
+    # Forgotten when not within the roots
+    GetTestItems([], [tests_dir], recursive=False)
+
+    parsed = []
+
+    extract = TestFunctionIndex._Extract  # pylint: disable=protected-access
+    monkeypatch.setattr(TestFunctionIndex, "_Extract", lambda tree: parsed.append(tree) or extract(tree))
+
+    assert GetTestItems([one, two]) == [_EXPECTED, _EXPECTED]
+    assert len(parsed) == 1
+
+
+# ----------------------------------------------------------------------
+def test_InvalidJobs(tests_dir, monkeypatch):
+    filename = tests_dir / "One_UnitTest.py"
+    filename.write_text(_CONTENT)
+
+    monkeypatch.setenv(TestFunctionIndex.JOBS_ENV_VAR, "-1")
+
+    with pytest.raises(Exception, match="must be a non-negative number of jobs"):
+        GetTestItems([filename])
@@ -0,0 +1,169 @@
+# ----------------------------------------------------------------------
+# |
+# |  TestParsers_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for TestParsers.py"""
+
+import importlib.util
+import os
+import sys
+import textwrap
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+DynamicPluginArchitecture = pytest.importorskip("Common_Foundation.DynamicPluginArchitecture")
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl import TestParsers                # pylint: disable=wrong-import-position
+
+
+# ----------------------------------------------------------------------
+_ENV_VAR                                    = "TEST_PARSERS_UNIT_TEST_PLUGINS"
+
+
+# ----------------------------------------------------------------------
+@pytest.fixture
+def plugins(tmp_path, monkeypatch):
+    """Returns a function that writes plugins and the file that lists them, which the environment variable names."""
+
+    monkeypatch.setenv("VSCODE_COGGER_CACHE_DIR", str(tmp_path / "Cache"))
+    monkeypatch.setattr(TestParsers, "_cache", {})
+
+    list_filename = tmp_path / "Plugins.txt"
+    monkeypatch.setenv(_ENV_VAR, str(list_filename))
+
+    discovered: List[str] = []
+
+    # ----------------------------------------------------------------------
+    def EnumeratePlugins(
+        plugins_env_var: str,
+    ):
+        assert plugins_env_var == _ENV_VAR
+
+        for filename in Path(os.environ[plugins_env_var]).read_text().split():
+            discovered.append(filename)
+
+            name = "TestParsersUnitTest_{}".format(Path(filename).stem)
+
+            spec = importlib.util.spec_from_file_location(name, filename)
+            assert spec is not None and spec.loader is not None
+
+            mod = importlib.util.module_from_spec(spec)
+            sys.modules[name] = mod
+            spec.loader.exec_module(mod)
+
+            yield mod
+
+    # ----------------------------------------------------------------------
+
+    monkeypatch.setattr(DynamicPluginArchitecture, "EnumeratePlugins", EnumeratePlugins)
+
+    # ----------------------------------------------------------------------
+    def Write(
+        parser_names: List[str],
+        mtime_offset: int=0,
+    ) -> List[str]:
+        filenames: List[str] = []
+
+        for parser_name in parser_names:
+            filename = tmp_path / "{}.py".format(parser_name)
+
+            # Plugins that were already written don't change
+            if not filename.exists():
+                filename.write_text(
+                    textwrap.dedent(
+                        """\
+                        class TestParser(object):
+                            name = {!r}
+                        """,
+                    ).format(parser_name),
+                )
+
+            filenames.append(str(filename))
+
+        list_filename.write_text("\n".join(filenames))
+
+        # An explicit time, so that the tests don't depend on the resolution of the file system's times
+        mtime_ns = os.stat(list_filename).st_mtime_ns + mtime_offset * 1000 * 1000 * 1000
+        os.utime(list_filename, ns=(mtime_ns, mtime_ns))
+
+        return discovered
+
+    # ----------------------------------------------------------------------
+
+    yield Write
+
+    for name in list(sys.modules):
+        if name.startswith("TestParsersUnitTest_"):
+            del sys.modules[name]
+
+
+# ----------------------------------------------------------------------
+def _GetNames() -> List[str]:
+    return [test_parser.name for test_parser in TestParsers.GetTestParsers(_ENV_VAR)]
+
+
+# ----------------------------------------------------------------------
+def test_Shared(plugins):
+    plugins(["One"])
+
+    test_parsers = TestParsers.GetTestParsers(_ENV_VAR)
+
+    assert [test_parser.name for test_parser in test_parsers] == ["One"]
+    assert TestParsers.GetTestParsers(_ENV_VAR) is test_parsers
+
+
+# ----------------------------------------------------------------------
+def test_Manifest(plugins, monkeypatch):
+    discovered = plugins(["One", "Two"])
+
+    assert _GetNames() == ["One", "Two"]
+    assert len(discovered) == 2
+
+    # Another process loads the plugins from the manifest, without discovering them
+    monkeypatch.setattr(TestParsers, "_cache", {})
+
+    assert _GetNames() == ["One", "Two"]
+    assert len(discovered) == 2
+
+
+# ----------------------------------------------------------------------
+def test_PluginListChanged(plugins):
+    discovered = plugins(["One"])
+
+    assert _GetNames() == ["One"]
+
+    plugins(["One", "Two"], mtime_offset=10)
+
+    assert _GetNames() == ["One", "Two"]
+    assert len(discovered) == 3
+
+
+# ----------------------------------------------------------------------
+def test_PluginChanged(plugins, tmp_path):
+    plugins(["One"])
+
+    assert _GetNames() == ["One"]
+
+    # Only the plugin changes
+    filename = tmp_path / "One.py"
+    filename.write_text(filename.read_text().replace("'One'", "'One (changed)'"))
+
+    mtime_ns = os.stat(filename).st_mtime_ns + 10 * 1000 * 1000 * 1000
+    os.utime(filename, ns=(mtime_ns, mtime_ns))
+
+    assert _GetNames() == ["One (changed)"]
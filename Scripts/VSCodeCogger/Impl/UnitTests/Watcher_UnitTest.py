@@ -0,0 +1,292 @@
+# ----------------------------------------------------------------------
+# |
+# |  Watcher_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit tests for Watcher.py"""
+
+import os
+import sys
+
+from pathlib import Path
+from typing import Iterator, List, Optional, Set
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from Impl.Watcher import (                  # pylint: disable=wrong-import-position
+    Change,
+    InotifyWatcher,
+    IsRelevantChange,
+    PollingWatcher,
+    Watch,
+    WatcherBase,
+)
+
+
+# ----------------------------------------------------------------------
+def _EnumDirs(
+    root: Path,
+) -> Iterator[Path]:
+    for directory, _, _ in os.walk(root):
+        yield Path(directory)
+
+
+# ----------------------------------------------------------------------
+def _SetMtime(
+    path: Path,
+    offset_seconds: int,
+) -> None:
+    # Explicit times, so that the tests don't depend on the resolution of the file system's times
+    mtime_ns = os.stat(path).st_mtime_ns + offset_seconds * 1000 * 1000 * 1000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+# ----------------------------------------------------------------------
+class TestIsRelevantChange(object):
+    # ----------------------------------------------------------------------
+    def test_Directory(self):
+        assert IsRelevantChange(Change(Path("/src/Anything"), True))
+
+    # ----------------------------------------------------------------------
+    def test_TestFile(self):
+        assert IsRelevantChange(Change(Path("/src/UnitTests/Module_UnitTest.py"), False))
+
+    # ----------------------------------------------------------------------
+    def test_Others(self):
+        assert not IsRelevantChange(Change(Path("/src/UnitTests/__init__.py"), False))
+        assert not IsRelevantChange(Change(Path("/src/UnitTests/Data.txt"), False))
+        assert not IsRelevantChange(Change(Path("/src/Tests/Module_UnitTest.py"), False))
+        assert not IsRelevantChange(Change(Path("/src/Module.py"), False))
+
+
+# ----------------------------------------------------------------------
+class TestPollingWatcher(object):
+    # ----------------------------------------------------------------------
+    @pytest.fixture
+    def tree(self, tmp_path):
+        (tmp_path / "UnitTests").mkdir()
+        (tmp_path / "UnitTests" / "One_UnitTest.py").write_text("")
+
+        return tmp_path
+
+    # ----------------------------------------------------------------------
+    def test_NoChanges(self, tree):
+        watcher = PollingWatcher([tree], _EnumDirs)
+
+        assert watcher.Wait(0) == []
+
+    # ----------------------------------------------------------------------
+    def test_AddedFile(self, tree):
+        watcher = PollingWatcher([tree], _EnumDirs)
+
+        (tree / "UnitTests" / "Two_UnitTest.py").write_text("")
+        _SetMtime(tree / "UnitTests", 10)
+
+        assert watcher.Wait(0) == [Change(tree / "UnitTests" / "Two_UnitTest.py", False)]
+        assert watcher.Wait(0) == []
+
+    # ----------------------------------------------------------------------
+    def test_RemovedFile(self, tree):
+        watcher = PollingWatcher([tree], _EnumDirs)
+
+        (tree / "UnitTests" / "One_UnitTest.py").unlink()
+        _SetMtime(tree / "UnitTests", 10)
+
+        assert watcher.Wait(0) == [Change(tree / "UnitTests" / "One_UnitTest.py", False)]
+
+    # ----------------------------------------------------------------------
+    def test_ModifiedFile(self, tree):
+        watcher = PollingWatcher([tree], _EnumDirs)
+
+        (tree / "UnitTests" / "One_UnitTest.py").write_text("def test_Function(): pass\n")
+        _SetMtime(tree / "UnitTests" / "One_UnitTest.py", 10)
+
+        assert watcher.Wait(0) == [Change(tree / "UnitTests" / "One_UnitTest.py", False)]
+        assert watcher.Wait(0) == []
+
+    # ----------------------------------------------------------------------
+    def test_ModifiedFileInChangedDirectory(self, tree):
+        watcher = PollingWatcher([tree], _EnumDirs)
+
+        (tree / "UnitTests" / "One_UnitTest.py").write_text("def test_Function(): pass\n")
+        _SetMtime(tree / "UnitTests" / "One_UnitTest.py", 10)
+
+        (tree / "UnitTests" / "Two_UnitTest.py").write_text("")
+        _SetMtime(tree / "UnitTests", 10)
+
+        assert sorted(watcher.Wait(0)) == [
+            Change(tree / "UnitTests" / "One_UnitTest.py", False),
+            Change(tree / "UnitTests" / "Two_UnitTest.py", False),
+        ]
+
+    # ----------------------------------------------------------------------
+    def test_AddedDirectory(self, tree):
+        watcher = PollingWatcher([tree], _EnumDirs)
+
+        (tree / "OtherTests").mkdir()
+        _SetMtime(tree, 10)
+
+        assert watcher.Wait(0) == [Change(tree / "OtherTests", True)]
+
+        # The new directory is watched as well
+        (tree / "OtherTests" / "Three_UnitTest.py").write_text("")
+        _SetMtime(tree / "OtherTests", 10)
+
+        assert watcher.Wait(0) == [Change(tree / "OtherTests" / "Three_UnitTest.py", False)]
+
+
+# ----------------------------------------------------------------------
+@pytest.mark.skipif(not InotifyWatcher.IsSupported(), reason="inotify is not supported")
+class TestInotifyWatcher(object):
+    # ----------------------------------------------------------------------
+    @pytest.fixture
+    def tree(self, tmp_path):
+        (tmp_path / "UnitTests").mkdir()
+        (tmp_path / "UnitTests" / "One_UnitTest.py").write_text("")
+
+        return tmp_path
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _GetChanges(
+        watcher: InotifyWatcher,
+    ) -> Set[Change]:
+        changes: Set[Change] = set()
+
+        while True:
+            new_changes = watcher.Wait(0.5)
+            if not new_changes:
+                break
+
+            changes.update(new_changes)
+
+        return changes
+
+    # ----------------------------------------------------------------------
+    def test_AddedAndRemovedFiles(self, tree):
+        watcher = InotifyWatcher([tree], _EnumDirs)
+
+        try:
+            (tree / "UnitTests" / "Two_UnitTest.py").write_text("")
+            (tree / "UnitTests" / "One_UnitTest.py").unlink()
+
+            assert self._GetChanges(watcher) == {
+                Change(tree / "UnitTests" / "One_UnitTest.py", False),
+                Change(tree / "UnitTests" / "Two_UnitTest.py", False),
+            }
+
+        finally:
+            watcher.Close()
+
+    # ----------------------------------------------------------------------
+    def test_ModifiedFile(self, tree):
+        watcher = InotifyWatcher([tree], _EnumDirs)
+
+        try:
+            (tree / "UnitTests" / "One_UnitTest.py").write_text("def test_Function(): pass\n")
+
+            assert self._GetChanges(watcher) == {
+                Change(tree / "UnitTests" / "One_UnitTest.py", False),
+            }
+
+        finally:
+            watcher.Close()
+
+
+# ----------------------------------------------------------------------
+class TestWatch(object):
+    # ----------------------------------------------------------------------
+    class _ScriptedWatcher(WatcherBase):
+        """Returns the changes of each step in turn; an empty step means that the wait timed out."""
+
+        # ----------------------------------------------------------------------
+        def __init__(
+            self,
+            steps: List[List[Change]],
+        ):
+            super(TestWatch._ScriptedWatcher, self).__init__(_EnumDirs)
+
+            self.steps                      = list(steps)
+            self.timeouts: List[Optional[float]] = []
+
+        # ----------------------------------------------------------------------
+        def Wait(
+            self,
+            timeout: Optional[float],
+        ) -> List[Change]:
+            self.timeouts.append(timeout)
+            return self.steps.pop(0)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _Watch(
+        watcher: "TestWatch._ScriptedWatcher",
+    ) -> List[Set[Path]]:
+        calls: List[Set[Path]] = []
+
+        Watch(
+            watcher,
+            calls.append,
+            debounce_seconds=0.25,
+            should_continue_func=lambda: bool(watcher.steps),
+        )
+
+        return calls
+
+    # ----------------------------------------------------------------------
+    def test_Debounce(self):
+        one = Path("/src/UnitTests/One_UnitTest.py")
+        two = Path("/src/UnitTests/Two_UnitTest.py")
+
+        watcher = self._ScriptedWatcher(
+            [
+                [Change(one, False)],
+                [Change(two, False)],
+                [Change(one, False)],
+                [],
+            ],
+        )
+
+        assert self._Watch(watcher) == [{one, two}]
+
+        # Waits for the debounce period only while changes are pending
+        assert watcher.timeouts == [1.0, 0.25, 0.25, 0.25]
+
+    # ----------------------------------------------------------------------
+    def test_SeparateBursts(self):
+        one = Path("/src/UnitTests/One_UnitTest.py")
+        two = Path("/src/UnitTests/Two_UnitTest.py")
+
+        watcher = self._ScriptedWatcher(
+            [
+                [Change(one, False)],
+                [],
+                [],
+                [Change(two, False)],
+                [],
+            ],
+        )
+
+        assert self._Watch(watcher) == [{one}, {two}]
+
+    # ----------------------------------------------------------------------
+    def test_IrrelevantChanges(self):
+        watcher = self._ScriptedWatcher(
+            [
+                [Change(Path("/src/UnitTests/Data.txt"), False)],
+                [],
+            ],
+        )
+
+        assert self._Watch(watcher) == []
@@ -0,0 +1,430 @@
+# ----------------------------------------------------------------------
+# |
+# |  Watcher.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022-23
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Watches directory trees for the changes that affect the content generated by PopulateTests."""
+
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+
+# ----------------------------------------------------------------------
+EnumDirsFuncType                            = Callable[[Path], Iterable[Path]]
+
+
+# ----------------------------------------------------------------------
+class Change(NamedTuple):
+    """An entry that was added to or removed from a directory, or a file that was modified."""
+
+    path: Path
+    is_dir: bool
+
+
+# ----------------------------------------------------------------------
+def IsTestDirectoryName(
+    name: str,
+) -> bool:
+    """Returns True if PopulateTests looks for tests in directories with this name."""
+
+    return name.endswith("Tests") and name != "Tests"
+
+
+# ----------------------------------------------------------------------
+def IsRelevantChange(
+    change: Change,
+) -> bool:
+    """\
+    Returns True if the change can affect the tests found by PopulateTests.
+
+    Any directory change is relevant, as a directory moved into the tree may contain test
+    directories; files are relevant when they are python files within a test directory (whose
+    content matters when PopulateTests creates configurations for test classes and functions).
+    """
+
+    if change.is_dir:
+        return True
+
+    return (
+        change.path.suffix == ".py"
+        and change.path.name != "__init__.py"
+        and IsTestDirectoryName(change.path.parent.name)
+    )
+
+
+# ----------------------------------------------------------------------
+class WatcherBase(abc.ABC):
+    """\
+    Reports the entries added to or removed from the directories within a set of roots, and the files
+    modified within them.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        enum_dirs_func: EnumDirsFuncType,
+    ):
+        self._enum_dirs_func                = enum_dirs_func
+
+    # ----------------------------------------------------------------------
+    @abc.abstractmethod
+    def Wait(
+        self,
+        timeout: Optional[float],
+    ) -> List[Change]:
+        """Waits up to `timeout` seconds (forever if None) for changes, returning those found."""
+        raise Exception("Abstract method")  # pragma: no cover
+
+    # ----------------------------------------------------------------------
+    def Close(self) -> None:
+        pass
+
+
+# ----------------------------------------------------------------------
+class InotifyWatcher(WatcherBase):
+    """Uses Linux's inotify API (through ctypes), with one watch per directory."""
+
+    IN_CLOSE_WRITE                          = 0x00000008
+    IN_MOVED_FROM                           = 0x00000040
+    IN_MOVED_TO                             = 0x00000080
+    IN_CREATE                               = 0x00000100
+    IN_DELETE                               = 0x00000200
+    IN_Q_OVERFLOW                           = 0x00004000
+    IN_IGNORED                              = 0x00008000
+    IN_ONLYDIR                              = 0x01000000
+    IN_ISDIR                                = 0x40000000
+
+    IN_NONBLOCK                             = 0o4000
+    IN_CLOEXEC                              = 0o2000000
+
+    _WATCH_MASK                             = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+    _EVENT_HEADER                           = struct.Struct("iIII")
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def IsSupported(cls) -> bool:
+        return sys.platform.startswith("linux") and cls._LoadLibc() is not None
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        roots: Iterable[Path],
+        enum_dirs_func: EnumDirsFuncType,
+    ):
+        super(InotifyWatcher, self).__init__(enum_dirs_func)
+
+        libc = self._LoadLibc()
+        assert libc is not None
+
+        fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self._libc                          = libc
+        self._fd                            = fd
+        self._watches: Dict[int, Path]      = {}
+
+        try:
+            for root in roots:
+                self._AddTree(root)
+        except:
+            self.Close()
+            raise
+
+    # ----------------------------------------------------------------------
+    def Wait(
+        self,
+        timeout: Optional[float],
+    ) -> List[Change]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self._fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+
+        changes: List[Change] = []
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, name_len = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost; report every root as changed
+                changes += [Change(path, True) for path in set(self._watches.values())]
+                continue
+
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            dir_path = self._watches.get(wd)
+            if dir_path is None:
+                continue
+
+            path = dir_path / os.fsdecode(name)
+            is_dir = bool(mask & self.IN_ISDIR)
+
+            if is_dir and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                self._AddTree(path)
+
+            changes.append(Change(path, is_dir))
+
+        return changes
+
+    # ----------------------------------------------------------------------
+    def Close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _LoadLibc():
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        except OSError:
+            return None
+
+        if not hasattr(libc, "inotify_init1"):
+            return None
+
+        return libc
+
+    # ----------------------------------------------------------------------
+    def _AddTree(
+        self,
+        root: Path,
+    ) -> None:
+        for directory in self._enum_dirs_func(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self._WATCH_MASK)
+
+            if wd < 0:
+                err = ctypes.get_errno()
+
+                if err in [errno.ENOENT, errno.ENOTDIR, errno.EACCES]:
+                    # The directory was removed (or can't be read) since it was enumerated
+                    continue
+
+                # ENOSPC means that the watch limit (fs.inotify.max_user_watches) was reached
+                raise OSError(err, os.strerror(err), str(directory))
+
+            self._watches[wd] = directory
+
+
+# ----------------------------------------------------------------------
+class PollingWatcher(WatcherBase):
+    """\
+    Polls the modification time of each directory, which changes when entries are added or
+    removed; only directories whose modification time changed are listed again. The modification
+    times of the files are compared as well, as modifying a file doesn't change its directory.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        roots: Iterable[Path],
+        enum_dirs_func: EnumDirsFuncType,
+        poll_interval: float=1.0,
+    ):
+        super(PollingWatcher, self).__init__(enum_dirs_func)
+
+        self._poll_interval                 = poll_interval
+
+        # directory -> (mtime_ns, {entry name: file mtime_ns, or None for directories})
+        self._snapshots: Dict[Path, tuple] = {}
+
+        for root in roots:
+            self._AddTree(root)
+
+    # ----------------------------------------------------------------------
+    def Wait(
+        self,
+        timeout: Optional[float],
+    ) -> List[Change]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            changes = self._Poll()
+            if changes:
+                return changes
+
+            if deadline is None:
+                delay = self._poll_interval
+            else:
+                delay = min(self._poll_interval, deadline - time.monotonic())
+                if delay <= 0:
+                    return []
+
+            time.sleep(delay)
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _AddTree(
+        self,
+        root: Path,
+    ) -> None:
+        for directory in self._enum_dirs_func(root):
+            snapshot = self._Snapshot(directory)
+            if snapshot is not None:
+                self._snapshots[directory] = snapshot
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _Snapshot(
+        directory: Path,
+    ) -> Optional[tuple]:
+        entries: Dict[str, Optional[int]] = {}
+
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        entries[entry.name] = None if entry.is_dir() else entry.stat().st_mtime_ns
+                    except OSError:
+                        # Removed while listing; the directory's modification time changed
+                        continue
+
+        except OSError:
+            return None
+
+        return mtime_ns, entries
+
+    # ----------------------------------------------------------------------
+    def _Poll(self) -> List[Change]:
+        changes: List[Change] = []
+        new_dirs: List[Path] = []
+
+        for directory, (mtime_ns, entries) in list(self._snapshots.items()):
+            try:
+                is_listing_current = os.stat(directory).st_mtime_ns == mtime_ns
+            except OSError:
+                # Removed; its parent reports the change
+                del self._snapshots[directory]
+                continue
+
+            if is_listing_current:
+                # No entries were added or removed, but files may have been modified
+                for name, file_mtime_ns in entries.items():
+                    if file_mtime_ns is None:
+                        continue
+
+                    try:
+                        current_mtime_ns = os.stat(directory / name).st_mtime_ns
+                    except OSError:
+                        # Removed; the directory's modification time reports it next time
+                        continue
+
+                    if current_mtime_ns != file_mtime_ns:
+                        entries[name] = current_mtime_ns
+                        changes.append(Change(directory / name, False))
+
+                continue
+
+            snapshot = self._Snapshot(directory)
+            if snapshot is None:
+                del self._snapshots[directory]
+                continue
+
+            self._snapshots[directory] = snapshot
+            new_entries = snapshot[1]
+
+            for name in set(entries) | set(new_entries):
+                if name in entries and name in new_entries:
+                    if new_entries[name] is not None and new_entries[name] != entries[name]:
+                        changes.append(Change(directory / name, False))
+
+                    continue
+
+                is_dir = (new_entries[name] if name in new_entries else entries[name]) is None
+
+                changes.append(Change(directory / name, is_dir))
+
+                if is_dir and name in new_entries:
+                    new_dirs.append(directory / name)
+
+        for directory in new_dirs:
+            self._AddTree(directory)
+
+        return changes
+
+
+# ----------------------------------------------------------------------
+def CreateWatcher(
+    roots: Iterable[Path],
+    enum_dirs_func: EnumDirsFuncType,
+    *,
+    force_polling: bool=False,
+    poll_interval: float=1.0,
+) -> WatcherBase:
+    """Creates an inotify-based watcher when possible, falling back to polling."""
+
+    roots = list(roots)
+
+    if not force_polling and InotifyWatcher.IsSupported():
+        try:
+            return InotifyWatcher(roots, enum_dirs_func)
+        except OSError:
+            # Most likely, too many directories to watch
+            pass
+
+    return PollingWatcher(roots, enum_dirs_func, poll_interval)
+
+
+# ----------------------------------------------------------------------
+def Watch(
+    watcher: WatcherBase,
+    on_changes_func: Callable[[Set[Path]], None],
+    *,
+    debounce_seconds: float=0.5,
+    is_relevant_func: Callable[[Change], bool]=IsRelevantChange,
+    should_continue_func: Callable[[], bool]=lambda: True,
+) -> None:
+    """\
+    Invokes `on_changes_func` with the paths of relevant changes, once no more changes have been seen
+    for `debounce_seconds`.
+    """
+
+    pending: Set[Path] = set()
+
+    while should_continue_func():
+        changes = watcher.Wait(debounce_seconds if pending else 1.0)
+
+        if changes:
+            pending.update(change.path for change in changes if is_relevant_func(change))
+            continue
+
+        if pending:
+            paths = pending
+            pending = set()
+
+            on_changes_func(paths)
@@ -8,17 +8,25 @@
 from __future__ import absolute_import, print_function
 
 import copy
-import getopt
-import glob
 import hashlib
-import linecache
+import importlib.util
+import json
+import marshal
 import os
 import re
-import shlex
 import sys
-import traceback
+import threading
+
+# Modules needed only on some paths (getopt, glob, shlex, tempfile,
+# traceback, linecache, concurrent.futures, multiprocessing) are imported
+# where they're used, to keep the start-up of cog short.
+
+from collections import OrderedDict
 
 from .backward import PY3, StringIO, string_types, to_bytes
+from .dependencies import BlockDependencies, pathSignature, recordDependencies
+from .isolation import IncludeImporter, activate
+from .snapshot import FileSystemSnapshot
 
 __all__ = ['Cog', 'CogUsageError', 'main']
 
@@ -39,6 +47,8 @@ OPTIONS:
     -D name=val Define a global string available to your generator code.
     -e          Warn if a file has no cog code in it.
     -I PATH     Add PATH to the list of directories for data files and modules.
+    -j N        Process the files in N worker processes, or one per CPU if N
+                is 0.  Output is reported in the same order as without -j.
     -n ENCODING Use ENCODING when reading and writing files.
     -o OUTNAME  Write the output to OUTNAME.
     -p PROLOGUE Prepend the generator source with PROLOGUE. Useful to insert an
@@ -53,6 +63,15 @@ OPTIONS:
     -z          The end-output marker can be omitted, and is assumed at eof.
     -v          Print the version of cog and exit.
     --check     Check that the files would not change if run again.
+    --dependencies=FILE
+                Write the modules, files and directories used by each generator
+                to FILE, as JSON.
+    --code-cache=DIR
+                Keep compiled generator code in DIR, to reuse in later runs.
+    --incremental=MANIFEST
+                Skip files that haven't changed since they were last processed
+                successfully, as recorded in MANIFEST, and whose generators'
+                dependencies haven't changed.  Requires -r or --check.
     --markers='START END END-OUTPUT'
                 The patterns surrounding cog inline instructions. Should
                 include three values separated by spaces, the start, end,
@@ -131,6 +150,7 @@ class CogGenerator(Redirectable):
         self.markers = []
         self.lines = []
         self.options = options or CogOptions()
+        self.dependencies = BlockDependencies()
 
     def parseMarker(self, l):
         self.markers.append(l)
@@ -138,6 +158,17 @@ class CogGenerator(Redirectable):
     def parseLine(self, l):
         self.lines.append(l.strip('\n'))
 
+    def parseBlock(self, block):
+        """ Take the markers and code from a CogBlock.
+        """
+        self.parseMarker(block.beginSpecLine)
+        if block.bOneLine:
+            self.parseLine(block.code.strip())
+        else:
+            for l in block.code.split('\n')[:-1]:
+                self.parseLine(l)
+            self.parseMarker(block.endSpecLine)
+
     def getCode(self):
         """ Extract the executable Python code from the generator.
         """
@@ -162,7 +193,8 @@ class CogGenerator(Redirectable):
         prologue = "import " + cog.cogmodulename + " as cog\n"
         if self.options.sPrologue:
             prologue += self.options.sPrologue + '\n'
-        code = compile(prologue + intext, str(fname), 'exec')
+        code = codeCache.compile(intext, prologue, cog.cogmodulename, str(fname),
+            self.options.sCodeCacheDir)
 
         # Make sure the "cog" module has our state.
         cog.cogmodule.msg = self.msg
@@ -170,16 +202,20 @@ class CogGenerator(Redirectable):
         cog.cogmodule.outl = self.outl
         cog.cogmodule.error = self.error
 
-        real_stdout = sys.stdout
+        importer = cog.importer
         if self.options.bPrintOutput:
-            sys.stdout = captured_stdout = StringIO()
+            importer.printTarget = captured_stdout = StringIO()
 
         self.outstring = ''
+        self.dependencies = BlockDependencies(cog.cogmodule.inFile, cog.cogmodule.firstLineNum)
         try:
-            eval(code, globals)
+            with activate(importer), recordDependencies(self.dependencies):
+                eval(code, globals)
+            self.dependencies.resolveModules(cog.cogmodule.path, globals, importer.modules)
         except CogError:
             raise
         except:
+            import traceback
             typ, err, tb = sys.exc_info()
             frames = (tuple(fr) for fr in traceback.extract_tb(tb.tb_next))
             frames = find_cog_source(frames, prologue)
@@ -187,7 +223,7 @@ class CogGenerator(Redirectable):
             msg += "{}: {}".format(typ.__name__, err)
             raise CogUserException(msg)
         finally:
-            sys.stdout = real_stdout
+            importer.printTarget = None
 
         if self.options.bPrintOutput:
             self.outstring = captured_stdout.getvalue()
@@ -232,6 +268,318 @@ class CogGenerator(Redirectable):
         raise CogGeneratedError(msg)
 
 
+class CodeCache:
+    """ A cache of the code objects compiled for generators.
+
+        Entries are keyed by the generator code, the prologue, and the cog
+        module name.  Recently used entries are kept in memory; if a cache
+        directory is given, entries are also marshalled to files there, like
+        __pycache__ for cog blocks.  The directory is kept to `maxDiskBytes`
+        by evicting the least recently used files.
+
+        The file name compiled into a code object is used for tracebacks (see
+        find_cog_source), so cached code is given the file name of the block
+        it's used for.
+    """
+    def __init__(self, maxEntries=512, maxDiskBytes=32*1024*1024):
+        self.maxEntries = maxEntries
+        self.maxDiskBytes = maxDiskBytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def compile(self, intext, prologue, modulename, fname, cacheDir=None):
+        """ Return the code object for `prologue + intext`, with file name `fname`.
+        """
+        if not _canReplaceCode:
+            # Without code.replace, the file name can't be corrected.
+            return compile(prologue + intext, fname, 'exec')
+
+        key = (intext, prologue, modulename)
+        with self._lock:
+            code = self._entries.get(key)
+            if code is not None:
+                self._entries.move_to_end(key)
+
+        if code is None and cacheDir:
+            code = self._load(cacheDir, key)
+
+        if code is None:
+            code = compile(prologue + intext, fname, 'exec')
+            if cacheDir:
+                self._save(cacheDir, key, code)
+
+        with self._lock:
+            self._entries[key] = code
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+
+        return _withFilename(code, fname)
+
+    @staticmethod
+    def _diskName(cacheDir, key):
+        hasher = hashlib.sha256(importlib.util.MAGIC_NUMBER)
+        for part in key:
+            hasher.update(b'\0' + to_bytes(part))
+        return os.path.join(cacheDir, hasher.hexdigest() + '.cogc')
+
+    def _load(self, cacheDir, key):
+        sPath = self._diskName(cacheDir, key)
+        try:
+            with open(sPath, 'rb') as f:
+                code = marshal.load(f)
+            # Record the use, for eviction.
+            os.utime(sPath, None)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return code
+
+    def _save(self, cacheDir, key, code):
+        sPath = self._diskName(cacheDir, key)
+        try:
+            if not os.path.isdir(cacheDir):
+                os.makedirs(cacheDir)
+            import tempfile
+            fd, sTemp = tempfile.mkstemp(dir=cacheDir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump(code, f)
+            os.replace(sTemp, sPath)
+            self._evict(cacheDir)
+        except OSError:
+            # The disk cache is only an optimization.
+            pass
+
+    def _evict(self, cacheDir):
+        entries = []
+        total = 0
+        for entry in os.scandir(cacheDir):
+            if entry.name.endswith('.cogc'):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.maxDiskBytes:
+            return
+        entries.sort()
+        for _, size, sPath in entries:
+            if total <= self.maxDiskBytes:
+                break
+            try:
+                os.remove(sPath)
+            except OSError:
+                pass
+            total -= size
+
+
+_canReplaceCode = hasattr(compile('', '', 'exec'), 'replace')
+
+def _withFilename(code, fname):
+    """ Return `code`, and the code objects nested in it, with file name `fname`.
+    """
+    if code.co_filename == fname:
+        return code
+    consts = tuple(
+        _withFilename(c, fname) if isinstance(c, type(code)) else c
+        for c in code.co_consts
+        )
+    return code.replace(co_filename=fname, co_consts=consts)
+
+
+# Compiled generator code is shared by all Cog instances.
+codeCache = CodeCache()
+
+
+class IncrementalManifest:
+    """ Records the files processed successfully by earlier runs, so that
+        unchanged files can be skipped.
+
+        Each file's entry holds its size and modification time after it was
+        processed, the hash of its content, the hashes of its generators'
+        code, a fingerprint of the -D defines, other options and the modules
+        in the include path, and the signatures of its generators'
+        dependencies (see BlockDependencies).  A file whose size and
+        modification time still match is skipped without being opened; one
+        whose content still hashes the same is skipped without being
+        evaluated.  Either way, its dependencies must be unchanged.
+    """
+    VERSION = 2
+
+    def __init__(self, sPath=None):
+        self.sPath = sPath
+        self.files = {}
+        self.bDirty = False
+        if sPath is None:
+            # An in-memory manifest, as used by -j workers.
+            return
+        try:
+            with open(sPath) as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.files = data['files']
+        except (OSError, ValueError, KeyError, AttributeError):
+            # A missing or unreadable manifest just means nothing is skipped.
+            pass
+
+    def save(self):
+        if not self.bDirty:
+            return
+        sDir = os.path.dirname(self.sPath)
+        if sDir and not os.path.isdir(sDir):
+            os.makedirs(sDir)
+        import tempfile
+        fd, sTemp = tempfile.mkstemp(dir=sDir or None, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': self.VERSION, 'files': self.files}, f, indent=1, sort_keys=True)
+        os.replace(sTemp, self.sPath)
+        self.bDirty = False
+
+    @staticmethod
+    def _key(sFile):
+        return os.path.abspath(sFile)
+
+    @staticmethod
+    def _hashText(sText):
+        return hashlib.sha256(to_bytes(sText)).hexdigest()
+
+    def isStatCurrent(self, sFile, sFingerprint):
+        """ Is the file known to be unchanged, judging by its size and
+            modification time?  The file isn't opened.
+        """
+        entry = self.files.get(self._key(sFile))
+        if entry is None or entry['fingerprint'] != sFingerprint:
+            return False
+        try:
+            st = os.stat(sFile)
+        except OSError:
+            return False
+        if entry['mtime_ns'] != st.st_mtime_ns or entry['size'] != st.st_size:
+            return False
+        return self._dependenciesCurrent(entry)
+
+    @staticmethod
+    def _dependenciesCurrent(entry):
+        for path, signature in entry['dependencies'].items():
+            if pathSignature(path) != signature:
+                return False
+        return True
+
+    def isContentCurrent(self, sFile, sText, sFingerprint):
+        """ Is the file's text `sText` the same as when it was recorded?
+            If so, the entry is updated with the file's current stat.
+        """
+        key = self._key(sFile)
+        entry = self.files.get(key)
+        if entry is None or entry['fingerprint'] != sFingerprint:
+            return False
+        if entry['content'] != self._hashText(sText):
+            return False
+        if not self._dependenciesCurrent(entry):
+            return False
+        st = os.stat(sFile)
+        entry['mtime_ns'] = st.st_mtime_ns
+        entry['size'] = st.st_size
+        self.bDirty = True
+        return True
+
+    def record(self, sFile, sText, sFingerprint, codeHashes, dependencies):
+        """ Record that the file, now containing `sText`, was processed
+            successfully.  `dependencies` is a list of BlockDependencies.
+        """
+        st = os.stat(sFile)
+        paths = set()
+        for deps in dependencies:
+            paths |= deps.paths()
+        self.files[self._key(sFile)] = {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'content': self._hashText(sText),
+            'code': codeHashes,
+            'fingerprint': sFingerprint,
+            'dependencies': dict((path, pathSignature(path)) for path in sorted(paths)),
+            }
+        self.bDirty = True
+
+    def forget(self, sFile):
+        if self.files.pop(self._key(sFile), None) is not None:
+            self.bDirty = True
+
+
+def includeFingerprint(includePath):
+    """ Fingerprint the Python modules in the include path directories, by
+        name, size and modification time.
+    """
+    hasher = hashlib.sha256()
+    for sDir in includePath:
+        for root, dirnames, filenames in os.walk(sDir):
+            dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+            for name in sorted(filenames):
+                if not name.endswith('.py'):
+                    continue
+                sPath = os.path.join(root, name)
+                try:
+                    st = os.stat(sPath)
+                except OSError:
+                    continue
+                hasher.update(to_bytes("%s\0%d\0%d\n" % (sPath, st.st_mtime_ns, st.st_size)))
+    return hasher.hexdigest()
+
+
+class CogBlock:
+    """ One cog block, held as spans of offsets into the source text.
+
+        The spans are, in order: the begin-spec line, the generator code,
+        the end-spec line, the old output, and the end-output line.  For a
+        one-line block, the begin-spec and end-spec lines are the same line,
+        and the code span lies within it.  At the end of a file processed
+        with -z, the end-output span is empty.
+
+        Nothing is copied out of the source text until it's asked for.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.firstLineNum = 0
+        self.bOneLine = False
+        self.beginStart = self.beginEnd = 0
+        self.codeStart = self.codeEnd = 0
+        self.endSpecStart = self.endSpecEnd = 0
+        self.outputStart = self.outputEnd = 0
+        self.endOutputStart = self.endOutputEnd = 0
+        self.endOutputLineNum = 0
+        self._oldOutputHash = None
+
+    @property
+    def beginSpecLine(self):
+        return self.text[self.beginStart:self.beginEnd]
+
+    @property
+    def code(self):
+        return self.text[self.codeStart:self.codeEnd]
+
+    @property
+    def endSpecLine(self):
+        return self.text[self.endSpecStart:self.endSpecEnd]
+
+    @property
+    def previous(self):
+        """ The old output of the block, as cog.previous.
+        """
+        return self.text[self.outputStart:self.outputEnd]
+
+    @property
+    def endOutputLine(self):
+        return self.text[self.endOutputStart:self.endOutputEnd]
+
+    def oldOutputHash(self):
+        """ The md5 hash of the old output, computed on first use.
+        """
+        if self._oldOutputHash is None:
+            self._oldOutputHash = hashlib.md5(to_bytes(self.previous)).hexdigest()
+        return self._oldOutputHash
+
+
 class NumberedFileReader:
     """ A decorator for files that counts the readline()'s called.
     """
@@ -249,6 +597,139 @@ class NumberedFileReader:
         return self.n
 
 
+class OffsetLineCounter:
+    """ Converts offsets in a text buffer to 1-based line numbers.
+        Offsets must be requested in non-decreasing order, so that the
+        buffer is only counted through once.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.offset = 0
+        self.n = 1
+
+    def linenumber(self, offset):
+        self.n += self.text.count('\n', self.offset, offset)
+        self.offset = offset
+        return self.n
+
+    def numlines(self):
+        """ The number of lines in the whole buffer, as readline() would count them.
+        """
+        n = self.linenumber(len(self.text))
+        if not self.text or self.text.endswith('\n'):
+            n -= 1
+        return n
+
+
+class MarkerScanner:
+    """ Classifies lines by the cog markers they contain.
+
+        Most lines contain no markers at all.  A marker that contains another
+        marker can only appear where the smaller one does, so pass-through
+        lines are rejected by searching for the smallest markers only (for the
+        default markers, '[[[cog' and ']]]').  Only lines that contain one of
+        those pay for the full classification.
+    """
+
+    # Classification flags returned by classify().
+    TEXT = 0
+    BEGIN_SPEC = 1
+    END_SPEC = 2
+    END_OUTPUT = 4
+
+    def __init__(self, sBeginSpec, sEndSpec, sEndOutput):
+        self.sBeginSpec = sBeginSpec
+        self.sEndSpec = sEndSpec
+        self.sEndOutput = sEndOutput
+        markers = set([sBeginSpec, sEndSpec, sEndOutput])
+        self.sentinels = sorted(
+            m for m in markers
+            if not any(o != m and o in m for o in markers)
+            )
+        self.classify = self._makeClassify()
+
+    def _makeClassify(self):
+        """ Build the classify(l) function for this marker set.
+
+            classify(l) returns the MarkerScanner flags for the line `l`.
+            END_SPEC is only reported when the line isn't an end-output line,
+            matching Cog.isEndSpecLine.  It is a plain function rather than
+            a method, to keep the per-line cost to a single call.
+        """
+        TEXT, BEGIN_SPEC, END_SPEC, END_OUTPUT = (
+            self.TEXT, self.BEGIN_SPEC, self.END_SPEC, self.END_OUTPUT
+            )
+        sBeginSpec, sEndSpec, sEndOutput = self.sBeginSpec, self.sEndSpec, self.sEndOutput
+
+        def classifyMarkers(l):
+            flags = TEXT
+            if sBeginSpec in l:
+                flags |= BEGIN_SPEC
+            if sEndOutput in l:
+                flags |= END_OUTPUT
+            elif sEndSpec in l:
+                flags |= END_SPEC
+            return flags
+
+        if len(self.sentinels) == 1:
+            s1, = self.sentinels
+            def classify(l):
+                if s1 not in l:
+                    return TEXT
+                return classifyMarkers(l)
+        elif len(self.sentinels) == 2:
+            s1, s2 = self.sentinels
+            def classify(l):
+                if s1 not in l and s2 not in l:
+                    return TEXT
+                return classifyMarkers(l)
+        else:
+            s1, s2, s3 = self.sentinels
+            def classify(l):
+                if s1 not in l and s2 not in l and s3 not in l:
+                    return TEXT
+                return classifyMarkers(l)
+        return classify
+
+    def iterMarkerLines(self, text):
+        """ Yield (start, end, flags) for each line of `text` that contains a
+            marker, in order.  `end` is just past the line's newline, if any.
+
+            The text between marker lines is never examined line by line:
+            each sentinel is located with str.find over the whole buffer.
+        """
+        find = text.find
+        rfind = text.rfind
+        classify = self.classify
+        sentinels = self.sentinels
+        nexts = [find(m) for m in sentinels]
+        while True:
+            found = [n for n in nexts if n >= 0]
+            if not found:
+                return
+            idx = min(found)
+            start = rfind('\n', 0, idx) + 1
+            end = find('\n', idx)
+            end = len(text) if end < 0 else end + 1
+            yield start, end, classify(text[start:end])
+            for i, n in enumerate(nexts):
+                if 0 <= n < end:
+                    nexts[i] = find(sentinels[i], end)
+
+
+# MarkerScanners are immutable, so share one per marker set.
+_markerScanners = {}
+
+def getMarkerScanner(options):
+    """ Return the MarkerScanner for the markers in `options`.
+    """
+    key = (options.sBeginSpec, options.sEndSpec, options.sEndOutput)
+    scanner = _markerScanners.get(key)
+    if scanner is None:
+        scanner = _markerScanners.setdefault(key, MarkerScanner(*key))
+    return scanner
+
+
 class CogOptions:
     """ Options for a run of cog.
     """
@@ -276,6 +757,10 @@ class CogOptions:
         self.sPrologue = ''
         self.bPrintOutput = False
         self.bCheck = False
+        self.sCodeCacheDir = None
+        self.sManifest = None
+        self.sDependenciesFile = None
+        self.numJobs = 1
 
     def __eq__(self, other):
         """ Comparison operator for tests to use.
@@ -295,12 +780,16 @@ class CogOptions:
 
     def parseArgs(self, argv):
         # Parse the command line arguments.
+        import getopt
         try:
             opts, self.args = getopt.getopt(
                 argv,
-                'cdD:eI:n:o:rs:p:PUvw:xz',
+                'cdD:eI:j:n:o:rs:p:PUvw:xz',
                 [
                     'check',
+                    'code-cache=',
+                    'dependencies=',
+                    'incremental=',
                     'markers=',
                     'verbosity=',
                 ]
@@ -323,6 +812,15 @@ class CogOptions:
                 self.bWarnEmpty = True
             elif o == '-I':
                 self.addToIncludePath(os.path.abspath(a))
+            elif o == '-j':
+                try:
+                    self.numJobs = int(a)
+                except ValueError:
+                    self.numJobs = -1
+                if self.numJobs < 0:
+                    raise CogUsageError("-j takes a non-negative number of jobs")
+                if self.numJobs == 0:
+                    self.numJobs = os.cpu_count() or 1
             elif o == '-n':
                 self.sEncoding = a
             elif o == '-o':
@@ -347,6 +845,12 @@ class CogOptions:
                 self.bEofCanBeEnd = True
             elif o == '--check':
                 self.bCheck = True
+            elif o == '--code-cache':
+                self.sCodeCacheDir = os.path.abspath(a)
+            elif o == '--dependencies':
+                self.sDependenciesFile = os.path.abspath(a)
+            elif o == '--incremental':
+                self.sManifest = os.path.abspath(a)
             elif o == '--markers':
                 self._parse_markers(a)
             elif o == '--verbosity':
@@ -373,6 +877,30 @@ class CogOptions:
         if self.bReplace and self.sOutputName:
             raise CogUsageError("Can't use -o with -r (they are opposites)")
 
+        if self.sManifest and not (self.bReplace or self.bCheck):
+            raise CogUsageError("Can't use --incremental without -r or --check")
+
+    def fingerprint(self):
+        """ A string identifying the options, other than the include path,
+            that affect the output of a file.
+        """
+        return json.dumps([
+            __version__,
+            sorted(self.defines.items()),
+            self.bNoGenerate,
+            self.bHashOutput,
+            self.bDeleteCode,
+            self.bEofCanBeEnd,
+            self.sSuffix,
+            self.bNewlines,
+            self.sBeginSpec,
+            self.sEndSpec,
+            self.sEndOutput,
+            self.sEncoding,
+            self.sPrologue,
+            self.bPrintOutput,
+            ])
+
 
 class Cog(Redirectable):
     """ The Cog engine.
@@ -383,7 +911,26 @@ class Cog(Redirectable):
         self._fixEndOutputPatterns()
         self.cogmodulename = "cog"
         self.createCogModule()
+        self.importer = IncludeImporter(self.cogmodule, self.cogmodulename)
         self.bCheckFailed = False
+        self.manifest = None
+        self._includeFingerprints = {}
+        # The BlockDependencies of the generators run, by input file name.
+        self.dependencies = {}
+        # With -j, the (file name, options) pairs waiting for the pool.
+        self.jobs = None
+        # In a -j worker, the (new text, manifest fingerprint) of the file
+        # to be replaced by the main process, instead of replacing it.
+        self.deferredReplace = None
+        # The FileSystemSnapshot shared with other engines, if any.
+        self.sharedFs = None
+
+    def setFileSystem(self, fs):
+        """ Use the FileSystemSnapshot `fs` as cog.fs, rather than a new one
+            for each run, to share it with other Cog engines.
+        """
+        self.sharedFs = fs
+        self.cogmodule.fs = fs
 
     def _fixEndOutputPatterns(self):
         end_output = re.escape(self.options.sEndOutput)
@@ -408,9 +955,16 @@ class Cog(Redirectable):
         """
         class DummyModule(object):
             """Modules don't have to be anything special, just an object will do."""
-            pass
+            # The CogBlock being generated.  cog.previous is sliced from it
+            # only if the generator asks for it.
+            block = None
+
+            @property
+            def previous(self):
+                return self.block.previous if self.block is not None else ''
         self.cogmodule = DummyModule()
         self.cogmodule.path = []
+        self.cogmodule.fs = FileSystemSnapshot()
 
     def openOutputFile(self, fname):
         """ Open an output file, taking all the details into account.
@@ -442,171 +996,353 @@ class Cog(Redirectable):
     def processFile(self, fIn, fOut, fname=None, globals=None):
         """ Process an input file object to an output file object.
             fIn and fOut can be file objects, or file names.
+
+            Input named by file name is read in one piece and processed by
+            processBuffer; input file objects (stdin, for example) are
+            processed line by line.
         """
 
         sFileIn = fname or ''
         sFileOut = fname or ''
-        fInToClose = fOutToClose = None
-        # Convert filenames to files.
+        fOutToClose = None
+
+        if isinstance(fIn, string_types) and fIn != "-":
+            sFileIn = fIn
+            fInToRead = self.openInputFile(fIn)
+            try:
+                sInput = fInToRead.read()
+            finally:
+                fInToRead.close()
+            if isinstance(fOut, string_types):
+                sFileOut = fOut
+            sOutput = self.processBuffer(sInput, sFileIn, sFileOut, globals)
+            if isinstance(fOut, string_types):
+                fOut = fOutToClose = self.openOutputFile(fOut)
+            try:
+                fOut.write(sOutput)
+            finally:
+                if fOutToClose:
+                    fOutToClose.close()
+            return
+
         if isinstance(fIn, string_types):
-            # Open the input file.
+            # stdin can only be read as it arrives.
             sFileIn = fIn
-            fIn = fInToClose = self.openInputFile(fIn)
+            fIn = self.openInputFile(fIn)
         if isinstance(fOut, string_types):
             # Open the output file.
             sFileOut = fOut
             fOut = fOutToClose = self.openOutputFile(fOut)
 
         try:
-            fIn = NumberedFileReader(fIn)
+            self.processLines(fIn, fOut, sFileIn, sFileOut, globals)
+        finally:
+            if fOutToClose:
+                fOutToClose.close()
 
-            bSawCog = False
+    def _prepareFile(self, sFileIn, sFileOut, globals):
+        """ Set up the cog module for processing a file.
+            Returns the globals dict to use for the file.
+        """
+        self.cogmodule.inFile = sFileIn
+        self.cogmodule.outFile = sFileOut
+        self.cogmodulename = 'cog_' + hashlib.md5(sFileOut.encode()).hexdigest()
+        # Each file imports its own cog module and include-path modules,
+        # without touching sys.modules, so Cogs can run on several threads.
+        self.importer = IncludeImporter(self.cogmodule, self.cogmodulename)
+
+        # The globals dict we'll use for this file.
+        if globals is None:
+            globals = {}
+        globals.setdefault('__builtins__', self.importer.builtins)
+
+        # If there are any global defines, put them in the globals.
+        globals.update(self.options.defines)
+        return globals
+
+    def processBuffer(self, sIn, sFileIn='', sFileOut='', globals=None):
+        """ Process the entire text of a file, returning the cogged text.
+
+            The output is built by joining the untouched slices of `sIn` with
+            the generated text.
+        """
+        globals = self._prepareFile(sFileIn, sFileOut, globals)
 
-            self.cogmodule.inFile = sFileIn
-            self.cogmodule.outFile = sFileOut
-            self.cogmodulename = 'cog_' + hashlib.md5(sFileOut.encode()).hexdigest()
-            sys.modules[self.cogmodulename] = self.cogmodule
-            # if "import cog" explicitly done in code by user, note threading will cause clashes.
-            sys.modules['cog'] = self.cogmodule
+        pieces = []
+        out = pieces.append
+        pos = 0
+        bSawCog = False
 
-            # The globals dict we'll use for this file.
-            if globals is None:
-                globals = {}
+        for block in self.iterBlocks(sIn, sFileIn):
+            out(sIn[pos:block.beginStart])
+            if not self.options.bDeleteCode:
+                out(sIn[block.beginStart:block.outputStart])
 
-            # If there are any global defines, put them in the globals.
-            globals.update(self.options.defines)
+            gen = CogGenerator(options=self.options)
+            gen.setOutput(stdout=self.stdout)
+            gen.parseBlock(block)
+            self.cogmodule.firstLineNum = block.firstLineNum
+            # Make the previous output available to the current code
+            self.cogmodule.block = block
 
-            # loop over generator chunks
-            l = fIn.readline()
+            sGen, l = self.generateBlock(gen, block.endOutputLine, block.oldOutputHash,
+                globals, sFileIn, block.firstLineNum, block.endOutputLineNum)
+            bSawCog = True
+
+            out(sGen)
+            if not self.options.bDeleteCode:
+                out(l)
+            pos = block.endOutputEnd
+
+        self.cogmodule.block = None
+        out(sIn[pos:])
+
+        if not bSawCog and self.options.bWarnEmpty:
+            self.showWarning("no cog code found in %s" % sFileIn)
+
+        return ''.join(pieces)
+
+    def iterBlocks(self, sIn, sFileIn=''):
+        """ Find the cog blocks in the text `sIn`, yielding a CogBlock for each.
+
+            Blocks are yielded as they're found, so a structural error is
+            only raised once the blocks before it have been dealt with.
+        """
+        scanner = getMarkerScanner(self.options)
+        BEGIN_SPEC = scanner.BEGIN_SPEC
+        END_SPEC = scanner.END_SPEC
+        END_OUTPUT = scanner.END_OUTPUT
+        markerLines = scanner.iterMarkerLines(sIn)
+        lines = OffsetLineCounter(sIn)
+
+        for lStart, lEnd, kind in markerLines:
+            # Find the next spec begin
+            if not kind & BEGIN_SPEC:
+                if kind & END_SPEC:
+                    raise CogError("Unexpected '%s'" % self.options.sEndSpec,
+                        file=sFileIn, line=lines.linenumber(lStart))
+                raise CogError("Unexpected '%s'" % self.options.sEndOutput,
+                    file=sFileIn, line=lines.linenumber(lStart))
+
+            block = CogBlock(sIn)
+            block.beginStart, block.beginEnd = lStart, lEnd
+            block.firstLineNum = lines.linenumber(lStart)
+
+            # If the spec begin is also a spec end, then the single line of
+            # code is inside.
+            if kind & END_SPEC:
+                l = sIn[lStart:lEnd]
+                beg = l.find(self.options.sBeginSpec)
+                end = l.find(self.options.sEndSpec)
+                if beg > end:
+                    raise CogError("Cog code markers inverted",
+                        file=sFileIn, line=block.firstLineNum)
+                block.bOneLine = True
+                block.codeStart = lStart + beg + len(self.options.sBeginSpec)
+                block.codeEnd = lStart + end
+                block.endSpecStart, block.endSpecEnd = lStart, lEnd
+            else:
+                # An ordinary code block.
+                marker = next(markerLines, None)
+                if marker is None:
+                    raise CogError(
+                        "Cog block begun but never ended.",
+                        file=sFileIn, line=block.firstLineNum)
+                lStart, lEnd, kind = marker
+                if not kind & END_SPEC:
+                    if kind & BEGIN_SPEC:
+                        raise CogError("Unexpected '%s'" % self.options.sBeginSpec,
+                            file=sFileIn, line=lines.linenumber(lStart))
+                    raise CogError("Unexpected '%s'" % self.options.sEndOutput,
+                        file=sFileIn, line=lines.linenumber(lStart))
+                block.codeStart, block.codeEnd = block.beginEnd, lStart
+                block.endSpecStart, block.endSpecEnd = lStart, lEnd
+
+            # Find the end of the output section.
+            marker = next(markerLines, None)
+            if marker is None:
+                if not self.options.bEofCanBeEnd:
+                    # We reached end of file before we found the end output line.
+                    raise CogError("Missing '%s' before end of file." % self.options.sEndOutput,
+                        file=sFileIn, line=lines.numlines())
+                lStart = lEnd = len(sIn)
+                block.endOutputLineNum = lines.numlines()
+            else:
+                lStart, lEnd, kind = marker
+                if not kind & END_OUTPUT:
+                    if kind & BEGIN_SPEC:
+                        raise CogError("Unexpected '%s'" % self.options.sBeginSpec,
+                            file=sFileIn, line=lines.linenumber(lStart))
+                    raise CogError("Unexpected '%s'" % self.options.sEndSpec,
+                        file=sFileIn, line=lines.linenumber(lStart))
+                block.endOutputLineNum = lines.linenumber(lStart)
+
+            block.outputStart, block.outputEnd = block.endSpecEnd, lStart
+            block.endOutputStart, block.endOutputEnd = lStart, lEnd
+
+            yield block
+
+    def generateBlock(self, gen, l, oldOutputHash, globals, sFileIn, firstLineNum, endLineNum):
+        """ Run the generator `gen`.  Returns the new output and the new
+            end-output line.
+
+            `l` is the old end-output line, and `oldOutputHash` a function
+            returning the hash of the old output.  It's only called if the
+            old checksum has to be verified.
+        """
+        # Write the output of the spec to be the new output if we're
+        # supposed to generate code.
+        sGen = ''
+        if not self.options.bNoGenerate:
+            sFile = "<cog %s:%d>" % (sFileIn, firstLineNum)
+            sGen = gen.evaluate(cog=self, globals=globals, fname=sFile)
+            sGen = self.suffixLines(sGen)
+            self.dependencies.setdefault(sFileIn, []).append(gen.dependencies)
+
+        # Write the ending output line
+        hashMatch = self.reEndOutput.search(l)
+        if self.options.bHashOutput:
+            newHash = hashlib.md5(to_bytes(sGen)).hexdigest()
+            if hashMatch:
+                oldHash = hashMatch.groupdict()['hash']
+                if oldHash != oldOutputHash():
+                    raise CogError("Output has been edited! Delete old checksum to unprotect.",
+                        file=sFileIn, line=endLineNum)
+                # Create a new end line with the correct hash.
+                endpieces = l.split(hashMatch.group(0), 1)
+            else:
+                # There was no old hash, but we want a new hash.
+                endpieces = l.split(self.options.sEndOutput, 1)
+            l = (self.sEndFormat % newHash).join(endpieces)
+        else:
+            # We don't want hashes output, so if there was one, get rid of
+            # it.
+            if hashMatch:
+                l = l.replace(hashMatch.groupdict()['hashsect'], '', 1)
+        return sGen, l
+
+    def processLines(self, fIn, fOut, sFileIn='', sFileOut='', globals=None):
+        """ Process an input file object line by line, writing to an output
+            file object.  Used when the input can't be read in one piece.
+        """
+        fIn = NumberedFileReader(fIn)
+
+        bSawCog = False
+        globals = self._prepareFile(sFileIn, sFileOut, globals)
+
+        # loop over generator chunks
+        scanner = getMarkerScanner(self.options)
+        classify = scanner.classify
+        BEGIN_SPEC = scanner.BEGIN_SPEC
+        END_SPEC = scanner.END_SPEC
+        END_OUTPUT = scanner.END_OUTPUT
+
+        l = fIn.readline()
+        while l:
+            # Find the next spec begin
             while l:
-                # Find the next spec begin
-                while l and not self.isBeginSpecLine(l):
-                    if self.isEndSpecLine(l):
-                        raise CogError("Unexpected '%s'" % self.options.sEndSpec,
+                kind = classify(l)
+                if kind & BEGIN_SPEC:
+                    break
+                if kind & END_SPEC:
+                    raise CogError("Unexpected '%s'" % self.options.sEndSpec,
+                        file=sFileIn, line=fIn.linenumber())
+                if kind & END_OUTPUT:
+                    raise CogError("Unexpected '%s'" % self.options.sEndOutput,
+                        file=sFileIn, line=fIn.linenumber())
+                fOut.write(l)
+                l = fIn.readline()
+            if not l:
+                break
+            if not self.options.bDeleteCode:
+                fOut.write(l)
+
+            # l is the begin spec
+            gen = CogGenerator(options=self.options)
+            gen.setOutput(stdout=self.stdout)
+            gen.parseMarker(l)
+            firstLineNum = fIn.linenumber()
+            self.cogmodule.firstLineNum = firstLineNum
+
+            # If the spec begin is also a spec end, then process the single
+            # line of code inside.
+            if kind & END_SPEC:
+                beg = l.find(self.options.sBeginSpec)
+                end = l.find(self.options.sEndSpec)
+                if beg > end:
+                    raise CogError("Cog code markers inverted",
+                        file=sFileIn, line=firstLineNum)
+                else:
+                    sCode = l[beg+len(self.options.sBeginSpec):end].strip()
+                    gen.parseLine(sCode)
+            else:
+                # Deal with an ordinary code block.
+                l = fIn.readline()
+
+                # Get all the lines in the spec
+                while l:
+                    kind = classify(l)
+                    if kind & END_SPEC:
+                        break
+                    if kind & BEGIN_SPEC:
+                        raise CogError("Unexpected '%s'" % self.options.sBeginSpec,
                             file=sFileIn, line=fIn.linenumber())
-                    if self.isEndOutputLine(l):
+                    if kind & END_OUTPUT:
                         raise CogError("Unexpected '%s'" % self.options.sEndOutput,
                             file=sFileIn, line=fIn.linenumber())
-                    fOut.write(l)
+                    if not self.options.bDeleteCode:
+                        fOut.write(l)
+                    gen.parseLine(l)
                     l = fIn.readline()
                 if not l:
-                    break
+                    raise CogError(
+                        "Cog block begun but never ended.",
+                        file=sFileIn, line=firstLineNum)
+
                 if not self.options.bDeleteCode:
                     fOut.write(l)
-
-                # l is the begin spec
-                gen = CogGenerator(options=self.options)
-                gen.setOutput(stdout=self.stdout)
                 gen.parseMarker(l)
-                firstLineNum = fIn.linenumber()
-                self.cogmodule.firstLineNum = firstLineNum
-
-                # If the spec begin is also a spec end, then process the single
-                # line of code inside.
-                if self.isEndSpecLine(l):
-                    beg = l.find(self.options.sBeginSpec)
-                    end = l.find(self.options.sEndSpec)
-                    if beg > end:
-                        raise CogError("Cog code markers inverted",
-                            file=sFileIn, line=firstLineNum)
-                    else:
-                        sCode = l[beg+len(self.options.sBeginSpec):end].strip()
-                        gen.parseLine(sCode)
-                else:
-                    # Deal with an ordinary code block.
-                    l = fIn.readline()
-
-                    # Get all the lines in the spec
-                    while l and not self.isEndSpecLine(l):
-                        if self.isBeginSpecLine(l):
-                            raise CogError("Unexpected '%s'" % self.options.sBeginSpec,
-                                file=sFileIn, line=fIn.linenumber())
-                        if self.isEndOutputLine(l):
-                            raise CogError("Unexpected '%s'" % self.options.sEndOutput,
-                                file=sFileIn, line=fIn.linenumber())
-                        if not self.options.bDeleteCode:
-                            fOut.write(l)
-                        gen.parseLine(l)
-                        l = fIn.readline()
-                    if not l:
-                        raise CogError(
-                            "Cog block begun but never ended.",
-                            file=sFileIn, line=firstLineNum)
 
-                    if not self.options.bDeleteCode:
-                        fOut.write(l)
-                    gen.parseMarker(l)
+            l = fIn.readline()
 
+            # Eat all the lines in the output section.
+            previousLines = []
+            while l:
+                kind = classify(l)
+                if kind & END_OUTPUT:
+                    break
+                if kind & BEGIN_SPEC:
+                    raise CogError("Unexpected '%s'" % self.options.sBeginSpec,
+                        file=sFileIn, line=fIn.linenumber())
+                if kind & END_SPEC:
+                    raise CogError("Unexpected '%s'" % self.options.sEndSpec,
+                        file=sFileIn, line=fIn.linenumber())
+                previousLines.append(l)
                 l = fIn.readline()
 
-                # Eat all the lines in the output section.  While reading past
-                # them, compute the md5 hash of the old output.
-                previous = ""
-                hasher = hashlib.md5()
-                while l and not self.isEndOutputLine(l):
-                    if self.isBeginSpecLine(l):
-                        raise CogError("Unexpected '%s'" % self.options.sBeginSpec,
-                            file=sFileIn, line=fIn.linenumber())
-                    if self.isEndSpecLine(l):
-                        raise CogError("Unexpected '%s'" % self.options.sEndSpec,
-                            file=sFileIn, line=fIn.linenumber())
-                    previous += l
-                    hasher.update(to_bytes(l))
-                    l = fIn.readline()
-                curHash = hasher.hexdigest()
+            if not l and not self.options.bEofCanBeEnd:
+                # We reached end of file before we found the end output line.
+                raise CogError("Missing '%s' before end of file." % self.options.sEndOutput,
+                    file=sFileIn, line=fIn.linenumber())
 
-                if not l and not self.options.bEofCanBeEnd:
-                    # We reached end of file before we found the end output line.
-                    raise CogError("Missing '%s' before end of file." % self.options.sEndOutput,
-                        file=sFileIn, line=fIn.linenumber())
+            # Make the previous output available to the current code
+            block = CogBlock(''.join(previousLines))
+            block.outputEnd = len(block.text)
+            self.cogmodule.block = block
 
-                # Make the previous output available to the current code
-                self.cogmodule.previous = previous
-
-                # Write the output of the spec to be the new output if we're
-                # supposed to generate code.
-                hasher = hashlib.md5()
-                if not self.options.bNoGenerate:
-                    sFile = "<cog %s:%d>" % (sFileIn, firstLineNum)
-                    sGen = gen.evaluate(cog=self, globals=globals, fname=sFile)
-                    sGen = self.suffixLines(sGen)
-                    hasher.update(to_bytes(sGen))
-                    fOut.write(sGen)
-                newHash = hasher.hexdigest()
-
-                bSawCog = True
-
-                # Write the ending output line
-                hashMatch = self.reEndOutput.search(l)
-                if self.options.bHashOutput:
-                    if hashMatch:
-                        oldHash = hashMatch.groupdict()['hash']
-                        if oldHash != curHash:
-                            raise CogError("Output has been edited! Delete old checksum to unprotect.",
-                                file=sFileIn, line=fIn.linenumber())
-                        # Create a new end line with the correct hash.
-                        endpieces = l.split(hashMatch.group(0), 1)
-                    else:
-                        # There was no old hash, but we want a new hash.
-                        endpieces = l.split(self.options.sEndOutput, 1)
-                    l = (self.sEndFormat % newHash).join(endpieces)
-                else:
-                    # We don't want hashes output, so if there was one, get rid of
-                    # it.
-                    if hashMatch:
-                        l = l.replace(hashMatch.groupdict()['hashsect'], '', 1)
+            sGen, l = self.generateBlock(gen, l, block.oldOutputHash,
+                globals, sFileIn, firstLineNum, fIn.linenumber())
+            fOut.write(sGen)
+            bSawCog = True
 
-                if not self.options.bDeleteCode:
-                    fOut.write(l)
-                l = fIn.readline()
+            if not self.options.bDeleteCode:
+                fOut.write(l)
+            l = fIn.readline()
 
-            if not bSawCog and self.options.bWarnEmpty:
-                self.showWarning("no cog code found in %s" % sFileIn)
-        finally:
-            if fInToClose:
-                fInToClose.close()
-            if fOutToClose:
-                fOutToClose.close()
+        self.cogmodule.block = None
+
+        if not bSawCog and self.options.bWarnEmpty:
+            self.showWarning("no cog code found in %s" % sFileIn)
 
 
     # A regex for non-empty lines, used by suffixLines.
@@ -626,14 +1362,14 @@ class Cog(Redirectable):
         """ Process sInput as the text to cog.
             Return the cogged output as a string.
         """
-        fOld = StringIO(sInput)
-        fNew = StringIO()
-        self.processFile(fOld, fNew, fname=fname)
-        return fNew.getvalue()
+        return self.processBuffer(sInput, fname or '', fname or '')
 
     def replaceFile(self, sOldPath, sNewText):
         """ Replace file sOldPath with the contents sNewText
         """
+        if self.deferredReplace is not None:
+            self.deferredReplace.append(sNewText)
+            return
         if not os.access(sOldPath, os.W_OK):
             # Need to ensure we can write.
             if self.options.sMakeWritableCmd:
@@ -651,16 +1387,15 @@ class Cog(Redirectable):
 
     def saveIncludePath(self):
         self.savedInclude = self.options.includePath[:]
-        self.savedSysPath = sys.path[:]
 
     def restoreIncludePath(self):
         self.options.includePath = self.savedInclude
         self.cogmodule.path = self.options.includePath
-        sys.path = self.savedSysPath
 
     def addToIncludePath(self, includePath):
+        # The include path is searched by the file's importer, rather than
+        # being added to sys.path.
         self.cogmodule.path.extend(includePath)
-        sys.path.extend(includePath)
 
     def processOneFile(self, sFile):
         """ Process one filename through cog.
@@ -668,6 +1403,8 @@ class Cog(Redirectable):
 
         self.saveIncludePath()
         bNeedNewline = False
+        # The -I directories, before the file's own directory is added.
+        includePath = self.options.includePath[:]
 
         try:
             self.addToIncludePath(self.options.includePath)
@@ -687,9 +1424,19 @@ class Cog(Redirectable):
                     bNeedNewline = True
 
                 try:
+                    manifest = self.manifest
+                    if manifest:
+                        sFingerprint = self.incrementalFingerprint(includePath)
+                        if manifest.isStatCurrent(sFile, sFingerprint):
+                            return
                     fOldFile = self.openInputFile(sFile)
                     sOldText = fOldFile.read()
                     fOldFile.close()
+                    if manifest:
+                        if manifest.isContentCurrent(sFile, sOldText, sFingerprint):
+                            return
+                        manifest.forget(sFile)
+                    self.dependencies.pop(sFile, None)
                     sNewText = self.processString(sOldText, fname=sFile)
                     if sOldText != sNewText:
                         if self.options.verbosity >= 1:
@@ -702,6 +1449,12 @@ class Cog(Redirectable):
                         else:
                             assert self.options.bCheck
                             self.bCheckFailed = True
+                    if manifest and (self.options.bReplace or sOldText == sNewText):
+                        if self.deferredReplace:
+                            # Recorded once the file has been written.
+                            self.deferredReplace.append(sFingerprint)
+                        else:
+                            self.recordInManifest(sFile, sNewText, sFingerprint)
                 finally:
                     # The try-finally block is so we can print a partial line
                     # with the name of the file, and print (changed) on the
@@ -714,17 +1467,121 @@ class Cog(Redirectable):
         finally:
             self.restoreIncludePath()
 
+    def recordInManifest(self, sFile, sNewText, sFingerprint):
+        """ Record the successful processing of sFile, now containing
+            sNewText, in the incremental manifest.
+        """
+        codeHashes = [
+            hashlib.sha256(to_bytes(block.code)).hexdigest()
+            for block in self.iterBlocks(sNewText, sFile)
+            ]
+        if not codeHashes and self.options.bWarnEmpty:
+            # Not skipped next time, so the warning is shown again.
+            return
+        self.manifest.record(sFile, sNewText, sFingerprint, codeHashes,
+            self.dependencies.get(sFile, []))
+
+    def incrementalFingerprint(self, includePath):
+        """ The fingerprint recorded in the manifest for files processed
+            with the current options and the -I directories `includePath`.
+        """
+        key = tuple(includePath)
+        sModules = self._includeFingerprints.get(key)
+        if sModules is None:
+            sModules = self._includeFingerprints[key] = includeFingerprint(key)
+        sOptions = self.options.fingerprint() + json.dumps(includePath)
+        return hashlib.sha256(to_bytes(sOptions + sModules)).hexdigest()
+
+    def processOrQueueFile(self, sFile):
+        """ Process one filename, or queue it for the worker pool with -j.
+        """
+        if self.jobs is not None:
+            self.jobs.append((sFile, self.options.clone()))
+        else:
+            self.processOneFile(sFile)
+
     def processWildcards(self, sFile):
+        import glob
         files = glob.glob(sFile)
         if files:
             for sMatchingFile in files:
-                self.processOneFile(sMatchingFile)
+                self.processOrQueueFile(sMatchingFile)
         else:
-            self.processOneFile(sFile)
+            self.processOrQueueFile(sFile)
+
+    def processJobs(self, jobs, numJobs):
+        """ Process the queued (file name, options) pairs in a pool of
+            `numJobs` worker processes.
+
+            Each worker is its own interpreter, with its own cog module and
+            sys.path.  Workers only compute the new text of a file: results
+            are merged here in queue order, and files are replaced as they
+            would be if processed one at a time.  After a failure no more
+            work is handed out, and no later file is written.
+        """
+        if (len(jobs) < 2 or numJobs < 2 or
+                any(sFile == '-' or options.sOutputName for sFile, options in jobs)):
+            # Nothing to gain, or the files share stdin or an output file.
+            for sFile, options in jobs:
+                self.options = options
+                self.processOneFile(sFile)
+            return
+
+        manifest = self.manifest
+        pending = []
+        queue = iter(jobs)
+
+        def submit(executor):
+            job = next(queue, None)
+            if job is not None:
+                sFile, options = job
+                entry = manifest.files.get(manifest._key(sFile)) if manifest else None
+                future = executor.submit(_processJob, (sFile, options, manifest is not None, entry))
+                pending.append((sFile, options, entry, future))
+
+        # The workers are started with "spawn" everywhere: forking a process
+        # that may be running threads isn't safe.
+        import concurrent.futures
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        numJobs = min(numJobs, len(jobs))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=numJobs, mp_context=context) as executor:
+            try:
+                # Keep each worker busy, with one more job waiting.
+                for _ in range(2 * numJobs):
+                    submit(executor)
+                while pending:
+                    sFile, options, oldEntry, future = pending.pop(0)
+                    sOut, sErr, bCheckFailed, dependencies, entry, replace, err = future.result()
+                    if err is None:
+                        submit(executor)
+                    self.stdout.write(sOut)
+                    self.stderr.write(sErr)
+                    self.stdout.flush()
+                    self.bCheckFailed = self.bCheckFailed or bCheckFailed
+                    if dependencies is not None:
+                        self.dependencies[sFile] = dependencies
+                    if manifest and entry != oldEntry:
+                        if entry is None:
+                            manifest.forget(sFile)
+                        else:
+                            manifest.files[manifest._key(sFile)] = entry
+                            manifest.bDirty = True
+                    if err is not None:
+                        raise err
+                    if replace:
+                        self.options = options
+                        self.replaceFile(sFile, replace[0])
+                        if len(replace) > 1:
+                            self.recordInManifest(sFile, replace[0], replace[1])
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
 
     def processFileList(self, sFileList):
         """ Process the files in a file list.
         """
+        import shlex
         flist = self.openInputFile(sFileList)
         lines = flist.readlines()
         flist.close()
@@ -777,15 +1634,52 @@ class Cog(Redirectable):
             self.prout("Cog version %s" % __version__)
             return
 
-        if self.options.args:
-            for a in self.options.args:
-                self.processArguments([a])
-        else:
+        if not self.options.args:
             raise CogUsageError("No files to process")
 
+        if self.options.sManifest:
+            self.manifest = IncrementalManifest(self.options.sManifest)
+        # What generators see through cog.fs is as of this run.
+        self.cogmodule.fs = self.sharedFs or FileSystemSnapshot()
+        numJobs = self.options.numJobs
+        try:
+            if numJobs > 1:
+                self.jobs = []
+                try:
+                    for a in self.options.args:
+                        self.processArguments([a])
+                    jobs = self.jobs
+                finally:
+                    self.jobs = None
+                saved_options = self.options
+                try:
+                    self.processJobs(jobs, numJobs)
+                finally:
+                    self.options = saved_options
+            else:
+                for a in self.options.args:
+                    self.processArguments([a])
+        finally:
+            if self.manifest:
+                self.manifest.save()
+                self.manifest = None
+
+        if self.options.sDependenciesFile:
+            self.writeDependencies(self.options.sDependenciesFile)
+
         if self.bCheckFailed:
             raise CogCheckFailed("Check failed")
 
+    def writeDependencies(self, sPath):
+        """ Write the dependencies of the generators run to `sPath`, as JSON.
+        """
+        data = dict(
+            (sFile, [deps.asDict() for deps in blocks])
+            for sFile, blocks in self.dependencies.items()
+            )
+        with open(sPath, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+
     def main(self, argv):
         """ Handle the command-line execution for cog.
         """
@@ -812,6 +1706,47 @@ class Cog(Redirectable):
             return 1
 
 
+# The Cog used by a -j worker process for all of its jobs.
+_workerCog = None
+
+def _processJob(job):
+    """ Process one queued file in a -j worker process.
+
+        Returns the stdout and stderr text, whether a check failed, the
+        dependencies of the file's generators, its manifest entry, the new
+        text and manifest fingerprint of a file to be replaced, and the
+        exception raised, if any.
+    """
+    global _workerCog
+    sFile, options, bManifest, entry = job
+    if _workerCog is None:
+        _workerCog = Cog()
+    cog = _workerCog
+    stdout, stderr = StringIO(), StringIO()
+    cog.setOutput(stdout=stdout, stderr=stderr)
+    cog.options = options
+    cog._fixEndOutputPatterns()
+    cog.bCheckFailed = False
+    cog.dependencies = {}
+    cog.deferredReplace = []
+    cog.manifest = None
+    if bManifest:
+        cog.manifest = IncrementalManifest()
+        if entry is not None:
+            cog.manifest.files[cog.manifest._key(sFile)] = entry
+    err = None
+    try:
+        cog.processOneFile(sFile)
+    except Exception as exc:
+        err = exc
+    if cog.manifest is not None:
+        entry = cog.manifest.files.get(cog.manifest._key(sFile))
+    return (
+        stdout.getvalue(), stderr.getvalue(), cog.bCheckFailed,
+        cog.dependencies.get(sFile), entry, cog.deferredReplace, err,
+        )
+
+
 def find_cog_source(frame_summary, prologue):
     """Find cog source lines in a frame summary list, for printing tracebacks.
 
@@ -823,6 +1758,7 @@ def find_cog_source(frame_summary, prologue):
         A list of 4-item tuples, updated to correct the cog entries.
 
     """
+    import linecache
     prolines = prologue.splitlines()
     for filename, lineno, funcname, source in frame_summary:
         if not source:
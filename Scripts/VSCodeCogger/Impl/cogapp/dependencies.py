@@ -0,0 +1,192 @@
+""" Dependency tracking for cog generators.
+
+    While a generator runs, the modules it imports and the files and
+    directories it reads are recorded with an audit hook (PEP 578).  The
+    hook is installed once, and only records for the thread or context
+    that is evaluating a generator.
+"""
+
+from __future__ import absolute_import
+
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import types
+
+__all__ = ['BlockDependencies', 'noteImport', 'notePath', 'recordDependencies']
+
+
+class BlockDependencies:
+    """ The inputs used by one generator.
+
+        `modules` are the files of the modules it imported from the include
+        path, `files` the files it opened for reading, and `directories` the
+        directories it listed.  Paths are absolute.  Files in the Python
+        installation are ignored.
+    """
+    def __init__(self, sFile='', firstLineNum=0):
+        self.sFile = sFile
+        self.firstLineNum = firstLineNum
+        self.modules = set()
+        self.files = set()
+        self.directories = set()
+        self._importedNames = set()
+
+    def __repr__(self):
+        return "<BlockDependencies %s:%d>" % (self.sFile, self.firstLineNum)
+
+    def asDict(self):
+        return {
+            'file': self.sFile,
+            'line': self.firstLineNum,
+            'modules': sorted(self.modules),
+            'files': sorted(self.files),
+            'directories': sorted(self.directories),
+            }
+
+    def paths(self):
+        """ All of the recorded paths.
+        """
+        return self.modules | self.files | self.directories
+
+    def _onEvent(self, event, args):
+        if event == 'open':
+            path, mode, flags = args
+            if isinstance(path, int):
+                return
+            if mode is not None:
+                if any(c in mode for c in 'wax+'):
+                    return
+            elif flags & _WRITE_FLAGS:
+                return
+            self._addPath(self.files, path)
+        elif event == 'os.scandir' or event == 'os.listdir':
+            if _isImportSystemCall():
+                # The import system caching a directory's contents.
+                return
+            path = args[0]
+            if path is None:
+                path = '.'
+            if isinstance(path, int):
+                return
+            self._addPath(self.directories, path)
+        elif event == 'import':
+            self._importedNames.add(args[0])
+
+    @staticmethod
+    def _addPath(paths, path):
+        path = os.path.abspath(os.fsdecode(path))
+        if '__pycache__' in path or path.startswith(_ignoredPrefixes()):
+            return
+        paths.add(path)
+
+    def resolveModules(self, includePath, namespace, modules=None):
+        """ Find the module files among the recorded imports, and the modules
+            in the generator's `namespace` (which were perhaps imported by an
+            earlier generator).  Only modules in `includePath` are kept.
+            Imported names are looked up in `modules` before sys.modules.
+        """
+        dirs = tuple(os.path.join(os.path.abspath(d), '') for d in includePath)
+        if not dirs:
+            return
+        modules = modules or {}
+        candidates = [modules.get(name) or sys.modules.get(name) for name in self._importedNames]
+        candidates.extend(v for v in namespace.values() if isinstance(v, types.ModuleType))
+        for mod in candidates:
+            sModFile = getattr(mod, '__file__', None)
+            if sModFile:
+                sModFile = os.path.abspath(sModFile)
+                if sModFile.startswith(dirs):
+                    self.modules.add(sModFile)
+
+
+def pathSignature(path):
+    """ What's compared to decide whether a dependency changed: the size and
+        modification time of a file, or the modification time of a directory.
+        None if the path doesn't exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if os.path.isdir(path):
+        return [st.st_mtime_ns]
+    return [st.st_mtime_ns, st.st_size]
+
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+
+_prefixes = None
+
+def _ignoredPrefixes():
+    global _prefixes
+    if _prefixes is None:
+        _prefixes = tuple(set(
+            os.path.join(os.path.abspath(p), '')
+            for p in (sys.prefix, sys.base_prefix, sys.exec_prefix)
+            if p
+            ))
+    return _prefixes
+
+
+def _isImportSystemCall():
+    """ Was the audited function called by the import system itself?  The
+        frames above are _auditHook, _onEvent and this function.
+    """
+    frame = sys._getframe(3)
+    return frame is not None and frame.f_code.co_filename.startswith('<frozen importlib.')
+
+
+_recorder = contextvars.ContextVar('cogDependencies', default=None)
+_hookLock = threading.Lock()
+_bHookInstalled = False
+
+def _auditHook(event, args):
+    deps = _recorder.get()
+    if deps is not None:
+        try:
+            deps._onEvent(event, args)
+        except Exception:
+            # Never let bookkeeping break the generator.
+            pass
+
+def _installHook():
+    global _bHookInstalled
+    with _hookLock:
+        if not _bHookInstalled:
+            # Audit hooks can't be removed, so there is only ever one.
+            sys.addaudithook(_auditHook)
+            _bHookInstalled = True
+
+
+def noteImport(name):
+    """ Record an import of `name` made without the import statement's
+        audit event, as the cog importer's own imports are.
+    """
+    deps = _recorder.get()
+    if deps is not None:
+        deps._importedNames.add(name)
+
+
+def notePath(path, bDirectory=False):
+    """ Record a read of the file (or listing of the directory) `path`
+        made without an audited call, as when the result comes from a
+        cache.
+    """
+    deps = _recorder.get()
+    if deps is not None:
+        deps._addPath(deps.directories if bDirectory else deps.files, path)
+
+
+@contextlib.contextmanager
+def recordDependencies(deps):
+    """ Record what's used in the current context into `deps`.
+    """
+    _installHook()
+    token = _recorder.set(deps)
+    try:
+        yield deps
+    finally:
+        _recorder.reset(token)
@@ -0,0 +1,216 @@
+""" Per-file import isolation for cog generators.
+
+    Cog used to make "import cog" and the include path work by assigning
+    sys.modules['cog'] and extending sys.path for each file, which races
+    when several Cog engines run on different threads.  Instead, the code
+    of each file runs with its own builtins, whose __import__ resolves
+    "import cog" to that file's cog module and loads the modules in the
+    include path into a table private to the file.  For code that goes
+    around __import__ (importlib.import_module, or modules imported from
+    elsewhere that say "import cog"), sys.modules['cog'] is a proxy and a
+    finder on sys.meta_path searches the include path, both following the
+    file being generated in the current thread or context.
+"""
+
+from __future__ import absolute_import
+
+import builtins
+import contextlib
+import contextvars
+import importlib.machinery
+import importlib.util
+import sys
+import threading
+import types
+
+from .dependencies import noteImport
+
+__all__ = ['IncludeImporter', 'activate']
+
+
+_realImport = builtins.__import__
+_realPrint = builtins.print
+
+
+class IncludeImporter:
+    """ Imports modules for the generators of one file.
+
+        "cog" (and the file's private cog module name) are the file's cog
+        module.  Other modules come from sys.modules or sys.path as usual,
+        and otherwise from the include path, in which case they are loaded
+        into `modules` and not shared with any other file.
+
+        `builtins` is the builtins dict to run the file's code with.  Its
+        print() writes to `printTarget` when that is set, which is how -P
+        captures output without replacing sys.stdout.
+    """
+    def __init__(self, cogmodule, cogmodulename):
+        self.cogmodule = cogmodule
+        self.cogmodulename = cogmodulename
+        self.modules = {}
+        self.printTarget = None
+        self.builtins = dict(builtins.__dict__)
+        self.builtins['__import__'] = self._import
+        self.builtins['print'] = self._print
+
+    @property
+    def includePath(self):
+        return self.cogmodule.path
+
+    def _print(self, *args, **kw):
+        if kw.get('file') is None and self.printTarget is not None:
+            kw['file'] = self.printTarget
+        _realPrint(*args, **kw)
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level > 0:
+            package = globals.get('__package__') if globals else None
+            if not package or package.partition('.')[0] not in self.modules:
+                return _realImport(name, globals, locals, fromlist, level)
+            fullname = importlib.util.resolve_name('.' * level + name, package)
+        else:
+            fullname = name
+
+        module = self._load(fullname)
+        if module is None:
+            return _realImport(name, globals, locals, fromlist, level)
+
+        if not fromlist:
+            if level > 0:
+                return module
+            return self._load(fullname.partition('.')[0])
+
+        if hasattr(module, '__path__'):
+            for item in fromlist:
+                if item == '*':
+                    for sub in getattr(module, '__all__', ()):
+                        self._loadSubmodule(module, sub)
+                else:
+                    self._loadSubmodule(module, item)
+        return module
+
+    def _loadSubmodule(self, package, name):
+        if not hasattr(package, name):
+            try:
+                self._load(package.__name__ + '.' + name)
+            except ModuleNotFoundError:
+                # "from package import name" will raise the ImportError.
+                pass
+
+    def _load(self, fullname):
+        """ The include-path module `fullname`, loading it if needed.  None
+            if it isn't a module from the include path.
+        """
+        module = self.modules.get(fullname)
+        if module is not None:
+            return module
+        if fullname == 'cog' or fullname == self.cogmodulename:
+            return self.cogmodule
+
+        parentName, _, childName = fullname.rpartition('.')
+        if parentName:
+            parent = self._load(parentName)
+            if parent is None:
+                return None
+            path = getattr(parent, '__path__', None)
+            if path is None:
+                raise ModuleNotFoundError(
+                    "No module named %r; %r is not a package" % (fullname, parentName),
+                    name=fullname,
+                    )
+        else:
+            if fullname in sys.modules or self._isGlobal(fullname):
+                return None
+            path = self.includePath
+
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None:
+            if parentName:
+                raise ModuleNotFoundError("No module named %r" % fullname, name=fullname)
+            return None
+
+        module = importlib.util.module_from_spec(spec)
+        # The module's own imports and prints go through this importer too.
+        module.__builtins__ = self.builtins
+        self.modules[fullname] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del self.modules[fullname]
+            raise
+        if parentName:
+            setattr(parent, childName, module)
+        noteImport(fullname)
+        return module
+
+    @staticmethod
+    def _isGlobal(name):
+        """ Can the top-level module `name` be imported without the include
+            path?  The include path comes after sys.path, as it used to be
+            appended to it.
+        """
+        if name in sys.builtin_module_names:
+            return True
+        for finder in sys.meta_path:
+            if isinstance(finder, IncludePathFinder):
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            if find_spec is not None and find_spec(name, None) is not None:
+                return True
+        return False
+
+
+class IncludePathFinder:
+    """ A sys.meta_path finder for the include path of the file being
+        generated in the current context.  Modules found this way are
+        shared in sys.modules, like any other.
+    """
+    @staticmethod
+    def find_spec(fullname, path=None, target=None):
+        importer = _current.get()
+        if importer is None or path is not None:
+            return None
+        return importlib.machinery.PathFinder.find_spec(fullname, importer.includePath)
+
+    @staticmethod
+    def invalidate_caches():
+        pass
+
+
+class _CogModuleProxy(types.ModuleType):
+    """ sys.modules['cog']: the cog module of the file being generated in
+        the current context.
+    """
+    def __getattr__(self, name):
+        importer = _current.get()
+        if importer is None:
+            raise AttributeError("cog.%s is only available while cog is running a generator" % name)
+        return getattr(importer.cogmodule, name)
+
+
+_current = contextvars.ContextVar('cogImporter', default=None)
+_installLock = threading.Lock()
+_bFinderInstalled = False
+
+def _install():
+    global _bFinderInstalled
+    if isinstance(sys.modules.get('cog'), _CogModuleProxy) and _bFinderInstalled:
+        return
+    with _installLock:
+        if not isinstance(sys.modules.get('cog'), _CogModuleProxy):
+            sys.modules['cog'] = _CogModuleProxy('cog')
+        if not _bFinderInstalled:
+            sys.meta_path.append(IncludePathFinder())
+            _bFinderInstalled = True
+
+
+@contextlib.contextmanager
+def activate(importer):
+    """ Make `importer`'s file the one being generated in this context.
+    """
+    _install()
+    token = _current.set(importer)
+    try:
+        yield importer
+    finally:
+        _current.reset(token)
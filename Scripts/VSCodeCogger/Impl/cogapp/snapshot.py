@@ -0,0 +1,147 @@
+""" A file system snapshot shared by the generators of a cog run.
+
+    Generators that scan the same directories (for example, the files of
+    nested projects) get the listings and stat results of the first scan
+    from memory.  The snapshot is what the file system looked like when
+    each path was first used in the run; it isn't updated, so a new
+    snapshot is needed to see later changes.
+"""
+
+from __future__ import absolute_import
+
+import fnmatch
+import os
+import threading
+from collections import namedtuple
+
+from .dependencies import notePath
+
+__all__ = ['FileSystemSnapshot', 'SnapshotEntry']
+
+
+SnapshotEntry = namedtuple('SnapshotEntry', 'name path is_dir is_file is_symlink')
+SnapshotEntry.__doc__ = """ An entry of a directory, like os.DirEntry but without stat(). """
+
+
+class FileSystemSnapshot:
+    """ Memoized directory listings and stat results, available to
+        generators as `cog.fs`.  Safe to share between threads and Cog
+        engines.
+
+        Reading through the snapshot records dependencies like reading the
+        file system directly does, whether or not the result was cached.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Absolute directory path -> {name: SnapshotEntry}, or the OSError
+        # raised listing it.
+        self._listings = {}
+        # Absolute path -> os.stat_result, or the OSError raised.
+        self._stats = {}
+
+    def scandir(self, path='.'):
+        """ The entries of the directory `path`, sorted by name.
+        """
+        return sorted(self._listing(path).values())
+
+    def listdir(self, path='.'):
+        """ The names in the directory `path`, sorted.
+        """
+        return sorted(self._listing(path))
+
+    def stat(self, path):
+        """ os.stat(path), following symlinks.
+        """
+        sPath = os.path.abspath(os.fsdecode(path))
+        notePath(sPath)
+        with self._lock:
+            result = self._stats.get(sPath)
+        if result is None:
+            try:
+                result = os.stat(sPath)
+            except OSError as exc:
+                result = exc
+            with self._lock:
+                result = self._stats.setdefault(sPath, result)
+        if isinstance(result, OSError):
+            raise result
+        return result
+
+    def exists(self, path):
+        return self._entry(path) is not None
+
+    def isdir(self, path):
+        entry = self._entry(path)
+        return entry is not None and entry.is_dir
+
+    def isfile(self, path):
+        entry = self._entry(path)
+        return entry is not None and entry.is_file
+
+    def walk(self, top, exclude=()):
+        """ Like os.walk(top) (top-down, ignoring errors), yielding
+            (dirpath, dirnames, filenames).  Directories whose names match
+            one of the fnmatch patterns in `exclude` are skipped, as are
+            those removed from `dirnames` by the caller.
+        """
+        top = os.fsdecode(top)
+        try:
+            entries = self.scandir(top)
+        except OSError:
+            return
+        dirnames = []
+        filenames = []
+        links = set()
+        for entry in entries:
+            if entry.is_dir:
+                if not any(fnmatch.fnmatch(entry.name, pat) for pat in exclude):
+                    dirnames.append(entry.name)
+                    if entry.is_symlink:
+                        links.add(entry.name)
+            else:
+                filenames.append(entry.name)
+        yield top, dirnames, filenames
+        for name in dirnames:
+            # Like os.walk, don't follow links to directories.
+            if name not in links:
+                for result in self.walk(os.path.join(top, name), exclude):
+                    yield result
+
+    def _listing(self, path):
+        sDir = os.path.abspath(os.fsdecode(path))
+        notePath(sDir, bDirectory=True)
+        with self._lock:
+            listing = self._listings.get(sDir)
+        if listing is None:
+            try:
+                listing = {}
+                with os.scandir(sDir) as it:
+                    for entry in it:
+                        try:
+                            bDir = entry.is_dir()
+                            bFile = not bDir and entry.is_file()
+                        except OSError:
+                            bDir = bFile = False
+                        listing[entry.name] = SnapshotEntry(
+                            entry.name, entry.path, bDir, bFile, entry.is_symlink(),
+                            )
+            except OSError as exc:
+                listing = exc
+            with self._lock:
+                listing = self._listings.setdefault(sDir, listing)
+        if isinstance(listing, OSError):
+            raise listing
+        return listing
+
+    def _entry(self, path):
+        """ The entry for `path` in its parent's listing, or None.
+        """
+        sPath = os.path.abspath(os.fsdecode(path))
+        sParent, sName = os.path.split(sPath)
+        if not sName:
+            # A root directory.
+            return SnapshotEntry(sPath, sPath, os.path.isdir(sPath), False, False)
+        try:
+            return self._listing(sParent).get(sName)
+        except OSError:
+            return None
@@ -6,6 +6,9 @@
 
 from __future__ import absolute_import
 
+import glob
+import hashlib
+import json
 import os
 import os.path
 import random
@@ -17,10 +20,12 @@ import tempfile
 import threading
 
 from .backward import StringIO, to_bytes, TestCase, PY3
-from .cogapp import Cog, CogOptions, CogGenerator
-from .cogapp import CogError, CogUsageError, CogGeneratedError, CogUserException
+from .cogapp import Cog, CogOptions, CogGenerator, CogBlock, CodeCache, MarkerScanner, getMarkerScanner
+from .cogapp import codeCache
+from .cogapp import CogError, CogUsageError, CogGeneratedError, CogUserException, CogCheckFailed
 from .cogapp import usage, __version__, main
 from .makefiles import *
+from .snapshot import FileSystemSnapshot
 from .whiteutils import reindentBlock
 
 
@@ -470,6 +475,144 @@ class CogTestsInMemory(TestCase):
         self.assertEqual(Cog().processString(infile), reindentBlock(outfile))
 
 
+class CogBlockTests(TestCase):
+    """ Test the spans found by Cog.iterBlocks.
+    """
+
+    def testSpans(self):
+        text = reindentBlock("""\
+            prologue
+            //[[[cog
+            cog.outl("hi")
+            //]]]
+            old 1
+            old 2
+            //[[[end]]]
+            //[[[cog cog.outl("one") ]]]
+            //[[[end]]]
+            """)
+        blocks = list(Cog().iterBlocks(text))
+        self.assertEqual(len(blocks), 2)
+
+        b = blocks[0]
+        self.assertFalse(b.bOneLine)
+        self.assertEqual(b.firstLineNum, 2)
+        self.assertEqual(b.beginSpecLine, '//[[[cog\n')
+        self.assertEqual(b.code, 'cog.outl("hi")\n')
+        self.assertEqual(b.endSpecLine, '//]]]\n')
+        self.assertEqual(b.previous, 'old 1\nold 2\n')
+        self.assertEqual(b.endOutputLine, '//[[[end]]]\n')
+        self.assertEqual(b.endOutputLineNum, 7)
+
+        b = blocks[1]
+        self.assertTrue(b.bOneLine)
+        self.assertEqual(b.firstLineNum, 8)
+        self.assertEqual(b.code, ' cog.outl("one") ')
+        self.assertEqual(b.beginSpecLine, b.endSpecLine)
+        self.assertEqual(b.previous, '')
+
+    def testHashIsLazy(self):
+        block = CogBlock('old output\n')
+        block.outputEnd = len(block.text)
+        self.assertIsNone(block._oldOutputHash)
+        self.assertEqual(block.oldOutputHash(), hashlib.md5(b'old output\n').hexdigest())
+        self.assertIsNotNone(block._oldOutputHash)
+
+    def testHashOnlyComputedForChecksums(self):
+        cog = Cog()
+        blocks = []
+        realIterBlocks = cog.iterBlocks
+        def iterBlocks(*args):
+            for block in realIterBlocks(*args):
+                blocks.append(block)
+                yield block
+        cog.iterBlocks = iterBlocks
+
+        text = "//[[[cog cog.outl('x') ]]]\nold\n//[[[end]]] (checksum: 0123)\n"
+        cog.processString(text)
+        self.assertIsNone(blocks[0]._oldOutputHash)
+
+        cog.options.bHashOutput = True
+        with self.assertRaisesRegex(CogError, r"^f.txt\(3\): Output has been edited!"):
+            cog.processString(text, "f.txt")
+        self.assertIsNotNone(blocks[1]._oldOutputHash)
+
+
+class ProcessLinesTests(TestCase):
+    """ The line-by-line engine used for stdin must agree with the buffer engine.
+    """
+
+    def assertSameResult(self, infile, args=()):
+        infile = reindentBlock(infile)
+
+        def run(func):
+            cog = Cog()
+            cog.options.parseArgs(list(args))
+            cog._fixEndOutputPatterns()
+            try:
+                return func(cog)
+            except CogError as err:
+                return "error: %s" % err
+
+        def viaLines(cog):
+            fOut = StringIO()
+            cog.processFile(StringIO(infile), fOut, fname='infile.txt')
+            return fOut.getvalue()
+
+        def viaBuffer(cog):
+            return cog.processString(infile, fname='infile.txt')
+
+        self.assertEqual(run(viaLines), run(viaBuffer))
+
+    def testBlocks(self):
+        self.assertSameResult("""\
+            prologue
+            //[[[cog
+            cog.outl("chunk1")
+            //]]]
+            old stuff
+            //[[[end]]]
+            between
+            //[[[cog cog.out(cog.previous) ]]]
+            kept
+            //[[[end]]]
+            no final newline""")
+
+    def testChecksums(self):
+        self.assertSameResult("""\
+            //[[[cog cog.outl("hello") ]]]
+            //[[[end]]] (checksum: d41d8cd98f00b204e9800998ecf8427e)
+            """, args=['-c'])
+
+    def testEofCanBeEnd(self):
+        self.assertSameResult("""\
+            //[[[cog cog.outl("hello") ]]]
+            old
+            """, args=['-z'])
+
+    def testErrors(self):
+        for infile in [
+            "a\nb\n//]]]\n",
+            "a\n//[[[end]]]\n",
+            "//[[[cog\nx\n//[[[cog\n//]]]\n",
+            "//[[[cog\nx\n//[[[end]]]\n",
+            "//[[[cog\nx\n",
+            "//[[[cog x ]]]\nold\n//]]]\n",
+            "//[[[cog x ]]]\nold\n//[[[cog\n",
+            "//[[[cog x ]]]\nold\n",
+            "]]] [[[cog\n",
+            ]:
+            self.assertSameResult(infile)
+
+    def testDeleteCode(self):
+        self.assertSameResult("""\
+            //[[[cog
+            cog.outl("hello")
+            //]]]
+            //[[[end]]]
+            """, args=['-d'])
+
+
 class CogOptionsTests(TestCase):
     """ Test the CogOptions class.
     """
@@ -517,6 +660,46 @@ class CogOptionsTests(TestCase):
         self.assertEqual('c', o.sEndOutput)
 
 
+class MarkerScannerTests(TestCase):
+    """ Test the MarkerScanner class.
+    """
+
+    def testClassifyMatchesCog(self):
+        # The single-pass classification agrees with the individual predicates.
+        cog = Cog()
+        scanner = getMarkerScanner(cog.options)
+        lines = [
+            'plain text\n',
+            '//[[[cog\n',
+            '//]]]\n',
+            '//[[[end]]]\n',
+            '//[[[cog cog.outl("x") ]]]\n',
+            '//[[[cog ]]] [[[end]]]\n',
+            ']]] [[[end]]]\n',
+            '[[[co]]\n',
+            '',
+            ]
+        for l in lines:
+            kind = scanner.classify(l)
+            self.assertEqual(bool(kind & MarkerScanner.BEGIN_SPEC), cog.isBeginSpecLine(l), l)
+            self.assertEqual(bool(kind & MarkerScanner.END_SPEC), cog.isEndSpecLine(l), l)
+            self.assertEqual(bool(kind & MarkerScanner.END_OUTPUT), cog.isEndOutputLine(l), l)
+
+    def testOverlappingMarkers(self):
+        scanner = MarkerScanner('**(', '**)', '**(end)**')
+        self.assertEqual(scanner.classify('//**(end)**\n'), MarkerScanner.BEGIN_SPEC | MarkerScanner.END_OUTPUT)
+        self.assertEqual(scanner.classify('//**)\n'), MarkerScanner.END_SPEC)
+        self.assertEqual(scanner.classify('//*(*)\n'), MarkerScanner.TEXT)
+
+    def testScannerIsShared(self):
+        o = CogOptions()
+        p = CogOptions()
+        self.assertIs(getMarkerScanner(o), getMarkerScanner(p))
+        p.parseArgs(['--markers', 'a b c'])
+        self.assertIsNot(getMarkerScanner(o), getMarkerScanner(p))
+        self.assertEqual(getMarkerScanner(p).classify('xbx'), MarkerScanner.END_SPEC)
+
+
 class FileStructureTests(TestCase):
     """ Test cases to check that we're properly strict about the structure
         of files.
@@ -800,17 +983,76 @@ class TestCaseWithTempDir(TestCase):
         self.assertEqual(sFileContent, to_bytes(sContent))
 
 
+class CodeCacheTests(TestCaseWithTempDir):
+
+    code = "def f():\n    return 1\nf()\n"
+
+    def testCompiledOnce(self):
+        cache = CodeCache()
+        code1 = cache.compile(self.code, "import cog\n", "cog", "<cog a.txt:1>")
+        code2 = cache.compile(self.code, "import cog\n", "cog", "<cog b.txt:7>")
+        self.assertEqual(code1.co_filename, "<cog a.txt:1>")
+        self.assertEqual(code2.co_filename, "<cog b.txt:7>")
+        self.assertEqual(code1.co_code, code2.co_code)
+        # Nested code objects get the new file name too.
+        funcs = [c for c in code2.co_consts if hasattr(c, 'co_filename')]
+        self.assertEqual([f.co_filename for f in funcs], ["<cog b.txt:7>"])
+
+    def testKeyedByModuleName(self):
+        cache = CodeCache()
+        cache.compile(self.code, "import cog\n", "cog", "<cog a.txt:1>")
+        cache.compile(self.code, "import cog\n", "cog_x", "<cog a.txt:1>")
+        self.assertEqual(len(cache._entries), 2)
+
+    def testLeastRecentlyUsed(self):
+        cache = CodeCache(maxEntries=2)
+        for i in range(3):
+            cache.compile("x = %d\n" % i, "", "cog", "<cog a.txt:1>")
+        self.assertEqual([k[0] for k in cache._entries], ["x = 1\n", "x = 2\n"])
+
+    def testDiskCache(self):
+        cache = CodeCache()
+        cache.compile(self.code, "import cog\n", "cog", "<cog a.txt:1>", "cache")
+        self.assertEqual(len(os.listdir("cache")), 1)
+
+        # A new process finds the code on disk.
+        cache = CodeCache()
+        key = (self.code, "import cog\n", "cog")
+        code = cache._load("cache", key)
+        self.assertIsNotNone(code)
+        self.assertEqual(
+            cache.compile(self.code, "import cog\n", "cog", "<cog b.txt:3>", "cache").co_filename,
+            "<cog b.txt:3>")
+
+    def testDiskEviction(self):
+        cache = CodeCache(maxDiskBytes=1)
+        for i in range(5):
+            cache.compile("x = %d\n" % i, "", "cog", "<cog a.txt:1>", "cache")
+        self.assertLessEqual(len(os.listdir("cache")), 1)
+
+    def testCodeCacheOption(self):
+        d = {
+            'test.cog': """\
+                //[[[cog cog.outl("hello") ]]]
+                //[[[end]]]
+                """,
+            }
+        makeFiles(d)
+        self.cog.callableMain(['argv0', '-r', '--code-cache=cache', 'test.cog'])
+        self.assertEqual(len(os.listdir("cache")), 1)
+
+
 class ArgumentHandlingTests(TestCaseWithTempDir):
 
     def testArgumentFailure(self):
         # Return value 2 means usage problem.
-        self.assertEqual(self.cog.main(['argv0', '-j']), 2)
+        self.assertEqual(self.cog.main(['argv0', '-k']), 2)
         output = self.output.getvalue()
-        self.assertIn("option -j not recognized", output)
+        self.assertIn("option -k not recognized", output)
         with self.assertRaisesRegex(CogUsageError, r"^No files to process$"):
             self.cog.callableMain(['argv0'])
-        with self.assertRaisesRegex(CogUsageError, r"^option -j not recognized$"):
-            self.cog.callableMain(['argv0', '-j'])
+        with self.assertRaisesRegex(CogUsageError, r"^option -k not recognized$"):
+            self.cog.callableMain(['argv0', '-k'])
 
     def testNoDashOAndAtFile(self):
         d = {
@@ -964,6 +1206,15 @@ class TestMain(TestCaseWithTempDir):
             expected = expected.replace("MYCODE", "mycode.py")
         assert expected == sys.stderr.getvalue()
 
+    def test_error_report_from_code_cache(self):
+        # Cached code still reports the right file and lines.
+        codeCache.clear()
+        makeFiles(self.files)
+        sys.argv = ["argv0", "-r", "test.cog"]
+        main()
+        sys.stderr = StringIO()
+        self.check_error_report()
+
     def test_error_in_prologue(self):
         makeFiles(self.files)
         sys.argv = ["argv0", "-p", "import mycode; mycode.boom()", "-r", "test.cog"]
@@ -1673,6 +1924,119 @@ class CogIncludeTests(TestCaseWithImports):
         self.assertFilesSame('code/test.cog', 'code/test.out')
 
 
+class IsolationTests(TestCaseWithImports):
+
+    d = {
+        'one': {
+            'mymodule.py': """\
+                import cog
+                cog.outl("mymodule in one for " + cog.inFile)
+                """,
+            },
+        'two': {
+            'mymodule.py': """\
+                import cog
+                cog.outl("mymodule in two for " + cog.inFile)
+                """,
+            },
+        'pkg': {
+            'mypackage': {
+                '__init__.py': "",
+                'helper.py': """\
+                    from . import names
+                    def greet():
+                        return "hello " + names.NAME
+                    """,
+                'names.py': """\
+                    NAME = "package"
+                    """,
+                },
+            },
+        }
+
+    def setUp(self):
+        super(IsolationTests, self).setUp()
+        makeFiles(self.d)
+
+    def testModulesArePerFile(self):
+        # A module that generates output when imported does so for each file.
+        self.cog.cogmodule.path = [os.path.abspath('one')]
+        sInput = "//[[[cog import mymodule ]]]\n//[[[end]]]\n"
+        self.assertIn("mymodule in one for a.txt", self.cog.processString(sInput, 'a.txt'))
+        self.assertIn("mymodule in one for b.txt", self.cog.processString(sInput, 'b.txt'))
+        self.assertNotIn('mymodule', sys.modules)
+        self.assertNotIn('cog_' + hashlib.md5(b'a.txt').hexdigest(), sys.modules)
+
+    def testConcurrentCogs(self):
+        barrier = threading.Barrier(2, timeout=10)
+        sInput = """\
+            //[[[cog
+            barrier.wait()
+            import mymodule
+            barrier.wait()
+            cog.outl("done with " + cog.inFile)
+            //]]]
+            //[[[end]]]
+            """
+        results = {}
+
+        def run(sDir):
+            cog = Cog()
+            cog.cogmodule.path = [os.path.abspath(sDir)]
+            results[sDir] = cog.processBuffer(
+                reindentBlock(sInput), sDir + '.txt', sDir + '.txt', {'barrier': barrier},
+                )
+
+        threads = [threading.Thread(target=run, args=(sDir,)) for sDir in ['one', 'two']]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for sDir in ['one', 'two']:
+            self.assertIn("mymodule in %s for %s.txt\ndone with %s.txt\n" % (sDir, sDir, sDir), results[sDir])
+
+    def testPackages(self):
+        self.cog.cogmodule.path = [os.path.abspath('pkg')]
+        sInput = """\
+            //[[[cog
+            import mypackage.helper
+            from mypackage import names
+            cog.outl(mypackage.helper.greet() + " " + names.NAME)
+            //]]]
+            //[[[end]]]
+            """
+        self.assertIn("hello package package\n", self.cog.processString(reindentBlock(sInput), 'a.txt'))
+        self.assertNotIn('mypackage', sys.modules)
+
+    def testImportlibAndCogProxy(self):
+        # Code that goes around the import statement still sees the include
+        # path and the cog module of the file.
+        self.cog.cogmodule.path = [os.path.abspath('one')]
+        sInput = """\
+            //[[[cog
+            import importlib
+            importlib.import_module('mymodule')
+            //]]]
+            //[[[end]]]
+            """
+        self.assertIn("mymodule in one for a.txt", self.cog.processString(reindentBlock(sInput), 'a.txt'))
+
+    def testPrintOutputLeavesStdoutAlone(self):
+        self.cog.options.bPrintOutput = True
+        real_stdout = sys.stdout
+        sInput = """\
+            //[[[cog
+            import sys
+            assert sys.stdout is stdout
+            print("printed")
+            //]]]
+            //[[[end]]]
+            """
+        sOutput = self.cog.processBuffer(reindentBlock(sInput), 'a.txt', 'a.txt', {'stdout': real_stdout})
+        self.assertIn("printed\n", sOutput)
+        self.assertIs(sys.stdout, real_stdout)
+
+
 class CogTestsInFiles(TestCaseWithTempDir):
 
     def testWarnIfNoCogCode(self):
@@ -2189,6 +2553,382 @@ class CheckTests(TestCaseWithTempDir):
         self.assert_made_files_unchanged(d)
 
 
+class IncrementalTests(TestCaseWithImports):
+
+    def setUp(self):
+        super(IncrementalTests, self).setUp()
+        d = {
+            'test.cog': """\
+                //[[[cog
+                open('runs.txt', 'a').write('x')
+                import mymodule
+                cog.outl(mymodule.value + WHAT)
+                //]]]
+                //[[[end]]]
+                """,
+            'include': {
+                'mymodule.py': """\
+                    value = 'hello '
+                    """,
+                },
+            }
+        makeFiles(d)
+
+    def run_incremental(self, *args):
+        sys.modules.pop('mymodule', None)
+        self.newCog()
+        self.cog.callableMain(
+            ['argv0', '-r', '--incremental=manifest.json', '-I', 'include'] + list(args) + ['test.cog']
+            )
+
+    def numRuns(self):
+        with open('runs.txt') as f:
+            return len(f.read())
+
+    def testUnchangedFileIsSkipped(self):
+        self.run_incremental('-D', 'WHAT=world')
+        self.assertIn("hello world", open('test.cog').read())
+        self.assertEqual(self.numRuns(), 1)
+        self.run_incremental('-D', 'WHAT=world')
+        self.assertEqual(self.numRuns(), 1)
+
+    def testTouchedFileIsSkipped(self):
+        self.run_incremental('-D', 'WHAT=world')
+        st = os.stat('test.cog')
+        os.utime('test.cog', ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.run_incremental('-D', 'WHAT=world')
+        self.assertEqual(self.numRuns(), 1)
+
+    def testChangesAreProcessed(self):
+        self.run_incremental('-D', 'WHAT=world')
+        # A different define.
+        self.run_incremental('-D', 'WHAT=there')
+        self.assertEqual(self.numRuns(), 2)
+        self.assertIn("hello there", open('test.cog').read())
+        # A changed include module.
+        with open('include/mymodule.py', 'w') as f:
+            f.write("value = 'goodbye '\n")
+        self.run_incremental('-D', 'WHAT=there')
+        self.assertEqual(self.numRuns(), 3)
+        self.assertIn("goodbye there", open('test.cog').read())
+        # A changed file.
+        with open('test.cog', 'a') as f:
+            f.write("more\n")
+        self.run_incremental('-D', 'WHAT=there')
+        self.assertEqual(self.numRuns(), 4)
+
+    def testFailuresAreNotRecorded(self):
+        with self.assertRaises(CogUserException):
+            self.run_incremental()
+        self.run_incremental('-D', 'WHAT=world')
+        self.assertEqual(self.numRuns(), 2)
+
+    def testEmptyFileWarnsEveryTime(self):
+        makeFiles({'empty.txt': "No cog here.\n"})
+        for _ in range(2):
+            self.newCog()
+            self.cog.callableMain(['argv0', '-e', '-r', '--incremental=manifest.json', 'empty.txt'])
+            self.assertIn("Warning: no cog code found in empty.txt", self.output.getvalue())
+
+    def testFingerprintIgnoresArgumentOrder(self):
+        makeFiles({'sub': {'other.cog': "No cog here either.\n"}})
+        self.run_incremental('-D', 'WHAT=world', 'sub/other.cog')
+        with open('manifest.json') as f:
+            fingerprints = set(e['fingerprint'] for e in json.load(f)['files'].values())
+        self.assertEqual(len(fingerprints), 1)
+        os.remove('manifest.json')
+        self.run_incremental('-D', 'WHAT=world')
+        with open('manifest.json') as f:
+            self.assertEqual(
+                set(e['fingerprint'] for e in json.load(f)['files'].values()),
+                fingerprints,
+                )
+
+    def testNeedsReplaceOrCheck(self):
+        with self.assertRaisesRegex(CogUsageError, r"^Can't use --incremental without -r or --check$"):
+            self.cog.callableMain(['argv0', '--incremental=manifest.json', 'test.cog'])
+
+
+class DependencyTests(TestCaseWithImports):
+
+    def setUp(self):
+        super(DependencyTests, self).setUp()
+        d = {
+            'test.cog': """\
+                //[[[cog
+                open('runs.txt', 'a').write('x')
+                import depmodule, os
+                cog.outl(depmodule.value + open('data.txt').read().strip())
+                cog.outl(" ".join(sorted(os.listdir('items'))))
+                //]]]
+                //[[[end]]]
+                """,
+            'data.txt': "one\n",
+            'items': {
+                'a.txt': "",
+                },
+            'include': {
+                'depmodule.py': """\
+                    value = 'data: '
+                    """,
+                },
+            }
+        makeFiles(d)
+
+    def run_cog(self, *args):
+        sys.modules.pop('depmodule', None)
+        self.newCog()
+        self.cog.callableMain(['argv0', '-r', '-I', 'include'] + list(args) + ['test.cog'])
+
+    def numRuns(self):
+        with open('runs.txt') as f:
+            return len(f.read())
+
+    def testDependenciesAreRecorded(self):
+        self.run_cog('--dependencies=deps.json')
+        with open('deps.json') as f:
+            deps = json.load(f)
+        self.assertEqual(list(deps), ['test.cog'])
+        block, = deps['test.cog']
+        self.assertEqual(block['file'], 'test.cog')
+        self.assertEqual(block['line'], 1)
+        self.assertEqual(block['modules'], [os.path.abspath('include/depmodule.py')])
+        self.assertIn(os.path.abspath('data.txt'), block['files'])
+        # Files written by the generator aren't inputs.
+        self.assertNotIn(os.path.abspath('runs.txt'), block['files'])
+        self.assertEqual(block['directories'], [os.path.abspath('items')])
+
+    def testListingOwnDirectory(self):
+        # The input file's directory is on sys.path, but a generator listing
+        # it still depends on it.
+        makeFiles({
+            'sub': {
+                'gen.cog': """\
+                    //[[[cog
+                    import glob, os
+                    sDir = os.path.dirname(cog.inFile)
+                    for f in sorted(glob.glob(os.path.join(sDir, '*.txt'))):
+                        cog.outl(os.path.basename(f))
+                    //]]]
+                    //[[[end]]]
+                    """,
+                'a.txt': "",
+                },
+            })
+        self.newCog()
+        argv = ['argv0', '-r', '--incremental=m.json', '--dependencies=d.json', 'sub/gen.cog']
+        self.cog.callableMain(argv)
+        with open('d.json') as f:
+            block, = json.load(f)['sub/gen.cog']
+        self.assertEqual(block['directories'], [os.path.abspath('sub')])
+        makeFiles({'sub': {'b.txt': ""}})
+        st = os.stat('sub')
+        os.utime('sub', ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.newCog()
+        self.cog.callableMain(argv)
+        self.assertIn("a.txt\nb.txt\n", open('sub/gen.cog').read())
+
+    def testModuleImportedByEarlierBlock(self):
+        makeFiles({
+            'two.cog': """\
+                //[[[cog
+                import depmodule
+                //]]]
+                //[[[end]]]
+                //[[[cog
+                cog.outl(depmodule.value)
+                //]]]
+                //[[[end]]]
+                """,
+            })
+        self.run_cog('--dependencies=deps.json', 'two.cog')
+        with open('deps.json') as f:
+            deps = json.load(f)
+        sModule = os.path.abspath('include/depmodule.py')
+        for block in deps['two.cog']:
+            self.assertEqual(block['modules'], [sModule])
+
+    def testIncrementalRerunsWhenDependenciesChange(self):
+        self.run_cog('--incremental=manifest.json')
+        self.assertIn("data: one", open('test.cog').read())
+        self.run_cog('--incremental=manifest.json')
+        self.assertEqual(self.numRuns(), 1)
+        # A changed data file.
+        with open('data.txt', 'w') as f:
+            f.write("two, longer\n")
+        self.run_cog('--incremental=manifest.json')
+        self.assertEqual(self.numRuns(), 2)
+        self.assertIn("data: two, longer", open('test.cog').read())
+        # A new file in a listed directory.
+        makeFiles({'items': {'b.txt': ""}})
+        st = os.stat('items')
+        os.utime('items', ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.run_cog('--incremental=manifest.json')
+        self.assertEqual(self.numRuns(), 3)
+        self.assertIn("a.txt b.txt", open('test.cog').read())
+        self.run_cog('--incremental=manifest.json')
+        self.assertEqual(self.numRuns(), 3)
+
+
+class SnapshotTests(TestCaseWithTempDir):
+
+    def setUp(self):
+        super(SnapshotTests, self).setUp()
+        gen = """\
+            //[[[cog
+            for sDir, dirs, files in cog.fs.walk('tree', exclude=['skip*']):
+                cog.outl(sDir.replace(os.sep, '/') + ': ' + ' '.join(files))
+            cog.outl(str(cog.fs.isfile('tree/a.txt')) + ' ' + str(cog.fs.isdir('tree/sub')))
+            //]]]
+            //[[[end]]]
+            """
+        makeFiles({
+            'one.cog': "//[[[cog import os]]]\n//[[[end]]]\n" + reindentBlock(gen),
+            'two.cog': "//[[[cog import os]]]\n//[[[end]]]\n" + reindentBlock(gen),
+            'tree': {
+                'a.txt': "",
+                'sub': {'b.txt': ""},
+                'skipped': {'c.txt': ""},
+                },
+            })
+
+    def testWalk(self):
+        self.newCog()
+        self.cog.callableMain(['argv0', '-r', 'one.cog'])
+        self.assertIn("tree: a.txt\ntree/sub: b.txt\nTrue True\n", open('one.cog').read())
+
+    def testListingsAreSharedInARun(self):
+        self.newCog()
+        fs = FileSystemSnapshot()
+        self.cog.setFileSystem(fs)
+        self.cog.callableMain(['argv0', '-r', 'one.cog'])
+        # A change made during the run isn't seen by later files.
+        makeFiles({'tree': {'new.txt': ""}})
+        self.cog.callableMain(['argv0', '-r', 'two.cog'])
+        self.assertIn("tree: a.txt\n", open('two.cog').read())
+        # A new run sees it.
+        self.newCog()
+        self.cog.callableMain(['argv0', '-r', 'two.cog'])
+        self.assertIn("tree: a.txt new.txt\n", open('two.cog').read())
+
+    def testSharedBetweenEngines(self):
+        fs = FileSystemSnapshot()
+        self.assertEqual(fs.listdir('tree'), ['a.txt', 'skipped', 'sub'])
+        os.remove('tree/a.txt')
+        self.newCog()
+        self.cog.setFileSystem(fs)
+        self.cog.callableMain(['argv0', '-r', 'one.cog'])
+        self.assertIn("tree: a.txt\n", open('one.cog').read())
+
+    def testMissingPaths(self):
+        fs = FileSystemSnapshot()
+        self.assertFalse(fs.exists('nothere/x.txt'))
+        self.assertFalse(fs.isfile('tree/sub'))
+        with self.assertRaises(OSError):
+            fs.listdir('nothere')
+        with self.assertRaises(OSError):
+            fs.stat('tree/nothere.txt')
+        self.assertEqual(list(fs.walk('nothere')), [])
+        self.assertEqual(fs.stat('tree/a.txt').st_size, 0)
+
+    def testCachedReadsAreDependencies(self):
+        fs = FileSystemSnapshot()
+        fs.listdir('tree')
+        fs.listdir('tree/sub')
+        self.newCog()
+        self.cog.setFileSystem(fs)
+        self.cog.callableMain(['argv0', '-r', '--dependencies=deps.json', 'one.cog'])
+        with open('deps.json') as f:
+            block = json.load(f)['one.cog'][1]
+        self.assertEqual(block['directories'], [os.path.abspath('tree'), os.path.abspath('tree/sub')])
+
+
+class ParallelTests(TestCaseWithTempDir):
+
+    def setUp(self):
+        super(ParallelTests, self).setUp()
+        d = {
+            'cogfiles.txt': """\
+                one.cog
+                two.cog
+                three.cog -D extra=yes
+                four.cog
+                """,
+            }
+        for sName in ['one', 'two', 'three', 'four']:
+            d[sName + '.cog'] = """\
+                //[[[cog
+                import cog
+                cog.outl("%s " + cog.inFile + " " + globals().get('extra', 'no'))
+                //]]]
+                //[[[end]]]
+                """ % sName
+        makeFiles(d)
+
+    def testSameAsSerial(self):
+        original = dict((f, open(f).read()) for f in glob.glob('*.cog'))
+        self.cog.callableMain(['argv0', '-r', '@cogfiles.txt'])
+        sSerialOutput = self.output.getvalue()
+        serial = dict((f, open(f).read()) for f in original)
+        for f, sText in original.items():
+            with open(f, 'w') as fOut:
+                fOut.write(sText)
+        self.newCog()
+        self.cog.callableMain(['argv0', '-j', '3', '-r', '@cogfiles.txt'])
+        self.assertEqual(self.output.getvalue(), sSerialOutput)
+        self.assertEqual(sSerialOutput, "".join(
+            "Cogging %s  (changed)\n" % f for f in ['one.cog', 'two.cog', 'three.cog', 'four.cog']
+            ))
+        for f, sText in serial.items():
+            self.assertEqual(open(f).read(), sText)
+        self.assertIn("three three.cog yes", serial['three.cog'])
+        self.assertIn("four four.cog no", serial['four.cog'])
+
+    def testCheckFailure(self):
+        self.cog.callableMain(['argv0', '-r', 'one.cog', 'two.cog'])
+        self.newCog()
+        with self.assertRaisesRegex(CogCheckFailed, r"^Check failed$"):
+            self.cog.callableMain(['argv0', '-j', '2', '--check', '--verbosity=1', '@cogfiles.txt'])
+        self.assertEqual(self.output.getvalue(), "Checking three.cog  (changed)\nChecking four.cog  (changed)\n")
+
+    def testFirstErrorIsRaised(self):
+        makeFiles({
+            'two.cog': """\
+                //[[[cog
+                cog.error("Two is bad")
+                //]]]
+                //[[[end]]]
+                """,
+            'three.cog': """\
+                //[[[cog
+                cog.error("Three is bad")
+                //]]]
+                //[[[end]]]
+                """,
+            })
+        with self.assertRaisesRegex(CogGeneratedError, r"^Two is bad$"):
+            self.cog.callableMain(['argv0', '-j', '4', '-r', '@cogfiles.txt'])
+        self.assertEqual(self.output.getvalue(), "Cogging one.cog  (changed)\nCogging two.cog\n")
+        # Like without -j, the files after the failure aren't written.
+        self.assertIn("one one.cog no", open('one.cog').read())
+        self.assertNotIn("four four.cog", open('four.cog').read())
+
+    def testIncrementalManifestIsMerged(self):
+        argv = ['argv0', '-j', '2', '-r', '--incremental=manifest.json', '@cogfiles.txt']
+        self.cog.callableMain(argv)
+        self.newCog()
+        self.cog.callableMain(argv)
+        self.assertEqual(self.output.getvalue(), "".join(
+            "Cogging %s\n" % f for f in ['one.cog', 'two.cog', 'three.cog', 'four.cog']
+            ))
+        with open('manifest.json') as f:
+            self.assertEqual(len(json.load(f)['files']), 4)
+
+    def testBadJobCount(self):
+        with self.assertRaisesRegex(CogUsageError, r"^-j takes a non-negative number of jobs$"):
+            self.cog.callableMain(['argv0', '-j', 'many', 'one.cog'])
+
+
 class WritabilityTests(TestCaseWithTempDir):
 
     d = {
@@ -15,30 +15,19 @@
 # ----------------------------------------------------------------------
 """Populates cog content in VSCode files."""
 
-import importlib
-import inspect
-import io
-import os
 import sys
-import textwrap
 
 from pathlib import Path
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 
 import typer
 
 from typer.core import TyperGroup
 
-from Common_Foundation.ContextlibEx import ExitStack
-from Common_Foundation.EnumSource import EnumSource
-from Common_Foundation import PathEx
-from Common_Foundation.Streams.DoneManager import DoneManager, DoneManagerFlags
-from Common_Foundation import TextwrapEx
-
-from Common_FoundationEx import ExecuteTasks
-from Common_FoundationEx.InflectEx import inflect
-
-from Impl.cogapp import Cog
+# Everything else is imported by the functions that need it, as this script is invoked over and over
+# by editors and its startup time is what users wait for (see `Benchmarks/StartupTime.py`).
+if TYPE_CHECKING:
+    from Common_Foundation.Streams.DoneManager import DoneManager  # pragma: no cover
 
 
 # ----------------------------------------------------------------------
@@ -62,6 +51,8 @@ app                                         = typer.Typer(
 def UpdateLaunchFiles(
     input_file_or_directory: Path=typer.Argument(..., exists=True, resolve_path=True, help="Input filename or directory to search for files."),
     single_threaded: bool=typer.Option(False, "--single-threaded", help="Execute with a single thread."),
+    incremental: bool=typer.Option(False, "--incremental", help="Skip files that haven't changed since they were last cogged successfully, and whose generators' dependencies (imported modules, files read, directories listed) haven't changed either."),
+    rescan: bool=typer.Option(False, "--rescan", help="Search every directory for launch.json files, rather than only the directories that changed since the last search."),
     quiet: bool=typer.Option(False, "--quiet", help="Reduce the amount of information written to the terminal."),
     verbose: bool=typer.Option(False, "--verbose", help="Write verbose information to the terminal."),
     debug: bool=typer.Option(False, "--debug", help="Write debug information to the terminal."),
@@ -92,208 +83,438 @@ def UpdateLaunchFiles(
     }
     """
 
+    from Common_Foundation.Streams.DoneManager import DoneManager, DoneManagerFlags
+
     with DoneManager.CreateCommandLine(
         output_flags=DoneManagerFlags.Create(verbose=verbose, debug=debug),
     ) as dm:
-        search_filename = "launch.json"
+        filenames: List[Path] = _GetFiles(
+            dm,
+            input_file_or_directory,
+            _LAUNCH_FILE_TARGET,
+            single_threaded=single_threaded,
+            rescan=rescan,
+        )
+
+        if not filenames:
+            dm.WriteLine("No '{}' files were found.\n".format(_LAUNCH_FILE_TARGET))
+            return
+
+        _CogFiles(
+            dm,
+            filenames,
+            single_threaded=single_threaded,
+            incremental=incremental,
+            quiet=quiet,
+        )
+
 
-        filenames: List[Path] = _GetFiles(dm, input_file_or_directory, search_filename)
+# ----------------------------------------------------------------------
+@app.command("Watch", no_args_is_help=True)
+def Watch(
+    input_directory: Path=typer.Argument(..., exists=True, file_okay=False, resolve_path=True, help="Directory to search for files and watch."),
+    debounce: float=typer.Option(0.5, "--debounce", min=0.0, help="Seconds without changes to wait for before cogging."),
+    poll: bool=typer.Option(False, "--poll", help="Poll directories for changes rather than using inotify."),
+    single_threaded: bool=typer.Option(False, "--single-threaded", help="Execute with a single thread."),
+    incremental: bool=typer.Option(False, "--incremental", help="Skip files that haven't changed since they were last cogged successfully (see `UpdateLaunchFiles`)."),
+    rescan: bool=typer.Option(False, "--rescan", help="Search every directory for launch.json files (see `UpdateLaunchFiles`)."),
+    quiet: bool=typer.Option(False, "--quiet", help="Reduce the amount of information written to the terminal."),
+    verbose: bool=typer.Option(False, "--verbose", help="Write verbose information to the terminal."),
+    debug: bool=typer.Option(False, "--debug", help="Write debug information to the terminal."),
+) -> None:
+    """\
+    Re-cogs launch.json files when test files or test directories are added to, removed from or modified within the directories that they are generated from.
+
+    Like `UpdateLaunchFiles`, but runs until interrupted. Only the launch.json files whose source
+    directories changed are cogged, once no more changes have been seen for `--debounce` seconds.
+    """
+
+    from Common_Foundation.ContextlibEx import ExitStack
+    from Common_Foundation.Streams.DoneManager import DoneManager, DoneManagerFlags
+    from Common_FoundationEx.InflectEx import inflect
+
+    from Impl import Watcher
+    from Impl.ExcludedDirectories import EnumDirectories
+
+    with DoneManager.CreateCommandLine(
+        output_flags=DoneManagerFlags.Create(verbose=verbose, debug=debug),
+    ) as dm:
+        filenames: List[Path] = _GetFiles(
+            dm,
+            input_directory,
+            _LAUNCH_FILE_TARGET,
+            single_threaded=single_threaded,
+            rescan=rescan,
+        )
 
         if not filenames:
-            dm.WriteLine("No '{}' files were found.\n".format(search_filename))
+            dm.WriteLine("No '{}' files were found.\n".format(_LAUNCH_FILE_TARGET))
             return
 
-        tasks = [
-            ExecuteTasks.TaskData(str(filename), filename)
-            for filename in filenames
-        ]
+        # PopulateTests searches the directory above the one that contains launch.json
+        source_dirs: Dict[Path, Path] = {filename: filename.parent.parent for filename in filenames}
 
-        this_dir = Path(__file__).parent
+        roots: List[Path] = []
 
-        cog_tools_dir = this_dir / "CogTools"
-        assert cog_tools_dir.is_dir(), cog_tools_dir
+        for source_dir in sorted(set(source_dirs.values())):
+            if not any(root in source_dir.parents for root in roots):
+                roots.append(source_dir)
 
         # ----------------------------------------------------------------------
-        def TransformStep1(
-            context: Path,
-            on_simple_status_func: Callable[[str], None],  # pylint: disable=unused-argument
-        ) -> Tuple[Optional[int], ExecuteTasks.TransformStep2FuncType]:
-            filename = context
-
-            # ----------------------------------------------------------------------
-            def Step2(
-                status: ExecuteTasks.Status,  # pylint: disable=unused-argument
-            ) -> Tuple[None, Optional[str]]:
-                # Manually invoke the local cog installation
-                sink = io.StringIO()
-
-                cog = Cog()
-
-                cog.setOutput(
-                    stdout=sink,
-                    stderr=sink,
+        def OnChanges(
+            paths: Set[Path],
+        ) -> None:
+            affected = [
+                filename
+                for filename, source_dir in source_dirs.items()
+                if any(path == source_dir or source_dir in path.parents for path in paths)
+            ]
+
+            if affected:
+                _CogFiles(
+                    dm,
+                    affected,
+                    single_threaded=single_threaded,
+                    incremental=incremental,
+                    quiet=quiet,
                 )
 
-                result = cog.main(
-                    [
-                        "custom_cog",       # Fake script name
-                        "-c",               # Checksum
-                        "-e",               # Warn if a file has no cog code in it
-                        "-r",               # Replace
-                        "--verbosity=0",
-                        "-I", str(cog_tools_dir),
-                        str(filename),
-                    ],
+        # ----------------------------------------------------------------------
+
+        # The same directories that PopulateTests searches for tests are watched
+        watcher = Watcher.CreateWatcher(roots, EnumDirectories, force_polling=poll)
+
+        with ExitStack(watcher.Close):
+            dm.WriteLine(
+                "Watching {} with {} (Ctrl+C to exit)...\n".format(
+                    inflect.no("directory", len(roots)),
+                    type(watcher).__name__,
+                ),
+            )
+
+            try:
+                Watcher.Watch(watcher, OnChanges, debounce_seconds=debounce)
+            except KeyboardInterrupt:
+                pass
+
+
+# ----------------------------------------------------------------------
+@app.command("InvalidateTestParserMemo", no_args_is_help=False)
+def InvalidateTestParserMemo() -> None:
+    """Forgets which test files are supported by which test parsers, so that PopulateTests asks the parsers again."""
+
+    from Impl import TestParserMemo
+
+    TestParserMemo.Invalidate()
+
+
+# ----------------------------------------------------------------------
+@app.command("Serve", no_args_is_help=False)
+def Serve(
+    socket_path: Optional[Path]=typer.Option(None, "--socket", dir_okay=False, resolve_path=True, help="Unix domain socket to listen on, in a directory owned by the current user that no one else can write to; defaults to a socket in the user's cache directory."),
+) -> None:
+    """Runs a server that keeps VSCodeCogger and its plugins loaded, so that `Client` invocations don't pay for startup."""
+
+    from Impl import Daemon
+
+    socket_path = socket_path or Daemon.GetSocketPath()
+
+    Daemon.Serve(
+        socket_path,
+        _Execute,
+        lambda: sys.stdout.write("Listening on '{}' (Ctrl+C to exit)...\n".format(socket_path)),
+    )
+
+
+# ----------------------------------------------------------------------
+@app.command(
+    "Client",
+    no_args_is_help=True,
+    context_settings={
+        "allow_extra_args": True,
+        "ignore_unknown_options": True,
+    },
+)
+def Client(
+    ctx: typer.Context,
+    socket_path: Optional[Path]=typer.Option(None, "--socket", dir_okay=False, resolve_path=True, help="Unix domain socket of the server; defaults to a socket in the user's cache directory."),
+) -> None:
+    """\
+    Forwards a command to the server started with `Serve`, running it in this process if no server is listening.
+
+    Example:
+        VSCodeCogger Client UpdateLaunchFiles . --quiet
+    """
+
+    from Impl import Daemon
+
+    result = Daemon.Client(socket_path or Daemon.GetSocketPath(), ctx.args, sys.stdout)
+
+    if result is None:
+        result = _Execute(ctx.args)
+
+    raise typer.Exit(result)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# VSCode only reads launch.json from '.vscode' directories, so only those are searched
+_LAUNCH_FILE_TARGET                         = ".vscode/launch.json"
+
+
+# ----------------------------------------------------------------------
+def _Execute(
+    args: List[str],
+) -> int:
+    """Executes a command as if it was invoked from the command line, returning its result."""
+
+    import click
+
+    if args and args[0] in ["Serve", "Client"]:
+        sys.stderr.write("'{}' can't be forwarded.\n".format(args[0]))
+        return -1
+
+    try:
+        app(args=args, prog_name="VSCodeCogger", standalone_mode=False)
+        return 0
+
+    except click.exceptions.Exit as ex:
+        return ex.exit_code
+
+    except click.ClickException as ex:
+        ex.show()
+        return ex.exit_code
+
+
+# ----------------------------------------------------------------------
+def _CogFiles(
+    dm: "DoneManager",
+    filenames: List[Path],
+    *,
+    single_threaded: bool,
+    incremental: bool,
+    quiet: bool,
+) -> None:
+    import hashlib
+    import io
+    import textwrap
+
+    from Common_Foundation import PathEx
+    from Common_Foundation import TextwrapEx
+
+    from Common_FoundationEx import ExecuteTasks
+
+    from Impl.CacheDirectory import GetCacheDirectory
+    from Impl.cogapp import Cog
+    from Impl.cogapp.snapshot import FileSystemSnapshot
+
+    tasks = [
+        ExecuteTasks.TaskData(str(filename), filename)
+        for filename in filenames
+    ]
+
+    this_dir = Path(__file__).parent
+
+    cog_tools_dir = this_dir / "CogTools"
+    assert cog_tools_dir.is_dir(), cog_tools_dir
+
+    code_cache_dir = GetCacheDirectory("CompiledCode")
+    manifest_dir = GetCacheDirectory("Manifests") if incremental else None
+
+    # Generators that scan overlapping directories (`cog.fs`) share the listings
+    file_system = FileSystemSnapshot()
+
+    # ----------------------------------------------------------------------
+    def TransformStep1(
+        context: Path,
+        on_simple_status_func: Callable[[str], None],  # pylint: disable=unused-argument
+    ) -> Tuple[Optional[int], ExecuteTasks.TransformStep2FuncType]:
+        filename = context
+
+        # ----------------------------------------------------------------------
+        def Step2(
+            status: ExecuteTasks.Status,  # pylint: disable=unused-argument
+        ) -> Tuple[None, Optional[str]]:
+            # Manually invoke the local cog installation
+            sink = io.StringIO()
+
+            cog = Cog()
+
+            cog.setFileSystem(file_system)
+            cog.setOutput(
+                stdout=sink,
+                stderr=sink,
+            )
+
+            args = [
+                "custom_cog",           # Fake script name
+                "-c",                   # Checksum
+                "-e",                   # Warn if a file has no cog code in it
+                "-r",                   # Replace
+                "--verbosity=0",
+                "--code-cache={}".format(code_cache_dir),
+                "-I", str(cog_tools_dir),
+            ]
+
+            if manifest_dir is not None:
+                # Each file has its own manifest, as files are cogged concurrently
+                args.append(
+                    "--incremental={}".format(
+                        manifest_dir / "{}.json".format(hashlib.sha256(str(filename).encode("utf-8")).hexdigest()),
+                    ),
                 )
 
-                output = sink.getvalue()
-
-                if result == 0:
-                    lines = output.rstrip().split("\n")
-
-                    if lines[-1].startswith("Warning:"):
-                        result = 1
-
-                if result != 0:
-                    if "no cog code found in" in output:
-                        rows: List[List[str]] = []
-
-                        plugin_dir = PathEx.EnsureDir(Path(__file__).parent / "CogTools")
-
-                        os.environ["__extracting_documentation__"] = "1"
-                        with ExitStack(lambda: os.environ.pop("__extracting_documentation__")):
-                            for plugin in plugin_dir.iterdir():
-                                if not plugin.is_file():
-                                    continue
-
-                                sys.path.insert(0, str(plugin.parent))
-                                with ExitStack(lambda: sys.path.pop(0)):
-                                    mod = importlib.import_module(plugin.stem)
-                                    assert mod is not None
-
-                                    rows.append(
-                                        [
-                                            plugin.stem,
-                                            inspect.getdoc(mod) or "",
-                                            str(plugin) if dm.capabilities.is_headless else plugin.name,
-                                        ],
-                                    )
-
-                        # ----------------------------------------------------------------------
-                        def DecorateRow(
-                            index: int,  # pylint: disable=unused-argument
-                            cols: List[str],
-                        ) -> List[str]:
-                            if not dm.capabilities.is_headless:
-                                cols[-1] = TextwrapEx.CreateAnsiHyperLink(
-                                    "file:///{}".format((plugin_dir / cols[-1]).as_posix()),
-                                    cols[-1],
-                                )
-
-                            return cols
-
-                        # ----------------------------------------------------------------------
-
-                        output = textwrap.dedent(
-                            """\
-                            No cog code was found in '{}'.
-
-                            To use this functionality, add the following cog code in VSCode's 'launch.json' file:
-
-                                // [[[cog import <functionality>]]]
-                                // [[[end]]]
-
-                            where '<functionality>' can be one of:
-
-                            {}
-                            """,
-                        ).format(
-                            filename,
-                            TextwrapEx.Indent(
-                                TextwrapEx.CreateTable(
-                                    [
-                                        "<functionality>",
-                                        "Description",
-                                        "Source Code",
-                                    ],
-                                    rows,
-                                    decorate_values_func=DecorateRow,
-                                ),
-                                4,
+            args.append(str(filename))
+
+            result = cog.main(args)
+
+            output = sink.getvalue()
+
+            if result == 0:
+                lines = output.rstrip().split("\n")
+
+                if lines[-1].startswith("Warning:"):
+                    result = 1
+
+            if result != 0:
+                if "no cog code found in" in output:
+                    from Impl.CogToolsIndex import GetCogToolsIndex
+
+                    plugin_dir = PathEx.EnsureDir(Path(__file__).parent / "CogTools")
+
+                    # The documentation is extracted without importing the modules
+                    rows: List[List[str]] = [
+                        [
+                            info.name,
+                            info.description,
+                            str(info.path) if dm.capabilities.is_headless else info.path.name,
+                        ]
+                        for info in GetCogToolsIndex(plugin_dir)
+                    ]
+
+                    # ----------------------------------------------------------------------
+                    def DecorateRow(
+                        index: int,  # pylint: disable=unused-argument
+                        cols: List[str],
+                    ) -> List[str]:
+                        if not dm.capabilities.is_headless:
+                            cols[-1] = TextwrapEx.CreateAnsiHyperLink(
+                                "file:///{}".format((plugin_dir / cols[-1]).as_posix()),
+                                cols[-1],
+                            )
+
+                        return cols
+
+                    # ----------------------------------------------------------------------
+
+                    output = textwrap.dedent(
+                        """\
+                        No cog code was found in '{}'.
+
+                        To use this functionality, add the following cog code in VSCode's 'launch.json' file:
+
+                            // [[[cog import <functionality>]]]
+                            // [[[end]]]
+
+                        where '<functionality>' can be one of:
+
+                        {}
+                        """,
+                    ).format(
+                        filename,
+                        TextwrapEx.Indent(
+                            TextwrapEx.CreateTable(
+                                [
+                                    "<functionality>",
+                                    "Description",
+                                    "Source Code",
+                                ],
+                                rows,
+                                decorate_values_func=DecorateRow,
                             ),
-                        )
-
-                    raise ExecuteTasks.TransformException(
-                        textwrap.dedent(
-                            """\
-                            Cogging '{}' failed with result code '{}'.
-
-                            Output:
-                            {}
-                            """,
-                        ).format(
-                            filename,
-                            result,
-                            TextwrapEx.Indent(output, 4),
+                            4,
                         ),
                     )
 
-                return None, None
-
-            # ----------------------------------------------------------------------
+                raise ExecuteTasks.TransformException(
+                    textwrap.dedent(
+                        """\
+                        Cogging '{}' failed with result code '{}'.
+
+                        Output:
+                        {}
+                        """,
+                    ).format(
+                        filename,
+                        result,
+                        TextwrapEx.Indent(output, 4),
+                    ),
+                )
 
-            return None, Step2
+            return None, None
 
         # ----------------------------------------------------------------------
 
-        ExecuteTasks.Transform(
-            dm,
-            "Cogging",
-            tasks,
-            TransformStep1,
-            quiet=quiet,
-            max_num_threads=1 if single_threaded else None,
-        )
+        return None, Step2
 
-        if len(tasks) == 1 and dm.result != 0:
-            with tasks[0].log_filename.open() as f:
-                content = f.read()
+    # ----------------------------------------------------------------------
 
-            if dm.result < 0:
-                func = dm.WriteError
-            else:
-                func = dm.WriteWarning
+    ExecuteTasks.Transform(
+        dm,
+        "Cogging",
+        tasks,
+        TransformStep1,
+        quiet=quiet,
+        max_num_threads=1 if single_threaded else None,
+    )
 
-            func(content + "\n\n")
+    if len(tasks) == 1 and dm.result != 0:
+        with tasks[0].log_filename.open() as f:
+            content = f.read()
+
+        if dm.result < 0:
+            func = dm.WriteError
+        else:
+            func = dm.WriteWarning
+
+        func(content + "\n\n")
 
 
-# ----------------------------------------------------------------------
-# ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
 def _GetFiles(
-    dm: DoneManager,
+    dm: "DoneManager",
     input_file_or_directory: Path,
-    search_filename: str,
+    search_target: str,
+    *,
+    single_threaded: bool,
+    rescan: bool,
 ) -> List[Path]:
+    from Common_FoundationEx.InflectEx import inflect
+
+    from Impl.DirectoryWalker import FindFiles
+
     if input_file_or_directory.is_file():
-        assert input_file_or_directory.name == search_filename
+        assert input_file_or_directory.name == Path(search_target).name
         return [input_file_or_directory, ]
 
     all_files: List[Path] = []
 
     with dm.Nested(
-        "Searching for '{}' files in '{}'...".format(search_filename, input_file_or_directory),
+        "Searching for '{}' files in '{}'...".format(search_target, input_file_or_directory),
         lambda: "{} found".format(inflect.no("file", len(all_files))),
         suffix="\n",
     ) as search_dm:
-        for root, _, filenames in EnumSource(input_file_or_directory):
-            for filename in filenames:
-                if filename == search_filename:
-                    fullpath = root / filename
-
-                    search_dm.WriteVerbose("'{}' found.".format(fullpath))
+        all_files += FindFiles(
+            input_file_or_directory,
+            search_target,
+            num_threads=1 if single_threaded else None,
+            use_cache=True,
+            rescan=rescan,
+        )
 
-                    all_files.append(fullpath)
+        for fullpath in all_files:
+            search_dm.WriteVerbose("'{}' found.".format(fullpath))
 
     return all_files
 